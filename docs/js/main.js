@@ -111,7 +111,9 @@ function initSigma(config) {
 		configSigmaElements(config);
 	}
 
-    if (data.indexOf("gexf")>0 || data.indexOf("xml")>0)
+    if (data.indexOf("manifest.json")>=0)//Compact bundle: nodes first, edges redrawn chunk by chunk
+        a.parseBundle(data,dataReady,function () { a.draw(); });
+    else if (data.indexOf("gexf")>0 || data.indexOf("xml")>0)
         a.parseGexf(data,dataReady);
     else
 	    a.parseJson(data,dataReady);
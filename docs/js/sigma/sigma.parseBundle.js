@@ -0,0 +1,107 @@
+// Loads the compact viewer bundle written by src/viewer_bundle.py
+// (manifest.json + nodes.bin + edges-NNNNN.bin, optional .gz siblings).
+// Nodes are added and drawn first; edges arrive afterwards in chunks.
+// Requires sigma.js and jquery to be loaded
+
+sigma.publicPrototype.parseBundle = function(manifestPath,callback,chunkCallback) {
+	var sigmaInstance = this;
+	var base = manifestPath.substring(0, manifestPath.lastIndexOf("/") + 1);
+	var attributePrefix = "attributes.";
+	var arrayTypes = {
+		int8: Int8Array, int16: Int16Array, int32: Int32Array,
+		uint8: Uint8Array, uint16: Uint16Array, uint32: Uint32Array,
+		float32: Float32Array
+	};
+
+	// gzip siblings are used when the browser can inflate them (DecompressionStream);
+	// otherwise the raw file is requested and the server may still compress it.
+	var useGzip = false;
+
+	function fetchBuffer(file) {
+		var url = base + file + (useGzip ? ".gz" : "");
+		return fetch(url).then(function(response) {
+			if (!response.ok) throw new Error(url + ": " + response.status);
+			return response.arrayBuffer();
+		}).then(function(buffer) {
+			var head = new Uint8Array(buffer, 0, Math.min(2, buffer.byteLength));
+			if (head[0] == 0x1f && head[1] == 0x8b) {
+				// Still gzip-compressed (the server did not set Content-Encoding)
+				var stream = new Response(buffer).body.pipeThrough(new DecompressionStream("gzip"));
+				return new Response(stream).arrayBuffer();
+			}
+			return buffer;
+		});
+	}
+
+	function readColumns(buffer, columns, dictionaries) {
+		var decoded = {};
+		for (var c = 0; c < columns.length; c++) {
+			var col = columns[c];
+			if (col.dtype == "text") {
+				var bytes = new Uint8Array(buffer, col.offset, col.bytes);
+				decoded[col.name] = {text: new TextDecoder("utf-8").decode(bytes).split("\n")};
+			} else {
+				var type = arrayTypes[col.dtype];
+				decoded[col.name] = {
+					values: new type(buffer, col.offset, col.bytes / type.BYTES_PER_ELEMENT),
+					dictionary: col.dictionary || (dictionaries && dictionaries[col.name]),
+					isFloat: col.dtype == "float32"
+				};
+			}
+		}
+		return decoded;
+	}
+
+	function value(column, i) {
+		if (column.text) return column.text[i];
+		var v = column.values[i];
+		if (column.dictionary) return column.dictionary[v];
+		if (column.isFloat) return isNaN(v) ? "" : parseFloat(v.toPrecision(7));
+		return v;
+	}
+
+	function record(decoded, i) {
+		var item = {attributes: {}};
+		for (var name in decoded) {
+			var v = value(decoded[name], i);
+			if (name.indexOf(attributePrefix) == 0) {
+				if (v !== "") item.attributes[name.substring(attributePrefix.length)] = String(v);
+			} else {
+				item[name] = v;
+			}
+		}
+		return item;
+	}
+
+	jQuery.getJSON(manifestPath, function(manifest) {
+		useGzip = window.DecompressionStream && jQuery.inArray("gzip", manifest.compression) >= 0;
+
+		fetchBuffer(manifest.nodes.file).then(function(buffer) {
+			var nodes = readColumns(buffer, manifest.nodes.columns);
+			var ids = nodes.id.text;
+			for (var i = 0; i < manifest.nodes.count; i++) {
+				var node = record(nodes, i);
+				if (node.label === undefined) node.label = node.id;
+				sigmaInstance.addNode(node.id, node);
+			}
+			if (callback) callback.call(sigmaInstance);//Trigger the data ready function
+
+			// Edge chunks are requested in parallel but added in order
+			var eid = 0;
+			var previous = Promise.resolve();
+			jQuery.each(manifest.edges.chunks, function(k, chunk) {
+				var request = fetchBuffer(chunk.file);
+				previous = previous.then(function() { return request; }).then(function(buffer) {
+					var edges = readColumns(buffer, chunk.columns, manifest.edges.dictionaries);
+					for (var j = 0; j < chunk.count; j++) {
+						var edge = record(edges, j);
+						edge.source = ids[edge.source];
+						edge.target = ids[edge.target];
+						sigmaInstance.addEdge(String(eid++), edge.source, edge.target, edge);
+					}
+					if (chunkCallback) chunkCallback.call(sigmaInstance, eid, manifest.edges.count);
+				});
+			});
+		});
+	});//end jquery getJSON function
+};//end sigma.parseBundle function
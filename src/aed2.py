@@ -1,117 +1,194 @@
 import networkx as nx
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy import stats
 import pandas as pd
 from matplotlib.patches import Ellipse, Patch
+from matplotlib.colors import to_hex
 import warnings
 import os
 import datetime
+import time
+import xml.etree.ElementTree as ET
+import argparse
+import contextlib
+import hashlib
+import glob
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+from graph_csr import load_graph_cached, get_csr
+from centrality_engine import (
+    shortest_path_centralities, approximate_centralities,
+    compare_rankings, resolve_workers, edge_costs, weighted_path_centralities
+)
+from spectral_engine import SpectralBackend
+from centrality_store import CentralityStore, cached_metrics
+from knockout_scan import knockout_scan
+from figure_pipeline import FigureJob, render_figures
+from layout_engine import compute_layout
+from kcore import core_numbers, shell_sizes
+from community import detect_communities
+from contact_graph import build_contact_graph
+from trajectory import multigraph_frames, structure_frames, trajectory_centralities
+from metrics_table import export_node_metrics
+from viewer_bundle import export_graph_bundle
+from instrumentation import PipelineProfiler
+from path_index import PathIndex
+from weighted_graph import COST_MODES, merge_interactions, parse_interaction_weights
+from ranking import SCORE_METHODS, MetricMatrix, combined_scores, top_indices
+from density import DensityGrid, MetricGrid, density_scatter, kde_plot
+from network_render import (
+    FULL_DETAIL_MAX_EDGES, LOD_MODES, choose_lod, density_raster, draw_edge_raster, draw_edges,
+    draw_nodes, edge_endpoints, neighbourhood, node_coordinates, sample_edges, save_density_raster,
+    super_nodes
+)
 
 warnings.filterwarnings('ignore')
 
-def load_gexf_file(file_path):
-    """Carrega arquivo GEXF e retorna o grafo"""
+# Conversores dos tipos declarados em <attributes> do GEXF
+GEXF_TYPE_CONVERTERS = {
+    'integer': int,
+    'long': int,
+    'float': float,
+    'double': float,
+    'boolean': lambda v: v.strip().lower() in ('true', '1', 'yes'),
+    'string': str,
+}
+
+def _local_tag(tag):
+    """Remove o namespace de uma tag XML ('{ns}node' -> 'node')"""
+    return tag.rsplit('}', 1)[-1]
+
+def _convert_gexf_value(value, attr_type):
+    """Converte o valor de um atributo GEXF para o tipo declarado"""
+    converter = GEXF_TYPE_CONVERTERS.get(attr_type, str)
     try:
-        # Tenta carregar o arquivo GEXF
-        G = nx.read_gexf(file_path)
-        
-        # Remove atributos problemáticos dos nós e arestas
-        for node in G.nodes():
-            # Remove atributos vazios ou problemáticos
-            attrs_to_remove = []
-            for attr, value in G.nodes[node].items():
-                if value == '' or value is None:
-                    attrs_to_remove.append(attr)
-            for attr in attrs_to_remove:
-                del G.nodes[node][attr]
-        
-        for edge in G.edges():
-            # Remove atributos vazios ou problemáticos das arestas
-            attrs_to_remove = []
-            for attr, value in G.edges[edge].items():
-                if value == '' or value is None:
-                    attrs_to_remove.append(attr)
-            for attr in attrs_to_remove:
-                del G.edges[edge][attr]
-        
+        return converter(value)
+    except (TypeError, ValueError):
+        return value
+
+def _read_attvalues(elem, definitions):
+    """Lê os <attvalue> de um nó/aresta, descartando valores vazios"""
+    attrs = {}
+    for child in elem.iter():
+        if _local_tag(child.tag) != 'attvalue':
+            continue
+        value = child.get('value')
+        # Valores vazios são descartados já na leitura
+        if value is None or value == '':
+            continue
+        title, attr_type = definitions.get(child.get('for'), (child.get('for'), 'string'))
+        attrs[title] = _convert_gexf_value(value, attr_type)
+    return attrs
+
+def load_gexf_file(file_path, multigraph=False):
+    """Carrega arquivo GEXF em uma única passada (iterparse) e retorna o grafo"""
+    start_time = time.perf_counter()
+    try:
+        file_size = os.path.getsize(file_path)
+
+        G = nx.MultiGraph() if multigraph else nx.Graph()
+        directed = False
+
+        # Definições de atributos: classe ('node'/'edge') -> id -> (título, tipo)
+        attr_defs = {'node': {}, 'edge': {}}
+        current_class = None
+
+        # Pilha de elementos abertos: permite remover cada nó/aresta do pai
+        # logo após processá-lo, mantendo a memória limitada
+        stack = []
+        edge_count = 0
+
+        for event, elem in ET.iterparse(file_path, events=('start', 'end')):
+            tag = _local_tag(elem.tag)
+
+            if event == 'start':
+                stack.append(elem)
+                if tag == 'graph':
+                    directed = elem.get('defaultedgetype', 'undirected') == 'directed'
+                elif tag == 'attributes':
+                    current_class = elem.get('class', 'node')
+                continue
+
+            stack.pop()
+
+            if tag == 'attribute' and current_class in attr_defs:
+                attr_defs[current_class][elem.get('id')] = (
+                    elem.get('title', elem.get('id')), elem.get('type', 'string')
+                )
+            elif tag == 'node':
+                node_id = elem.get('id')
+                if node_id:
+                    attrs = _read_attvalues(elem, attr_defs['node'])
+                    label = elem.get('label')
+                    if label:
+                        attrs['label'] = label
+                    G.add_node(node_id, **attrs)
+            elif tag == 'edge':
+                source = elem.get('source')
+                target = elem.get('target')
+                if source and target:
+                    attrs = _read_attvalues(elem, attr_defs['edge'])
+                    weight = elem.get('weight')
+                    if weight:
+                        attrs['weight'] = _convert_gexf_value(weight, 'double')
+                    key = attrs.pop('networkx_key', None)
+                    if multigraph:
+                        G.add_edge(source, target, key=key, **attrs)
+                    elif not G.has_edge(source, target):
+                        # Arestas paralelas são mescladas: mantém a primeira
+                        G.add_edge(source, target, **attrs)
+                    edge_count += 1
+            else:
+                continue
+
+            # Libera o elemento já processado (e seus filhos)
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+
+        elapsed = max(time.perf_counter() - start_time, 1e-9)
+
         print(f"Grafo carregado com sucesso!")
         print(f"Número de nós: {G.number_of_nodes()}")
         print(f"Número de arestas: {G.number_of_edges()}")
-        
-        # Converte para grafo não direcionado se necessário
-        if G.is_directed():
-            print("Convertendo grafo direcionado para não direcionado...")
-            G = G.to_undirected()
-        
+        if directed:
+            print("Grafo direcionado carregado como não direcionado.")
+        print(f"Parse throughput: {file_size / 1e6 / elapsed:.2f} MB/s, "
+              f"{edge_count / elapsed:,.0f} edges/s ({elapsed:.2f}s)")
+
         return G
-        
+
+    except MemoryError:
+        raise
     except Exception as e:
         print(f"Erro ao carregar o arquivo: {e}")
-        print("Tentando métodos alternativos de carregamento...")
-        
-        # Método alternativo 1: Carregar como MultiGraph
-        try:
-            G = nx.read_gexf(file_path, node_type=str)
-            if G.is_multigraph():
-                G = nx.Graph(G)  # Converte para grafo simples
-            if G.is_directed():
-                G = G.to_undirected()
-            
-            print(f"Grafo carregado com método alternativo!")
-            print(f"Número de nós: {G.number_of_nodes()}")
-            print(f"Número de arestas: {G.number_of_edges()}")
-            return G
-        except Exception as e2:
-            print(f"Método alternativo 1 falhou: {e2}")
-        
-        # Método alternativo 2: Carregar linha por linha
-        try:
-            print("Tentando carregar manualmente...")
-            import xml.etree.ElementTree as ET
-            
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-            
-            G = nx.Graph()
-            
-            # Namespace do GEXF
-            ns = {'gexf': 'http://www.gexf.net/1.2draft'}
-            
-            # Adiciona nós
-            nodes = root.findall('.//gexf:node', ns)
-            if not nodes:  # Tenta sem namespace
-                nodes = root.findall('.//node')
-            
-            for node in nodes:
-                node_id = node.get('id')
-                if node_id:
-                    G.add_node(node_id)
-            
-            # Adiciona arestas
-            edges = root.findall('.//gexf:edge', ns)
-            if not edges:  # Tenta sem namespace
-                edges = root.findall('.//edge')
-            
-            for edge in edges:
-                source = edge.get('source')
-                target = edge.get('target')
-                if source and target:
-                    G.add_edge(source, target)
-            
-            print(f"Grafo carregado manualmente!")
-            print(f"Número de nós: {G.number_of_nodes()}")
-            print(f"Número de arestas: {G.number_of_edges()}")
-            return G
-            
-        except Exception as e3:
-            print(f"Método manual falhou: {e3}")
-            return None
+        return None
+
+# Estruturas 3D a partir das quais a rede de contatos é construída
+STRUCTURE_EXTENSIONS = ('.pdb', '.ent', '.cif', '.mmcif')
+
+def load_network(file_path, cutoffs=None, interactions=None, multigraph=False):
+    """Carrega a rede de um GEXF ou a constrói das coordenadas (PDB/mmCIF/tabela de coordenadas)"""
+    if file_path.lower().endswith('.gexf'):
+        # O cache CSR mescla arestas paralelas: multigrafos sempre vêm do GEXF
+        if multigraph:
+            return load_gexf_file(file_path, multigraph=True)
+        return load_graph_cached(file_path, load_gexf_file)
+    try:
+        if cutoffs is None and interactions is None and not multigraph:
+            return load_graph_cached(file_path, build_contact_graph)
+        return build_contact_graph(file_path, cutoffs, interactions, multigraph)
+    except MemoryError:
+        raise
+    except Exception as e:
+        print(f"Erro ao construir a rede de contatos: {e}")
+        return None
 
 def analyze_degree_distribution(G, output_folder):
     """Análise da distribuição de graus com CDF e PDF, salvando em arquivos separados"""
-    degrees = [G.degree(n) for n in G.nodes()]
+    degrees = np.array([d for _, d in G.degree()])
     
     # Ajusta bins para lidar com casos de poucos graus
     if len(set(degrees)) > 1:
@@ -130,8 +207,8 @@ def analyze_degree_distribution(G, output_folder):
     if len(degrees) > 1 and np.std(degrees) > 0: # Garante dados suficientes para KDE
         # Estende o range para uma curva mais suave e para cobrir os extremos
         x_smooth = np.linspace(min(degrees) - 1, max(degrees) + 1, 500) 
-        kde = stats.gaussian_kde(degrees)
-        pdf_smooth = kde(x_smooth)
+        # KDE gaussiano (Scott) por binning linear + FFT: O(n + grade) em vez de O(n * grade)
+        pdf_smooth = MetricGrid(degrees).evaluate(x_smooth)
         ax1_twin.plot(x_smooth, pdf_smooth, 'r-', linewidth=3, 
                       label='Probability Density Function (PDF)')
     
@@ -158,8 +235,12 @@ def analyze_degree_distribution(G, output_folder):
              edgecolor='black', label='Count')
     
     ax2_twin = ax2.twinx()
-    sorted_degrees = np.sort(degrees)
-    y_cdf = np.arange(1, len(sorted_degrees) + 1) / len(sorted_degrees)
+    # Graus são inteiros: a curva só precisa do início e do fim de cada degrau
+    # (o mesmo traçado que ligar todos os pontos ordenados, com poucos vértices)
+    values, counts = np.unique(degrees, return_counts=True)
+    ends = np.cumsum(counts)
+    sorted_degrees = np.repeat(values, 2)
+    y_cdf = np.column_stack([ends - counts + 1, ends]).ravel() / len(degrees)
     
     # Ajusta o zorder para garantir que a linha vermelha não sobreponha a legenda
     ax2_twin.plot(sorted_degrees, y_cdf, 'r-', linewidth=3, 
@@ -186,49 +267,224 @@ def analyze_degree_distribution(G, output_folder):
     
     return perc_values
 
-def calculate_centrality_metrics(G):
-    """Calcula métricas de centralidade"""
+# Abaixo deste tamanho o modo aproximado também calcula o resultado exato para comparação
+APPROX_VALIDATION_MAX_NODES = 2000
+
+def calculate_centrality_metrics(G, workers=None, approximate=False, approx_k=None,
+                                 epsilon=None, delta=0.1, top_n=10, store=None, profiler=None,
+                                 weighted=False):
+    """Calcula métricas de centralidade (workers: processos usados na betweenness)
+
+    No modo exato, harmônica, excentricidade, diâmetro e raio saem da mesma varredura
+    de BFS e ficam em G.graph['path_metrics']. Com approximate=True, closeness e
+    betweenness são estimadas por amostragem de pivôs (approx_k pivôs, ou o
+    suficiente para epsilon/delta); o erro estimado fica em G.graph['centrality_errors'].
+    Com um CentralityStore em `store`, cada grupo de métricas é lido do disco quando
+    já foi calculado para o mesmo grafo e parâmetros.
+    Com weighted=True, closeness/betweenness/harmônica/excentricidade usam Dijkstra
+    sobre o atributo 'cost' das arestas (ver weighted_graph.merge_interactions).
+    Cada métrica é uma etapa do `profiler` (computed=True quando não veio do store).
+    """
     print("Calculando métricas de centralidade...")
+    profiler = profiler or PipelineProfiler()
     
     # Diferentes métricas de centralidade
     centrality_metrics = {}
     
     # Centralidade de grau
-    centrality_metrics['degree'] = nx.degree_centrality(G)
+    with profiler.stage('degree', G):
+        centrality_metrics['degree'] = nx.degree_centrality(G)
     
-    # Centralidade de proximidade
-    if nx.is_connected(G):
-        centrality_metrics['closeness'] = nx.closeness_centrality(G)
+    if approximate and weighted:
+        profiler.fallback('approximate_paths', "pivot sampling is unweighted; computing exact "
+                          "weighted shortest paths")
+        approximate = False
+
+    if approximate:
+        # O top-N certificado é o da betweenness (os hubs de comunicação); a closeness das
+        # redes de resíduos tem empates no topo e nunca se separa com poucos pivôs
+        certify = ('betweenness',)
+        params = {'k': approx_k, 'epsilon': epsilon, 'delta': delta, 'top_n': top_n,
+                  'certify': certify, 'interval': 'bernstein'}
+
+        def compute():
+            profiler.note(computed=True)
+            values, errors, info = approximate_centralities(
+                G, k=approx_k, epsilon=epsilon, delta=delta, top_n=top_n, certify=certify,
+                workers=workers
+            )
+            columns = dict(values)
+            columns.update({f'{metric}_error': e for metric, e in errors.items()})
+            return columns, info
+
+        with profiler.stage('approximate_paths', G, workers=workers):
+            columns, info = cached_metrics(store, G, 'approximate_paths', params, compute)
+            profiler.note(pivots=info['pivots'], exact=info['exact'])
+        if info['exact']:
+            profiler.fallback('approximate_paths', "pivot sample covers every node; exact computation",
+                              pivots=info['pivots'])
+        centrality_metrics['closeness'] = columns['closeness']
+        centrality_metrics['betweenness'] = columns['betweenness']
+        errors = {metric: columns[f'{metric}_error'] for metric in ('closeness', 'betweenness')}
+        G.graph['centrality_errors'] = errors
+
+        print(f"Approximate mode: {info['pivots']} pivots, {info['confidence']:.0%} confidence")
+        if top_n:
+            print(f"   top-{top_n} {'/'.join(certify)} "
+                  f"{'certified' if info['certified_top_n'] else 'NOT certified'} "
+                  f"by the confidence intervals")
+            if not info['certified_top_n']:
+                profiler.fallback('approximate_paths', "top-N not certified within the pivot cap",
+                                  pivots=info['pivots'])
+        for metric in ('closeness', 'betweenness'):
+            print(f"   {metric}: max estimated error = {max(errors[metric].values(), default=0):.4g}")
+
+        # Em grafos pequenos compara o ranking aproximado com o exato
+        if not info['exact'] and G.number_of_nodes() <= APPROX_VALIDATION_MAX_NODES:
+            with profiler.stage('approximation_check', G, workers=workers):
+                exact, _ = cached_metrics(store, G, 'shortest_paths', {'normalized': True},
+                                          lambda: shortest_path_centralities(G, workers=workers))
+            for metric in ('closeness', 'betweenness'):
+                rho, overlap = compare_rankings(columns[metric], exact[metric], top_n or 10)
+                print(f"   {metric} vs exact: Spearman = {rho:.4f}, "
+                      f"top-{top_n or 10} overlap = {overlap:.0%}")
     else:
-        # Para grafos desconectados, calcula por componente
-        centrality_metrics['closeness'] = {}
-        for component in nx.connected_components(G):
-            subgraph = G.subgraph(component)
-            closeness_sub = nx.closeness_centrality(subgraph)
-            centrality_metrics['closeness'].update(closeness_sub)
-    
-    # Centralidade de intermediação
-    centrality_metrics['betweenness'] = nx.betweenness_centrality(G)
+        # Proximidade, intermediação, harmônica e excentricidade numa única varredura de BFS
+        # (ou de Dijkstra, no modo ponderado)
+        name, params = 'shortest_paths', {'normalized': True}
+        if weighted:
+            _, costs = edge_costs(G)
+            # O store identifica o grafo só pela topologia: o hash dos custos entra nos parâmetros
+            name, params = 'weighted_paths', {'normalized': True,
+                                              'costs': hashlib.sha256(costs.tobytes()).hexdigest()[:16]}
+
+        def compute():
+            profiler.note(computed=True)
+            if weighted:
+                return weighted_path_centralities(G, workers=workers)
+            return shortest_path_centralities(G, workers=workers)
+
+        with profiler.stage(name, G, workers=workers):
+            path_metrics, summary = cached_metrics(store, G, name, params, compute)
+        centrality_metrics['closeness'] = path_metrics['closeness']
+        centrality_metrics['betweenness'] = path_metrics['betweenness']
+        G.graph['path_metrics'] = {
+            'harmonic': path_metrics['harmonic'],
+            'eccentricity': path_metrics['eccentricity'],
+            **summary,
+        }
+        if weighted:
+            print(f"Weighted diameter: {summary['diameter']:.4g}, "
+                  f"radius (largest component): {summary['radius']:.4g}")
+        else:
+            print(f"Diameter: {summary['diameter']}, radius (largest component): {summary['radius']}")
     
-    # Centralidade de autovetor
-    try:
-        centrality_metrics['eigenvector'] = nx.eigenvector_centrality(G, max_iter=1000)
-    except nx.exception.PowerIterationFailedConvergence:
-        print("Não foi possível calcular centralidade de autovetor (convergência falhou). Usando zeros.")
-        centrality_metrics['eigenvector'] = {node: 0 for node in G.nodes()}
-    except Exception as e:
-        print(f"Erro ao calcular centralidade de autovetor: {e}. Usando zeros.")
-        centrality_metrics['eigenvector'] = {node: 0 for node in G.nodes()}
+    # Autovetor e PageRank: iteração de potência esparsa sobre a mesma matriz
+    spectral = None
+    G.graph['spectral_info'] = {}
+    # O PageRank lê o atributo 'weight', que a impressão digital do store não cobre
+    for metric, params in (('eigenvector', {'tol': 1.0e-6, 'max_iter': 1000}),
+                           ('pagerank', {'alpha': 0.85, 'tol': 1.0e-6, 'max_iter': 100,
+                                         'weights': get_csr(G).weights_digest()})):
+        def compute():
+            nonlocal spectral
+            profiler.note(computed=True)
+            if spectral is None:
+                spectral = SpectralBackend(G)
+            solve = spectral.eigenvector if metric == 'eigenvector' else spectral.pagerank
+            options = {k: v for k, v in params.items() if k != 'weights'}
+            try:
+                values, info = solve(**options)
+            except MemoryError:
+                raise
+            except Exception as e:
+                print(f"Erro ao calcular {metric}: {e}. Usando zeros.")
+                return {metric: {node: 0 for node in G.nodes()}}, \
+                    {'converged': False, 'error': str(e), 'zeros': True}
+            print(f"{metric}: {info['method']}, {info['iterations']} iterations, "
+                  f"residual = {info['residual']:.2e}")
+            return {metric: values}, info
 
-    # PageRank
-    try:
-        centrality_metrics['pagerank'] = nx.pagerank(G)
-    except Exception as e:
-        print(f"Erro ao calcular PageRank: {e}. Usando zeros.")
-        centrality_metrics['pagerank'] = {node: 0 for node in G.nodes()}
+        with profiler.stage(metric, G):
+            columns, info = cached_metrics(store, G, metric, params, compute)
+            profiler.note(**{k: info[k] for k in ('method', 'iterations', 'residual') if k in info})
+        if info.get('zeros'):
+            profiler.fallback(metric, "solver failed; all values set to zero", error=info['error'])
+        elif 'error' in info:
+            # ARPACK também falhou depois da iteração de potência: valores da última iteração
+            profiler.fallback(metric, "ARPACK failed; using the last power iterate",
+                              error=info['error'], residual=info.get('residual'))
+            print(f"WARNING: {metric}: ARPACK failed ({info['error']}); using the last power "
+                  f"iterate (residual = {info.get('residual', float('nan')):.2e}).")
+        elif not info.get('converged', False):
+            profiler.fallback(metric, "did not converge; using the last iterate",
+                              residual=info.get('residual'))
+            print(f"WARNING: {metric} did not converge; using the last iterate "
+                  f"(residual = {info.get('residual', float('nan')):.2e}).")
+        centrality_metrics[metric] = columns[metric]
+        G.graph['spectral_info'][metric] = info
     
     return centrality_metrics
 
+def kcore_analysis(G, centrality_metrics, output_folder, store=None):
+    """Decomposição k-core/k-shell: coreness por nó, tamanho e resumo das centralidades por shell
+
+    A coreness é gravada como atributo 'coreness' dos nós; a tabela por shell vai
+    para kshell_summary.csv. Devolve (coreness, tabela).
+    """
+    def compute():
+        csr = get_csr(G)
+        return {'coreness': dict(zip(csr.node_list(), core_numbers(csr).tolist()))}, {}
+
+    columns, _ = cached_metrics(store, G, 'coreness', {}, compute)
+    coreness = {node: int(columns['coreness'][node]) for node in G.nodes()}
+    nx.set_node_attributes(G, coreness, 'coreness')
+
+    core = np.array([coreness[node] for node in G.nodes()], dtype=np.int64)
+    shells, cores = shell_sizes(core)
+    df = pd.DataFrame({metric: [values.get(node, np.nan) for node in G.nodes()]
+                       for metric, values in centrality_metrics.items()})
+    df['shell'] = core
+    summary = df.groupby('shell').agg(['mean', 'median', 'max'])
+    summary.columns = [f'{metric}_{stat}' for metric, stat in summary.columns]
+    summary.insert(0, 'core_size', cores[summary.index])
+    summary.insert(0, 'shell_size', shells[summary.index])
+    summary.to_csv(os.path.join(output_folder, 'kshell_summary.csv'))
+
+    k_max = int(core.max()) if len(core) else 0
+    print(f"Degeneracy (max coreness): {k_max}, {cores[k_max] if len(core) else 0} nodes in the {k_max}-core")
+    for k in summary.index:
+        print(f"   {k}-shell: {shells[k]} nodes, mean degree centrality = "
+              f"{summary.loc[k, 'degree_mean']:.4f}, mean betweenness = "
+              f"{summary.loc[k, 'betweenness_mean']:.4f}")
+    return coreness, summary
+
+def community_analysis(G, resolution=1.0, runs=8, workers=None, store=None):
+    """Comunidades (Louvain, várias sementes em paralelo + consenso) gravadas como atributos dos nós
+
+    'Modularity Class' recebe a classe de consenso (mesmo nome do atributo do Gephi) e
+    'community_stability' a concordância média de cada nó entre as execuções.
+    """
+    # A modularidade usa os pesos das arestas: o hash deles entra nos parâmetros
+    params = {'resolution': resolution, 'runs': runs, 'weights': get_csr(G).weights_digest()}
+
+    def compute():
+        classes, stability, info = detect_communities(G, resolution=resolution, runs=runs,
+                                                      workers=workers)
+        return {'modularity_class': classes, 'community_stability': stability}, info
+
+    columns, info = cached_metrics(store, G, 'communities', params, compute)
+    classes = {node: int(columns['modularity_class'][node]) for node in G.nodes()}
+    nx.set_node_attributes(G, classes, 'Modularity Class')
+    nx.set_node_attributes(G, columns['community_stability'], 'community_stability')
+
+    sizes = np.bincount(list(classes.values())) if classes else np.zeros(0, dtype=int)
+    print(f"{info['communities']} communities, modularity = {info['modularity']:.4f} "
+          f"(best run {info['best_run_modularity']:.4f}, {runs} runs, resolution {resolution})")
+    print(f"   Stability across runs: mean pairwise ARI = {info['mean_pairwise_ari']:.3f}")
+    print(f"   Largest communities: {sizes[:5].tolist()}")
+    return classes, info
+
 def multivariate_centrality_analysis(centrality_metrics, output_folder):
     """Análise multivariável das métricas de centralidade - Matriz de scatter plots"""
     # Converte para DataFrame
@@ -238,6 +494,9 @@ def multivariate_centrality_analysis(centrality_metrics, output_folder):
     metrics = ['betweenness', 'degree', 'eigenvector', 'closeness']
     df_selected = df[metrics]
     
+    # Uma grade de densidade por métrica, compartilhada pela diagonal e pelos painéis de dispersão
+    density = DensityGrid(df_selected)
+    
     # Cria figura com subplots em grid
     fig, axes = plt.subplots(len(metrics), len(metrics), figsize=(16, 16))
     
@@ -258,8 +517,8 @@ def multivariate_centrality_analysis(centrality_metrics, output_folder):
             if i == j:
                 # Diagonal: histograma da própria métrica com KDE
                 values = df_selected[metric_x].values
-                # Usar kdeplot para ter o mesmo estilo da imagem
-                sns.kdeplot(values, ax=ax, color='red', fill=True, alpha=0.1, linewidth=2)
+                # KDE preenchido no estilo do sns.kdeplot, calculado por binning + FFT
+                kde_plot(ax, density[metric_x], color='red', fill=True, alpha=0.1, linewidth=2)
                 ax.hist(values, bins=20, alpha=0.7, color='lightgray', 
                          density=True, edgecolor='gray') # Usar lightgray para barras
 
@@ -273,7 +532,9 @@ def multivariate_centrality_analysis(centrality_metrics, output_folder):
                 y_vals = df_selected[metric_y].values
                 
                 # Scatter plot com pontos menores e mais escuros, como na imagem
-                ax.scatter(x_vals, y_vals, alpha=0.8, s=15, color='darkred', edgecolor='none')
+                # (histograma 2D rasterizado quando há pontos demais para um scatter)
+                density_scatter(ax, density, metric_x, metric_y, alpha=0.8, s=15, color='darkred',
+                                edgecolor='none')
                 
                 # Adiciona elipses de densidade
                 if len(np.unique(x_vals)) > 1 and len(np.unique(y_vals)) > 1:
@@ -333,29 +594,27 @@ def multivariate_centrality_analysis(centrality_metrics, output_folder):
     
     return df_selected
 
-def identify_peripheral_and_central_nodes(G, centrality_metrics, top_n=10):
-    """Identifica vértices na periferia e centro da rede"""
+def identify_peripheral_and_central_nodes(G, centrality_metrics, top_n=10, method='mean'):
+    """Identifica vértices na periferia e centro da rede
+
+    As métricas ficam numa matriz nós x métricas; o score combinado é a média
+    por nó das métricas disponíveis (valores brutos, postos ou z-scores, conforme
+    `method`) e os extremos saem de uma seleção parcial (argpartition), em O(n).
+    """
     
     # Combina métricas para criar um score geral
-    combined_scores = {}
+    matrix = MetricMatrix.from_metrics(G, centrality_metrics)
+    scores = combined_scores(matrix, method)
+    combined = dict(zip(matrix.nodes, scores.tolist()))
     
-    for node in G.nodes():
-        score = 0
-        count = 0
-        for metric_name, metric_values in centrality_metrics.items():
-            if node in metric_values and not np.isnan(metric_values[node]):
-                score += metric_values[node]
-                count += 1
-        combined_scores[node] = score / count if count > 0 else 0
-    
-    # Ordena os nós por score
-    sorted_nodes = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
-    
-    # Identifica nós centrais e periféricos
-    central_nodes = sorted_nodes[:top_n]
-    peripheral_nodes = sorted_nodes[-top_n:]
+    # Identifica nós centrais e periféricos (mesma ordem de uma ordenação decrescente completa)
+    central_nodes = [(matrix.nodes[i], float(scores[i])) for i in top_indices(scores, top_n)]
+    peripheral_nodes = [(matrix.nodes[i], float(scores[i]))
+                        for i in top_indices(scores, top_n, largest=False)]
     
     print(f"\n=== CENTRALITY AND PERIPHERY ANALYSIS ===")
+    if method != 'mean':
+        print(f"(combined score: mean {method} across metrics)")
     print(f"\nTOP {top_n} CENTRAL NODES:")
     for i, (node, score) in enumerate(central_nodes, 1):
         print(f"{i}. Node {node}: Score = {score:.4f}")
@@ -366,53 +625,135 @@ def identify_peripheral_and_central_nodes(G, centrality_metrics, top_n=10):
     
     # Análise por métrica individual
     print(f"\n=== ANALYSIS BY INDIVIDUAL METRIC ===")
-    for metric in centrality_metrics:
-        sorted_metric = sorted(centrality_metrics[metric].items(), 
-                               key=lambda x: x[1], reverse=True)
+    for j, metric in enumerate(matrix.names):
+        column = matrix.values[:, j]
         print(f"\n{metric.upper()} - Top 5:")
-        for i, (node, value) in enumerate(sorted_metric[:5], 1):
-            print(f"   {i}. Node {node}: {value:.4f}")
+        for i, row in enumerate(top_indices(column, 5), 1):
+            print(f"   {i}. Node {matrix.nodes[row]}: {column[row]:.4f}")
     
-    return central_nodes, peripheral_nodes, combined_scores
+    return central_nodes, peripheral_nodes, combined
+
+def robustness_scan(G, centrality_metrics, combined_scores, output_folder, order_by='combined',
+                    top_k=None, mode='single', workers=None, top_n=10):
+    """Remoção in silico de resíduos (um a um ou em ordem de ataque) e impacto na rede"""
+    scores = combined_scores if order_by == 'combined' else centrality_metrics[order_by]
+    targets = sorted(scores, key=lambda node: scores[node], reverse=True)
+    if top_k is not None:
+        targets = targets[:top_k]
+
+    print(f"Knockout scan ({mode}) over {len(targets)} residues ordered by {order_by}...")
+    table = knockout_scan(G, targets, mode=mode, workers=workers, top_n=top_n,
+                          output_dir=os.path.join(output_folder, f'knockout_scan_{mode}'))
 
-def visualize_network_with_centrality(G, combined_scores, central_nodes, peripheral_nodes, output_folder):
-    """Visualiza a rede destacando nós centrais e periféricos e salva a imagem"""
+    if len(table) and mode == 'cumulative':
+        print(f"\nAttack curve (cumulative removals):")
+        for row in table.iloc[np.unique(np.linspace(0, len(table) - 1, 5).astype(int))].itertuples():
+            print(f"   after {row.step + 1} removals: largest component = {row.largest_component}, "
+                  f"efficiency = {row.global_efficiency:.4f}")
+    elif len(table):
+        worst = table.sort_values('global_efficiency').head(5)
+        print(f"\nResidues whose removal most reduces global efficiency:")
+        for i, row in enumerate(worst.itertuples(), 1):
+            print(f"   {i}. Node {row.removed}: efficiency = {row.global_efficiency:.4f}, "
+                  f"largest component = {row.largest_component}")
+    return table
+
+def trajectory_analysis(file_paths, output_folder, workers=None, top_n=10, cutoffs=None):
+    """Modo trajetória: centralidades por modelo/frame, série temporal em disco e persistência por resíduo
+
+    file_paths: PDB/mmCIF com vários modelos (ou uma sequência de frames) ou um GEXF
+    do RING com o atributo Model nas arestas.
+    """
+    output_dir = os.path.join(output_folder, 'trajectory')
+    if len(file_paths) == 1 and file_paths[0].lower().endswith('.gexf'):
+        frames = multigraph_frames(load_gexf_file(file_paths[0], multigraph=True))
+    else:
+        frames = structure_frames(file_paths, cutoffs=cutoffs)
+
+    table = trajectory_centralities(frames, output_dir, workers=workers, top_n=top_n)
+    persistent = table.sort_values(['hub_persistence', 'betweenness_mean'], ascending=False).head(5)
+    print(f"\nMost persistent betweenness hubs (top-{top_n} fraction of frames):")
+    for i, row in enumerate(persistent.itertuples(), 1):
+        print(f"   {i}. Node {row.residue}: {row.hub_persistence:.0%} of frames, "
+              f"betweenness = {row.betweenness_mean:.4f} ± {row.betweenness_std:.4f}")
+    return table
+
+def visualize_network_with_centrality(G, combined_scores, central_nodes, peripheral_nodes, output_folder,
+                                      store=None, lod='auto', max_edges=FULL_DETAIL_MAX_EDGES,
+                                      group_by='Modularity Class', density=False):
+    """Visualiza a rede destacando nós centrais e periféricos e salva a imagem
+
+    Nível de detalhe (`lod`): 'full' desenha todas as arestas, 'sample' uma amostra
+    de `max_edges` arestas, 'raster' as arestas como imagem de densidade e
+    'aggregate' agrega os nós em super-nós por `group_by` (comunidade ou
+    'coreness'); 'auto' escolhe pelo tamanho do grafo.
+    A vizinhança dos nós destacados é sempre desenhada em detalhe total. Com
+    `density` grava também network_density.png (contagem de arestas por pixel).
+    Devolve {'lod': modo usado, 'fallback': erro que levou à figura simplificada ou None}.
+    """
     
-    plt.figure(figsize=(16, 12))
+    # Layout da rede: force-directed com Barnes-Hut, iniciado pelas coordenadas dos resíduos
+    # e reaproveitado do store quando o grafo não mudou
+    print("Calculating network layout...")
+    pos = compute_layout(G, store=store)
+
+    fig, ax = plt.subplots(figsize=(16, 12))
     
     try:
-        # Layout da rede
-        print("Calculating network layout...")
-        pos = nx.spring_layout(G, k=0.5, iterations=50) # Ajuste 'k' para espaçamento entre nós
-        
-        # Cores dos nós baseadas no score
-        node_colors = []
-        node_sizes = []
-        
-        central_node_ids = [node for node, score in central_nodes]
-        peripheral_node_ids = [node for node, score in peripheral_nodes]
+        nodes = list(G.nodes())
+        coords = node_coordinates(G, pos)
+        u, v = edge_endpoints(G)
+        mode = choose_lod(len(nodes), len(u), lod, max_edges)
         
         # Verifica se os nós existem no grafo
-        valid_central = [node for node in central_node_ids if node in G.nodes()]
-        valid_peripheral = [node for node in peripheral_node_ids if node in G.nodes()]
-        
-        for node in G.nodes():
-            if node in valid_central:
-                node_colors.append('red')
-                node_sizes.append(300)
-            elif node in valid_peripheral:
-                node_colors.append('blue')
-                node_sizes.append(200)
-            else:
-                node_colors.append('lightgray')
-                node_sizes.append(100)
+        valid_central = [node for node, score in central_nodes if node in G]
+        valid_peripheral = [node for node, score in peripheral_nodes if node in G]
         
-        # Desenha a rede
-        print("Drawing edges...")
-        nx.draw_networkx_edges(G, pos, alpha=0.3, width=0.5, edge_color='gray')
+        # Papel de cada nó: 0 = outros, 1 = periférico, 2 = central (cores e tamanhos por papel)
+        index = {node: i for i, node in enumerate(nodes)}
+        role = np.zeros(len(nodes), dtype=np.int64)
+        role[[index[node] for node in valid_peripheral]] = 1
+        role[[index[node] for node in valid_central]] = 2
+        palette = np.array(['lightgray', 'blue', 'red'])
+        role_sizes = np.array([100, 200, 300])
+        highlighted = role > 0
+        touching = highlighted[u] | highlighted[v]
+        # Raster de densidade das arestas: calculado uma vez para a figura e para network_density.png
+        raster = density_raster(coords, u, v) if mode == 'raster' or density else None
         
-        print("Drawing nodes...")
-        nx.draw_networkx_nodes(G, pos, node_color=node_colors, node_size=node_sizes, alpha=0.8)
+        # Desenha a rede (arestas num único LineCollection rasterizado)
+        if mode in ('full', 'sample', 'raster'):
+            if mode == 'full':
+                print("Drawing edges...")
+                draw_edges(ax, coords, u, v)
+            elif mode == 'sample':
+                drawn = sample_edges(u, v, max_edges, keep=touching)
+                print(f"Drawing {len(drawn)} of {len(u)} edges (sampled, highlighted neighbourhoods kept)...")
+                draw_edges(ax, coords, u[drawn], v[drawn])
+            else:
+                print(f"Drawing {len(u)} edges as a density raster (highlighted neighbourhoods as lines)...")
+                draw_edge_raster(ax, coords, raster)
+                draw_edges(ax, coords, u[touching], v[touching], alpha=0.5, zorder=3)
+            print("Drawing nodes...")
+            draw_nodes(ax, coords[~highlighted], 'lightgray', role_sizes[0] if mode == 'full' else 10)
+            draw_nodes(ax, coords[highlighted], palette[role[highlighted]],
+                       role_sizes[role[highlighted]], zorder=3)
+        else:
+            groups = [G.nodes[node].get(group_by) for node in nodes]
+            if any(group is None for group in groups):
+                groups = [G.nodes[node].get('coreness', 0) for node in nodes]
+            labels, centroids, counts, (a, b, weight) = super_nodes(coords, u, v, groups)
+            print(f"Drawing {len(labels)} super-nodes and {len(weight)} aggregated edges...")
+            draw_edges(ax, centroids, a, b, alpha=0.4,
+                       width=0.5 + 3 * np.log1p(weight) / np.log1p(weight.max(initial=1)))
+            draw_nodes(ax, centroids, 'lightgray', 30 + 970 * np.sqrt(counts / counts.max()),
+                       alpha=0.6)
+            # Nós destacados e seus vizinhos em detalhe total, sobre os super-nós
+            focus = np.flatnonzero(neighbourhood(G, valid_central + valid_peripheral))
+            draw_edges(ax, coords, u[touching], v[touching], alpha=0.5, zorder=3)
+            draw_nodes(ax, coords[focus], palette[role[focus]],
+                       np.where(highlighted[focus], role_sizes[role[focus]], 20), zorder=4)
+        ax.autoscale_view()
         
         # Adiciona rótulos apenas para nós centrais e periféricos (limitado para evitar poluição visual)
         important_nodes_labels = {}
@@ -425,44 +766,49 @@ def visualize_network_with_centrality(G, combined_scores, central_nodes, periphe
 
         if important_nodes_labels:
             print("Adding labels...")
-            nx.draw_networkx_labels(G, pos, labels=important_nodes_labels, 
+            nx.draw_networkx_labels(G, pos, labels=important_nodes_labels, ax=ax,
                                     font_size=8, font_weight='bold', font_color='black')
         
-        plt.title('Network with Highlighted Central (Red) and Peripheral (Blue) Nodes', 
-                  fontsize=16, fontweight='bold')
+        title = 'Network with Highlighted Central (Red) and Peripheral (Blue) Nodes'
+        if mode != 'full':
+            title += f' [{mode}]'
+        plt.title(title, fontsize=16, fontweight='bold')
         
         # Legenda
         legend_elements = [
             Patch(facecolor='red', label=f'Central Nodes ({len(valid_central)})'),
             Patch(facecolor='blue', label=f'Peripheral Nodes ({len(valid_peripheral)})'),
-            Patch(facecolor='lightgray', label='Other Nodes')
+            Patch(facecolor='lightgray', label='Other Nodes' if mode != 'aggregate'
+                  else f'{group_by} groups ({len(labels)})')
         ]
         plt.legend(handles=legend_elements, loc='upper right')
         
         plt.axis('off')
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_folder, 'network_centrality_visualization.png'))
-        plt.close() # Fecha a figura
+        # Margens fixas em vez de tight_layout e fig.savefig em vez de plt.savefig:
+        # a figura é desenhada uma única vez
+        fig.subplots_adjust(left=0.01, right=0.99, bottom=0.01, top=0.95)
+        fig.savefig(os.path.join(output_folder, 'network_centrality_visualization.png'),
+                    pil_kwargs={'compress_level': 1})
+        plt.close(fig) # Fecha a figura
+
+        if density:
+            print("Rendering edge density raster...")
+            save_density_raster(raster, os.path.join(output_folder, 'network_density.png'))
+        return {'lod': mode, 'fallback': None}
         
     except Exception as e:
         print(f"Error in visualization: {e}")
         print("Attempting simplified visualization...")
+        plt.close(fig)
         
         # Visualização mais simples em caso de erro
         plt.figure(figsize=(12, 8))
         
-        # Layout mais simples
-        pos = nx.random_layout(G)
-        
         # Desenha apenas os nós com cores
-        node_colors = []
-        for node in G.nodes():
-            if node in [n for n, s in central_nodes]:
-                node_colors.append('red')
-            elif node in [n for n, s in peripheral_nodes]:
-                node_colors.append('blue')
-            else:
-                node_colors.append('lightgray')
+        central_set = {n for n, s in central_nodes}
+        peripheral_set = {n for n, s in peripheral_nodes}
+        node_colors = ['red' if node in central_set else 'blue' if node in peripheral_set
+                       else 'lightgray' for node in G.nodes()]
         
         nx.draw(G, pos, node_color=node_colors, node_size=50, 
                  alpha=0.8, with_labels=False, edge_color='gray', width=0.5)
@@ -471,67 +817,434 @@ def visualize_network_with_centrality(G, combined_scores, central_nodes, periphe
         plt.axis('off')
         plt.savefig(os.path.join(output_folder, 'simplified_network_visualization.png'))
         plt.close() # Fecha a figura
+        return {'lod': 'simplified', 'fallback': f"{type(e).__name__}: {e}"}
 
-def main():
-    """Função principal"""
-    print("=== NETWORK ANALYSIS - REQUIREMENT 3 ===\n")
-    
-    # Cria uma pasta única para cada execução com timestamp
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_folder = f"network_analysis_results_{timestamp}"
-    os.makedirs(output_folder, exist_ok=True)
-    print(f"Results will be saved in: '{output_folder}'")
+def visualize_k_shells(G, coreness, output_folder, store=None, max_edges=FULL_DETAIL_MAX_EDGES):
+    """Rede colorida por k-shell, com o núcleo (k máximo) em destaque"""
+    pos = compute_layout(G, store=store)
+    nodes = list(G.nodes())
+    core = np.array([coreness.get(node, 0) for node in nodes])
+    k_max = int(core.max()) if len(core) else 0
 
-    # Procura arquivos GEXF na pasta atual
-    gexf_files = [f for f in os.listdir('.') if f.endswith('.gexf')]
-    
-    if gexf_files:
-        print(f"GEXF files found: {gexf_files}")
-        file_path = gexf_files[0]  # Usa o primeiro arquivo encontrado
-        print(f"Using file: {file_path}")
+    fig, ax = plt.subplots(figsize=(16, 12))
+    # Acima de max_edges as arestas viram um raster de densidade e só as do núcleo são linhas
+    coords = node_coordinates(G, pos)
+    u, v = edge_endpoints(G)
+    if len(u) <= max_edges:
+        draw_edges(ax, coords, u, v)
     else:
-        print("No GEXF file found in the current folder.")
-        file_path = input("Enter the full path to the GEXF file: ")
-    
-    # Carrega o grafo
-    G = load_gexf_file(file_path)
+        draw_edge_raster(ax, coords, density_raster(coords, u, v))
+        inner = np.flatnonzero((core[u] == k_max) & (core[v] == k_max))
+        drawn = inner[sample_edges(u[inner], v[inner], max_edges)]
+        draw_edges(ax, coords, u[drawn], v[drawn], alpha=0.5, zorder=2)
+    shells = np.unique(core)
+    cmap = plt.get_cmap('viridis', max(len(shells), 2))
+    for i, k in enumerate(shells):
+        members = core == k
+        color = 'red' if k == k_max else to_hex(cmap(i))
+        draw_nodes(ax, coords[members], color, 200 if k == k_max else 60, zorder=3 if k == k_max else 2,
+                   label=f'{k}-shell ({int(members.sum())})' + (' - core' if k == k_max else ''))
+    ax.autoscale_view()
+
+    ax.set_title(f'K-shell Decomposition ({k_max}-core in red)', fontsize=16, fontweight='bold')
+    ax.legend(loc='upper right')
+    ax.axis('off')
+    fig.subplots_adjust(left=0.01, right=0.99, bottom=0.01, top=0.95)
+    fig.savefig(os.path.join(output_folder, 'kshell_network.png'), pil_kwargs={'compress_level': 1})
+    plt.close(fig)
+
+def analyze_graph(file_path, output_folder, options):
+    """Pipeline completo para um grafo; devolve a linha do resumo (métricas globais e tempos)
+
+    Cada etapa é medida (tempo, CPU, memória, fallbacks) e o registro vai para
+    profile.json e trace.json na pasta de saída, mesmo quando a análise falha.
+    """
+    start_time = time.perf_counter()
+    os.makedirs(output_folder, exist_ok=True)
+    profiler = PipelineProfiler(output_folder, cprofile=options.cprofile, input=file_path)
+    try:
+        return _analyze_graph(file_path, output_folder, options, profiler, start_time)
+    finally:
+        print(f"Stage profile: {profiler.write()}")
+
+def _analyze_graph(file_path, output_folder, options, profiler, start_time):
+    """Etapas de analyze_graph, cada uma dentro de profiler.stage"""
+    workers = options.workers
+
+    if options.trajectory:
+        with profiler.stage('trajectory', workers=workers):
+            table = trajectory_analysis([file_path], output_folder, workers=workers,
+                                        top_n=options.top_n)
+        return {'nodes': len(table), 'seconds': time.perf_counter() - start_time}
+
+    # Carrega o grafo (pelo cache binário CSR quando o arquivo não mudou)
+    file_bytes = os.path.getsize(file_path) if os.path.exists(file_path) else None
+    with profiler.stage('load', file_bytes=file_bytes, weighted=options.weighted):
+        # Modo ponderado: as interações paralelas do par são lidas e mescladas num custo
+        G = load_network(file_path, multigraph=options.weighted)
+        if G is not None and options.weighted:
+            G = merge_interactions(G, parse_interaction_weights(options.interaction_weight),
+                                   cost=options.edge_cost)
+        if G is not None:
+            profiler.note(nodes=G.number_of_nodes(), edges=G.number_of_edges(),
+                          from_cache=bool(G.graph.get('from_cache')))
     
     if G is None:
-        print("Error: Could not load the file.")
-        print("Please check if:")
-        print("1. The file exists at the specified path")
-        print("2. The file is in a valid GEXF format")
-        print("3. The file is not corrupted")
-        return
+        raise ValueError("Could not load the file (missing, corrupted or not a valid GEXF/structure)")
     
     # Verifica se o grafo não está vazio
     if G.number_of_nodes() == 0:
-        print("Error: The graph has no nodes.")
-        return
+        raise ValueError("The graph has no nodes")
     
     if G.number_of_edges() == 0:
         print("Warning: The graph has no edges. Some centrality metrics might be zero or undefined.")
         # Pode continuar com a análise de centralidade de grau, mas outras métricas serão zero.
+        profiler.fallback('load', "graph has no edges; path and spectral metrics are degenerate")
     
-    print("\n1. Analyzing degree distribution...")
-    percentiles = analyze_degree_distribution(G, output_folder)
-    
-    print("\n2. Calculating centrality metrics...")
-    centrality_metrics = calculate_centrality_metrics(G)
-    
-    print("\n3. Performing multivariate analysis...")
-    df_centrality = multivariate_centrality_analysis(centrality_metrics, output_folder)
+    print("\n1. Calculating centrality metrics...")
+    # Resultados já calculados para o mesmo grafo são lidos do store em disco
+    store = CentralityStore()
+    with profiler.stage('centrality', G, workers=workers, approximate=options.approximate):
+        centrality_metrics = calculate_centrality_metrics(
+            G, workers=workers, approximate=options.approximate, approx_k=options.approx_k,
+            epsilon=options.epsilon, top_n=options.top_n, store=store, profiler=profiler,
+            weighted=options.weighted
+        )
     
+    print("\n2. K-core / k-shell decomposition...")
+    with profiler.stage('kcore', G):
+        coreness, shell_summary = kcore_analysis(G, centrality_metrics, output_folder, store=store)
+
+    print("\n3. Community detection (Louvain consensus)...")
+    with profiler.stage('communities', G, runs=options.community_runs, workers=workers):
+        communities, community_info = community_analysis(G, resolution=options.resolution,
+                                                         runs=options.community_runs,
+                                                         workers=workers, store=store)
+
     print("\n4. Identifying central and peripheral nodes...")
-    central_nodes, peripheral_nodes, combined_scores = identify_peripheral_and_central_nodes(
-        G, centrality_metrics, top_n=10
-    )
+    with profiler.stage('ranking', G, method=options.score_method):
+        central_nodes, peripheral_nodes, combined_scores = identify_peripheral_and_central_nodes(
+            G, centrality_metrics, top_n=options.top_n, method=options.score_method
+        )
+
+    # Todas as métricas por nó numa tabela colunar (nova parte do dataset a cada execução)
+    with profiler.stage('metrics_export', G, format=options.metrics_format):
+        metrics_file = export_node_metrics(G, centrality_metrics, options.metrics_dataset,
+                                           combined_scores, source=file_path,
+                                           run_id=options.run_id, fmt=options.metrics_format)
+    if options.metrics_format not in (None, 'csv') and metrics_file.endswith('.csv'):
+        profiler.fallback('metrics_export', "pyarrow is not installed; written as CSV")
+
+    if options.knockout:
+        print(f"\nKnockout scan ({options.knockout})...")
+        with profiler.stage('knockout', G, mode=options.knockout, workers=workers):
+            robustness_scan(G, centrality_metrics, combined_scores, output_folder,
+                            top_k=options.knockout_top, mode=options.knockout, workers=workers,
+                            top_n=options.top_n)
     
-    print("\n5. Visualizing the network...")
-    visualize_network_with_centrality(G, combined_scores, central_nodes, peripheral_nodes, output_folder)
+    # As figuras são independentes: renderizadas em paralelo e reaproveitadas se nada mudou
+    print("\n5. Rendering figures (degree distribution, multivariate analysis, network, k-shells)...")
+    # O layout das duas redes é calculado uma vez e gravado no store antes do pool
+    layout = partial(compute_layout, G, store=store)
+    with profiler.stage('figures', G, workers=workers) as stage:
+        figures, timings = render_figures([
+            FigureJob('degree_distribution', analyze_degree_distribution, (G,)),
+            FigureJob('multivariate_analysis', multivariate_centrality_analysis, (centrality_metrics,)),
+            FigureJob('network_visualization', visualize_network_with_centrality,
+                      (G, combined_scores, central_nodes, peripheral_nodes),
+                      {'store': store, 'lod': options.render_lod, 'max_edges': options.max_edges,
+                       'density': options.density_raster}, prepare=layout),
+            FigureJob('kshell_network', visualize_k_shells, (G, coreness),
+                      {'store': store, 'max_edges': options.max_edges}, prepare=layout),
+        ], output_folder, workers=workers)
+        # Cada figura roda num processo do pool: entra no registro pelo tempo medido lá
+        for name, seconds in timings.items():
+            profiler.record(f'figure:{name}', seconds or 0.0, start_us=stage['start_us'],
+                            cached=seconds is None)
+    percentiles = figures['degree_distribution']
+    network = figures['network_visualization'] or {}
+    if network.get('fallback'):
+        profiler.fallback('network_visualization', "simplified visualization",
+                          error=network['fallback'])
+
+    if options.viewer_bundle:
+        # Pacote compacto para o visualizador sigma.js (mesmo layout das figuras, lido do store)
+        with profiler.stage('viewer_bundle', G):
+            export_graph_bundle(G, compute_layout(G, store=store),
+                                os.path.join(output_folder, 'viewer'))
+
+    if options.path_index:
+        # Índice de distâncias para consultas de caminhos (src/path_index.py --index-dir ...)
+        # e os resíduos nos caminhos mínimos entre os nós centrais
+        with profiler.stage('path_index', G):
+            index = PathIndex.for_graph(G, os.path.join(output_folder, 'path_index'))
+            hubs = [node for node, _ in central_nodes]
+            index.path_overlap(hubs, hubs).to_csv(os.path.join(output_folder, 'central_paths.csv'),
+                                                  index=False)
+        print(f"Built {index.describe()}")
     
     print("\n=== ANALYSIS COMPLETED ===")
     print(f"Degree distribution percentiles: 25%={percentiles[0]:.1f}, 50%={percentiles[1]:.1f}, 75%={percentiles[2]:.1f}")
 
+    path_metrics = G.graph.get('path_metrics', {})
+    return {
+        'nodes': G.number_of_nodes(),
+        'edges': G.number_of_edges(),
+        'diameter': path_metrics.get('diameter'),
+        'radius': path_metrics.get('radius'),
+        'degeneracy': max(coreness.values(), default=0),
+        'communities': community_info['communities'],
+        'modularity': community_info['modularity'],
+        'top_central_node': central_nodes[0][0] if central_nodes else None,
+        'median_degree': percentiles[1],
+        'metrics_file': metrics_file,
+        'fallbacks': len(profiler.fallbacks),
+        'seconds': time.perf_counter() - start_time,
+    }
+
+# Extensões aceitas pela linha de comando
+INPUT_EXTENSIONS = ('.gexf',) + STRUCTURE_EXTENSIONS
+
+def collect_inputs(patterns, manifest=None):
+    """Arquivos de entrada a partir de caminhos, globs, pastas e/ou de um manifesto (um por linha)"""
+    entries = list(patterns or [])
+    if manifest:
+        with open(manifest, encoding='utf-8') as f:
+            base = os.path.dirname(os.path.abspath(manifest))
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    entries.append(line if os.path.isabs(line) else os.path.join(base, line))
+
+    files = []
+    for entry in entries:
+        if os.path.isdir(entry):
+            matches = sorted(os.path.join(entry, f) for f in os.listdir(entry)
+                             if f.lower().endswith(INPUT_EXTENSIONS))
+        else:
+            matches = sorted(glob.glob(entry)) or [entry]
+        for path in matches:
+            if path not in files:
+                files.append(path)
+    return files
+
+def _output_names(files):
+    """Nome de pasta de saída por arquivo (nome do arquivo sem extensão, sem colisões)"""
+    names, seen = [], {}
+    for path in files:
+        stem = os.path.splitext(os.path.basename(path))[0] or 'graph'
+        seen[stem] = seen.get(stem, 0) + 1
+        names.append(stem if seen[stem] == 1 else f"{stem}_{seen[stem]}")
+    return names
+
+def _limit_memory(budget_mb):
+    """Limita o espaço de endereçamento do processo (o grafo que estourar falha sozinho)"""
+    if not budget_mb:
+        return
+    try:
+        import resource
+    except ImportError:
+        print("Memory budget is not supported on this platform; ignoring it.")
+        return
+    limit = int(budget_mb * 1024 ** 2)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _available_memory_mb():
+    """Memória física total em MB (None quando o sistema não informa)"""
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def _run_one(file_path, output_folder, options, capture):
+    """Executa analyze_graph e converte o resultado em linha do resumo (erros viram status)"""
+    row = {'input': file_path, 'output': output_folder, 'status': 'ok', 'error': ''}
+    os.makedirs(output_folder, exist_ok=True)
+    log = open(os.path.join(output_folder, 'log.txt'), 'w', encoding='utf-8') if capture else None
+    try:
+        with contextlib.redirect_stdout(log) if capture else contextlib.nullcontext():
+            row.update(analyze_graph(file_path, output_folder, options))
+    except MemoryError:
+        row.update(status='failed', error='memory budget exceeded')
+    except Exception as e:
+        row.update(status='failed', error=f"{type(e).__name__}: {e}")
+    finally:
+        if log is not None:
+            log.close()
+    return row
+
+def _init_batch_worker(budget_mb):
+    """Inicializador do pool de grafos: backend sem janela e limite de memória"""
+    plt.switch_backend('Agg')
+    _limit_memory(budget_mb)
+
+def _failed_row(file_path, output_folder, error):
+    """Linha do resumo para um grafo cujo processo morreu (ex.: OOM killer)"""
+    return {'input': file_path, 'output': output_folder, 'status': 'failed',
+            'error': f"{type(error).__name__}: {error}"}
+
+def _run_limited(file_path, output_folder, options):
+    """_run_one num processo próprio com o limite de memória (execução sequencial com --memory-budget)
+
+    O limite não é aplicado ao processo principal: o grafo que estourar falha
+    sozinho e os seguintes começam com um processo novo.
+    """
+    with ProcessPoolExecutor(max_workers=1, initializer=_init_batch_worker,
+                             initargs=(options.memory_budget,)) as pool:
+        try:
+            return pool.submit(_run_one, file_path, output_folder, options, False).result()
+        except Exception as e:
+            return _failed_row(file_path, output_folder, e)
+
+def run_batch(files, output_root, options):
+    """Processa vários grafos num pool, do maior para o menor arquivo; devolve a tabela de resumo"""
+    names = _output_names(files)
+    sizes = [os.path.getsize(f) if os.path.exists(f) else 0 for f in files]
+    # Maior primeiro (LPT): os grafos caros começam cedo e o tempo total diminui
+    order = sorted(range(len(files)), key=lambda i: sizes[i], reverse=True)
+
+    jobs = min(options.jobs or resolve_workers(None), len(files))
+    total_mb = _available_memory_mb()
+    if options.memory_budget and total_mb:
+        jobs = max(1, min(jobs, int(total_mb // options.memory_budget)))
+
+    rows = [None] * len(files)
+    if jobs == 1:
+        if options.memory_budget:
+            print(f"Memory budget: {options.memory_budget:g} MB per graph (one process per graph)")
+        for i in order:
+            print(f"\n##### [{order.index(i) + 1}/{len(files)}] {files[i]} #####")
+            output = os.path.join(output_root, names[i])
+            if options.memory_budget:
+                rows[i] = _run_limited(files[i], output, options)
+            else:
+                rows[i] = _run_one(files[i], output, options, capture=False)
+    else:
+        # Processos por grafo: os núcleos são divididos entre os grafos simultâneos
+        if options.workers is None:
+            options.workers = max(1, resolve_workers(None) // jobs)
+        print(f"Scheduling {len(files)} graphs on {jobs} processes "
+              f"({options.workers} worker(s) each), largest first")
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_batch_worker,
+                                 initargs=(options.memory_budget,)) as pool:
+            futures = {pool.submit(_run_one, files[i], os.path.join(output_root, names[i]),
+                                   options, True): i for i in order}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    rows[i] = future.result()
+                except Exception as e:  # processo do pool morreu (ex.: OOM killer)
+                    rows[i] = _failed_row(files[i], os.path.join(output_root, names[i]), e)
+                print(f"   {rows[i]['status']:>6}  {files[i]}"
+                      + (f"  ({rows[i]['error']})" if rows[i]['error'] else ''))
+
+    summary = pd.DataFrame(rows)
+    summary.to_csv(os.path.join(output_root, 'batch_summary.csv'), index=False)
+    return summary
+
+def parse_args(argv=None):
+    """Argumentos da linha de comando"""
+    parser = argparse.ArgumentParser(
+        description="Centrality, k-core and community analysis of residue interaction networks "
+                    "(GEXF, PDB or mmCIF). Several inputs are processed in a process pool.")
+    parser.add_argument('inputs', nargs='*',
+                        help="graph files, folders or glob patterns (default: files in the current folder)")
+    parser.add_argument('--manifest', help="text file with one input path per line")
+    parser.add_argument('-o', '--output', help="output root folder (default: timestamped folder)")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="graphs processed at the same time (default: number of CPUs)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="processes used inside each graph (default: CPUs divided among jobs)")
+    parser.add_argument('--memory-budget', type=float, default=None, metavar='MB',
+                        help="address-space limit per graph process, in MB")
+    parser.add_argument('--top-n', type=int, default=10, help="central/peripheral nodes reported")
+    parser.add_argument('--approximate', action='store_true',
+                        help="estimate closeness/betweenness by pivot sampling")
+    parser.add_argument('--approx-k', type=int, default=None, help="number of pivots")
+    parser.add_argument('--epsilon', type=float, default=None,
+                        help="target additive error for the pivot sample size")
+    parser.add_argument('--weighted', action='store_true',
+                        help="weighted shortest paths: parallel interactions of a residue pair are "
+                             "merged into one edge cost (Dijkstra closeness/betweenness)")
+    parser.add_argument('--interaction-weight', action='append', metavar='TYPE=WEIGHT',
+                        help="override the strength of an interaction type in weighted mode "
+                             "(e.g. HBOND=20); repeatable")
+    parser.add_argument('--edge-cost', choices=COST_MODES, default='strength',
+                        help="weighted mode edge cost: 1/summed interaction strength, or the "
+                             "shortest contact Distance divided by it")
+    parser.add_argument('--score-method', choices=SCORE_METHODS, default='mean',
+                        help="combined score: mean of raw metric values, of percentile ranks or of "
+                             "z-scores")
+    parser.add_argument('--resolution', type=float, default=1.0, help="modularity resolution")
+    parser.add_argument('--community-runs', type=int, default=8,
+                        help="Louvain runs (seeds) combined in the consensus partition")
+    parser.add_argument('--knockout', choices=('single', 'cumulative'), default=None,
+                        help="run the in-silico residue knockout scan")
+    parser.add_argument('--knockout-top', type=int, default=None,
+                        help="only knock out the K highest-scoring residues")
+    parser.add_argument('--metrics-dataset', metavar='DIR', default=None,
+                        help="folder where node metric tables are appended "
+                             "(default: <output>/node_metrics)")
+    parser.add_argument('--metrics-format', choices=('feather', 'parquet', 'csv'), default=None,
+                        help="node metrics table format (default: feather, or csv without pyarrow)")
+    parser.add_argument('--render-lod', choices=LOD_MODES, default='auto',
+                        help="network figure level of detail: all edges, sampled edges, edge density "
+                             "raster or community super-nodes (default: chosen by graph size)")
+    parser.add_argument('--max-edges', type=int, default=FULL_DETAIL_MAX_EDGES,
+                        help="edges drawn at full detail before sampling/aggregation")
+    parser.add_argument('--density-raster', action='store_true',
+                        help="also write network_density.png (edge count per pixel)")
+    parser.add_argument('--viewer-bundle', action='store_true',
+                        help="write a compact sigma.js viewer bundle to <output>/<graph>/viewer")
+    parser.add_argument('--path-index', action='store_true',
+                        help="build a hop-distance index in <output>/<graph>/path_index and write "
+                             "central_paths.csv (residues on shortest paths between central nodes)")
+    parser.add_argument('--trajectory', action='store_true',
+                        help="treat each input as a multi-model trajectory")
+    parser.add_argument('--cprofile', action='store_true',
+                        help="also dump a cProfile file per pipeline stage to <output>/<graph>/cprofile")
+    options = parser.parse_args(argv)
+    if options.community_runs < 1:
+        parser.error("--community-runs must be at least 1")
+    return options
+
+def main(argv=None):
+    """Função principal: devolve o código de saída (0 = sucesso, 1 = algum grafo falhou, 2 = sem entrada)"""
+    options = parse_args(argv)
+    print("=== NETWORK ANALYSIS - REQUIREMENT 3 ===\n")
+
+    if options.inputs or options.manifest:
+        files = collect_inputs(options.inputs, options.manifest)
+    else:
+        # Sem argumentos: arquivos GEXF da pasta atual (ou, na falta deles, estruturas PDB/mmCIF)
+        files = collect_inputs(['.'])
+        gexf_files = [f for f in files if f.endswith('.gexf')]
+        files = gexf_files or files
+    if not files:
+        print("Error: no input graph found. Pass GEXF/PDB/mmCIF files, a folder, a glob "
+              "or --manifest (see --help).", file=sys.stderr)
+        return 2
+    missing = [f for f in files if not os.path.exists(f)]
+    for f in missing:
+        print(f"Warning: input not found: {f}", file=sys.stderr)
+
+    # Cria uma pasta única para cada execução com timestamp
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_root = options.output or f"network_analysis_results_{timestamp}"
+    os.makedirs(output_root, exist_ok=True)
+    options.metrics_dataset = options.metrics_dataset or os.path.join(output_root, 'node_metrics')
+    options.run_id = timestamp
+    print(f"Results will be saved in: '{output_root}'")
+    print(f"Inputs ({len(files)}): {files}")
+
+    summary = run_batch(files, output_root, options)
+
+    failed = summary[summary['status'] != 'ok']
+    print(f"\n=== BATCH COMPLETED: {len(summary) - len(failed)} ok, {len(failed)} failed ===")
+    print(f"Summary table: {os.path.join(output_root, 'batch_summary.csv')}")
+    for row in failed.itertuples():
+        print(f"   FAILED {row.input}: {row.error}", file=sys.stderr)
+    return 1 if len(failed) else 0
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
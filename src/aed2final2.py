@@ -11,38 +11,33 @@ import networkx as nx
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
-import tempfile
+import argparse
 import os
+from functools import partial
 
-# Config: pasta para salvar figuras
-output_dir = 'figures'
-os.makedirs(output_dir, exist_ok=True)
-
-# Preprocess GEXF to handle empty numeric attributes
-orig_path = 'final_netwokr.gexf'  # ajuste o caminho se necessário
-with open(orig_path, 'r', encoding='utf-8') as f:
-    data = f.read()
-# substitute empty attribute values by zero (ou outro default)
-cleaned = data.replace('value=""', 'value="0"')
-# write to temp file
-tmp = tempfile.NamedTemporaryFile('w', delete=False, suffix='.gexf', encoding='utf-8')
-tmp.write(cleaned)
-tmp_path = tmp.name
-tmp.close()
+from aed2 import load_gexf_file
+from density import DensityGrid, kde_plot, pair_kde, pair_kde_fill, pair_scatter
+from centrality_engine import betweenness_centrality
+from spectral_engine import SpectralBackend
 
-# Load the cleaned graph
-G = nx.read_gexf(tmp_path)
-# remove temp file
-os.unlink(tmp_path)
+# Config: grafo de entrada e pasta para salvar figuras (linha de comando)
+parser = argparse.ArgumentParser(description="Degree PDF/CDF and metric PairGrid figures")
+parser.add_argument('gexf', nargs='?', default='final_netwokr.gexf', help="input GEXF file")
+parser.add_argument('-o', '--output', default='figures', help="folder for the figures")
+args = parser.parse_args()
+output_dir = args.output
+os.makedirs(output_dir, exist_ok=True)
 
-# If multigraph, convert to simple Graph (merge parallel edges)
-if G.is_multigraph():
-    G = nx.Graph(G)
+# Carrega o grafo em uma única passada (atributos vazios são descartados
+# durante o parse, sem cópia temporária do arquivo)
+G = load_gexf_file(args.gexf)
+if G is None:
+    raise SystemExit(1)
 
 # Compute node-level metrics
 degree_dict = dict(G.degree())
-betweenness_dict = nx.betweenness_centrality(G)
-eigenvector_dict = nx.eigenvector_centrality(G, max_iter=1000)
+betweenness_dict = betweenness_centrality(G)
+eigenvector_dict, _ = SpectralBackend(G).eigenvector(max_iter=1000)
 closeness_dict = nx.closeness_centrality(G)
 
 # Build a DataFrame
@@ -60,7 +55,9 @@ sns.histplot(degrees, bins=10, color='skyblue', edgecolor='black', ax=ax1, label
 ax1.set_xlabel('Degree')
 ax1.set_ylabel('Count')
 ax2 = ax1.twinx()
-sns.kdeplot(degrees, ax=ax2, color='red', lw=2, label='PDF')
+# Grades de densidade por métrica (binning + FFT), reaproveitadas pela PairGrid abaixo
+grid = DensityGrid(df)
+kde_plot(ax2, grid['Degree'], color='red', linewidth=2, label='PDF')
 ax2.set_ylabel('Probability')
 ax1.legend(loc='upper left')
 ax2.legend(loc='upper right')
@@ -89,9 +86,9 @@ plt.show()
 # 3) PairGrid of all metrics
 sns.set(style='whitegrid')
 g = sns.PairGrid(df, diag_sharey=False)
-g.map_upper(sns.scatterplot, s=40, color='tomato', edgecolor='white')
-g.map_lower(sns.kdeplot, cmap='Reds_r', fill=True)
-g.map_diag(sns.kdeplot, lw=2, legend=False)
+g.map_upper(partial(pair_scatter, grid=grid), s=40, color='tomato', edgecolor='white')
+g.map_lower(partial(pair_kde_fill, grid=grid), cmap='Reds_r')
+g.map_diag(partial(pair_kde, grid=grid), linewidth=2, legend=False)
 g.fig.suptitle('Pairwise Relationships of Network Metrics', y=1.02)
 plt.tight_layout()
 # Salvar figura
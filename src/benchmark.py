@@ -0,0 +1,309 @@
+"""Benchmark reprodutível das etapas da análise sobre redes sintéticas com estatísticas de resíduos"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import networkx as nx
+from scipy.signal import lfilter
+from scipy.spatial import cKDTree
+
+from instrumentation import PeakSampler
+
+# Distância CA-CA consecutiva (Å) e volume médio por resíduo numa proteína globular (Å^3)
+CA_STEP = 3.8
+RESIDUE_VOLUME = 110.0
+
+RESIDUE_NAMES = ['ALA', 'ARG', 'ASN', 'ASP', 'CYS', 'GLN', 'GLU', 'GLY', 'HIS', 'ILE',
+                 'LEU', 'LYS', 'MET', 'PHE', 'PRO', 'SER', 'THR', 'TRP', 'TYR', 'VAL']
+
+DEFAULT_SIZES = ('1k', '10k', '100k')
+
+# Acima deste número de nós closeness/betweenness são estimadas por pivôs (o exato é O(n*m))
+EXACT_MAX_NODES = 5000
+
+# Etapas na ordem em que main() as executa (shortest_paths vira approximate_paths em grafos grandes)
+STAGES = ('load', 'load_cached', 'degree_distribution', 'degree', 'shortest_paths', 'eigenvector',
+          'pagerank', 'kcore', 'communities', 'top_n', 'multivariate_analysis', 'layout',
+          'network_plot')
+
+# Etapas que podem ser puladas (nenhuma outra depende delas)
+OPTIONAL_STAGES = ('load_cached', 'degree_distribution', 'kcore', 'communities',
+                   'multivariate_analysis', 'layout', 'network_plot')
+
+def parse_size(text):
+    """'1k', '250k', '1M' ou inteiro -> número de nós"""
+    text = str(text).strip()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:].lower(), 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+def _backbone(length, box, rng, persistence=0.6):
+    """Cadeia com passo CA-CA fixo e direção persistente (AR(1)), dobrada por reflexão na caixa
+
+    A reflexão (onda triangular) preserva a distância entre resíduos consecutivos,
+    então tudo é vetorizado sem laço por resíduo.
+    """
+    noise = rng.normal(size=(length, 3))
+    direction = lfilter([1.0], [1.0, -persistence], noise, axis=0)
+    steps = CA_STEP * direction / np.linalg.norm(direction, axis=1, keepdims=True)
+    steps[0] = rng.random(3) * box
+    points = np.cumsum(steps, axis=0)
+    return box - np.abs(np.mod(points, 2 * box) - box)
+
+def _contact_radius(tree, points, target, rng, samples=2000):
+    """Raio de contato que dá em média `target` vizinhos por resíduo (bisseção numa amostra)"""
+    sample = points[rng.choice(len(points), size=min(samples, len(points)), replace=False)]
+    lo, hi = CA_STEP, 4 * CA_STEP
+    for _ in range(30):
+        mid = (lo + hi) / 2
+        mean = (tree.query_ball_point(sample, mid, return_length=True) - 1).mean()
+        lo, hi = (mid, hi) if mean < target else (lo, mid)
+    return (lo + hi) / 2
+
+def residue_like_graph(n, degree=6.0, chain_length=1000, seed=0):
+    """Grafo geométrico 3D com cadeias de resíduos: backbone (i, i+1) e contatos por distância
+
+    Os resíduos seguem cadeias com passo de 3,8 Å numa caixa com a densidade de
+    uma proteína globular; o raio de contato é calibrado para o grau médio
+    `degree`. Os nós têm ids e atributos no formato do RING (Chain, Position,
+    Residue, x, y, z).
+    """
+    rng = np.random.default_rng(seed)
+    box = (n * RESIDUE_VOLUME) ** (1 / 3)
+    lengths = [min(chain_length, n - start) for start in range(0, n, chain_length)]
+    points = np.vstack([_backbone(length, box, rng) for length in lengths])
+    chain = np.repeat(np.arange(len(lengths)), lengths)
+    position = np.concatenate([np.arange(1, length + 1) for length in lengths])
+
+    tree = cKDTree(points)
+    radius = _contact_radius(tree, points, degree, rng)
+    pairs = tree.query_pairs(radius, output_type='ndarray')
+    same_chain = chain[:-1] == chain[1:]
+    backbone = np.flatnonzero(same_chain)
+    pairs = np.unique(np.vstack([pairs, np.column_stack([backbone, backbone + 1])]), axis=0)
+
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    chain_ids = [letters[c % 26] + (str(c // 26) if c >= 26 else '') for c in range(len(lengths))]
+    residues = rng.choice(RESIDUE_NAMES, size=n)
+    ids = [f"{chain_ids[c]}:{p}:_:{r}" for c, p, r in zip(chain.tolist(), position.tolist(), residues)]
+
+    G = nx.Graph()
+    G.add_nodes_from((ids[i], {'Chain': chain_ids[chain[i]], 'Position': int(position[i]),
+                               'Residue': str(residues[i]), 'x': float(points[i, 0]),
+                               'y': float(points[i, 1]), 'z': float(points[i, 2])})
+                     for i in range(n))
+    G.add_edges_from((ids[a], ids[b]) for a, b in pairs.tolist())
+    return G
+
+class StageTimer:
+    """Tempo e pico de memória residente de cada etapa (RSS amostrado numa thread)"""
+
+    def __init__(self, interval=0.01, quiet=True):
+        self.interval = interval
+        self.quiet = quiet
+        self.stages = {}
+
+    def run(self, name, func, *args, **kwargs):
+        """Executa func(*args, **kwargs) como a etapa `name` e devolve o resultado"""
+        start = time.perf_counter()
+        sampler = PeakSampler(self.interval)
+        try:
+            # A saída das etapas é descartada para não misturar com a tabela de tempos
+            with sampler, open(os.devnull, 'w') as sink, \
+                    contextlib.redirect_stdout(sink if self.quiet else sys.stdout):
+                return func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            self.stages[name] = {'seconds': seconds, 'peak_rss_mb': sampler.peak,
+                                 'rss_delta_mb': sampler.peak - sampler.start}
+            print(f"   {name:<22} {seconds:9.3f} s  peak {sampler.peak:8.1f} MB")
+
+def run_size(n, options):
+    """Gera o grafo de n nós e mede cada etapa da análise; devolve o resultado do tamanho"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import aed2
+    from centrality_engine import approximate_centralities, shortest_path_centralities
+    from centrality_store import CentralityStore
+    from graph_csr import get_csr
+    from layout_engine import compute_layout
+    from spectral_engine import SpectralBackend
+
+    workdir = tempfile.mkdtemp(prefix=f'benchmark_{n}_')
+    try:
+        print(f"\n=== {n} nodes ===")
+        start = time.perf_counter()
+        G = residue_like_graph(n, options.degree, options.chain_length, options.seed)
+        path = os.path.join(workdir, f'synthetic_{n}.gexf')
+        nx.write_gexf(G, path)
+        print(f"   generated {G.number_of_nodes()} nodes / {G.number_of_edges()} edges "
+              f"in {time.perf_counter() - start:.1f} s")
+        del G
+
+        skip = set(options.skip or ())
+        timer = StageTimer(quiet=not options.verbose)
+        stage = lambda name, func, *args, **kwargs: \
+            None if name in skip else timer.run(name, func, *args, **kwargs)
+        store = CentralityStore(root=os.path.join(workdir, 'store'))
+        out = os.path.join(workdir, 'figures')
+        os.makedirs(out)
+        workers = options.workers
+
+        G = timer.run('load', aed2.load_network, path)
+        stage('load_cached', aed2.load_network, path)
+        get_csr(G)
+        stage('degree_distribution', aed2.analyze_degree_distribution, G, out)
+
+        metrics = {'degree': timer.run('degree', nx.degree_centrality, G)}
+        exact = G.number_of_nodes() <= options.exact_max_nodes
+        if exact:
+            paths, _ = timer.run('shortest_paths', shortest_path_centralities, G, workers=workers)
+        else:
+            paths, _, _ = timer.run('approximate_paths', approximate_centralities, G,
+                                    k=options.approx_k, workers=workers)
+        metrics['closeness'], metrics['betweenness'] = paths['closeness'], paths['betweenness']
+        spectral = SpectralBackend(G)
+        metrics['eigenvector'] = timer.run('eigenvector', spectral.eigenvector)[0]
+        metrics['pagerank'] = timer.run('pagerank', spectral.pagerank)[0]
+
+        stage('kcore', aed2.kcore_analysis, G, metrics, out, store)
+        stage('communities', aed2.community_analysis, G, runs=options.community_runs,
+              workers=workers, store=store)
+        central, peripheral, scores = timer.run('top_n', aed2.identify_peripheral_and_central_nodes,
+                                                G, metrics, top_n=10)
+        stage('multivariate_analysis', aed2.multivariate_centrality_analysis, metrics, out)
+        stage('layout', compute_layout, G, store=store)
+        stage('network_plot', aed2.visualize_network_with_centrality, G, scores, central, peripheral,
+              out, store=store)
+
+        return {'size': n, 'nodes': G.number_of_nodes(), 'edges': G.number_of_edges(),
+                'average_degree': 2 * G.number_of_edges() / max(G.number_of_nodes(), 1),
+                'exact_paths': exact, 'stages': timer.stages}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def _best_of(runs):
+    """Combina repetições: menor tempo e menor pico de memória de cada etapa"""
+    best = dict(runs[0], stages={})
+    for name in runs[0]['stages']:
+        values = [run['stages'][name] for run in runs if name in run['stages']]
+        best['stages'][name] = {key: min(v[key] for v in values) for key in values[0]}
+    best['repeats'] = len(runs)
+    return best
+
+def run_benchmark(sizes, options):
+    """Cada tamanho (e repetição) num processo novo: a memória de uma medida não afeta a seguinte"""
+    results = []
+    for n in sizes:
+        runs = []
+        for _ in range(options.repeat):
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                runs.append(pool.submit(run_size, n, options).result())
+        results.append(_best_of(runs))
+    return results
+
+def environment():
+    """Versões e máquina: resultados só são comparáveis no mesmo ambiente"""
+    import scipy
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'networkx': nx.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+def compare(results, baseline, threshold=0.10, min_seconds=0.05, min_mb=16.0):
+    """Etapas que ficaram mais lentas (ou gastaram mais memória) que o baseline além do limiar
+
+    Diferenças absolutas menores que min_seconds / min_mb são ignoradas (ruído de
+    medida em etapas curtas). Devolve uma linha por regressão.
+    """
+    previous = {r['size']: r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        base = previous.get(result['size'])
+        if base is None:
+            continue
+        for name, current in result['stages'].items():
+            old = base['stages'].get(name)
+            if old is None:
+                continue
+            for key, floor in (('seconds', min_seconds), ('peak_rss_mb', min_mb)):
+                if current[key] > old[key] * (1 + threshold) and current[key] - old[key] > floor:
+                    regressions.append({'size': result['size'], 'stage': name, 'metric': key,
+                                        'baseline': old[key], 'current': current[key],
+                                        'ratio': current[key] / old[key] if old[key] else float('inf')})
+    return regressions
+
+def print_comparison(results, baseline):
+    """Tabela etapa x tamanho com a razão de tempo em relação ao baseline"""
+    previous = {r['size']: r for r in baseline.get('results', [])}
+    for result in results:
+        base = previous.get(result['size'], {'stages': {}})
+        print(f"\n{result['size']} nodes ({result['edges']} edges)")
+        for name, current in result['stages'].items():
+            old = base['stages'].get(name)
+            ratio = f"{current['seconds'] / old['seconds']:6.2f}x" if old and old['seconds'] else '      -'
+            print(f"   {name:<22} {current['seconds']:9.3f} s  {ratio}  "
+                  f"peak {current['peak_rss_mb']:8.1f} MB")
+
+def parse_args(argv=None):
+    """Argumentos da linha de comando"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the analysis stages on synthetic residue-like networks")
+    parser.add_argument('--sizes', nargs='+', default=list(DEFAULT_SIZES),
+                        help="graph sizes in nodes, e.g. 1k 10k 100k 1M (default: 1k 10k 100k)")
+    parser.add_argument('--degree', type=float, default=6.0, help="target average degree (3-8)")
+    parser.add_argument('--chain-length', type=int, default=1000, help="residues per chain")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help="runs per size (best time is kept)")
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    parser.add_argument('--exact-max-nodes', type=int, default=EXACT_MAX_NODES,
+                        help="largest graph with exact closeness/betweenness (pivots above)")
+    parser.add_argument('--approx-k', type=int, default=None, help="pivots for the approximate mode")
+    parser.add_argument('--community-runs', type=int, default=8)
+    parser.add_argument('--skip', nargs='*', choices=OPTIONAL_STAGES, help="stages not measured")
+    parser.add_argument('-v', '--verbose', action='store_true', help="show the output of each stage")
+    parser.add_argument('-o', '--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="earlier results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="allowed slowdown / memory growth before a stage counts as a regression")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Roda o benchmark; código de saída 1 quando há regressões em relação ao baseline"""
+    options = parse_args(argv)
+    sizes = [parse_size(size) for size in options.sizes]
+    results = run_benchmark(sizes, options)
+    report = {'environment': environment(), 'options': vars(options), 'results': results}
+    with open(options.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to '{options.output}'")
+
+    if not options.baseline:
+        return 0
+    with open(options.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print_comparison(results, baseline)
+    regressions = compare(results, baseline, options.threshold)
+    for r in regressions:
+        print(f"REGRESSION {r['size']} nodes / {r['stage']}: {r['metric']} "
+              f"{r['baseline']:.3f} -> {r['current']:.3f} ({r['ratio']:.2f}x)", file=sys.stderr)
+    if not regressions:
+        print(f"No regressions above {options.threshold:.0%} against '{options.baseline}'")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
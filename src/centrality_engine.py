@@ -0,0 +1,550 @@
+"""Motor de centralidades baseadas em caminhos mínimos sobre a adjacência CSR"""
+
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from graph_csr import _build_csr, get_csr
+
+# Abaixo deste número de nós o custo de criar o pool supera o ganho
+MIN_NODES_FOR_POOL = 200
+
+# Estado de cada processo do pool (preenchido por _init_worker)
+_WORKER = {}
+
+class SharedCSR:
+    """Copia indptr/indices (e os custos das arestas, se houver) para memória compartilhada"""
+
+    def __init__(self, csr, costs=None):
+        self.blocks = []
+        self.spec = {}
+        arrays = {'indptr': csr.indptr, 'indices': csr.indices}
+        if costs is not None:
+            arrays['costs'] = costs
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+            self.blocks.append(shm)
+            self.spec[name] = (shm.name, array.shape, array.dtype.str)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+
+def _attach(spec):
+    """Anexa os blocos compartilhados e devolve (blocos, arrays)"""
+    blocks, arrays = [], {}
+    for name, (shm_name, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        blocks.append(shm)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    return blocks, arrays
+
+def _adjacency(indptr, indices):
+    """Listas de vizinhos por nó (acesso escalar rápido no laço da BFS)"""
+    indptr = indptr.tolist()
+    indices = indices.tolist()
+    return [indices[indptr[i]:indptr[i + 1]] for i in range(len(indptr) - 1)]
+
+def _init_worker(spec):
+    """Inicializador do pool: anexa a CSR compartilhada uma única vez por processo
+
+    A BFS em Python puro indexa listas bem mais rápido que arrays NumPy, então
+    cada processo converte a CSR em listas próprias (_adjacency), cerca de
+    36 bytes por entrada de indices. A memória compartilhada evita serializar o
+    grafo para cada worker, mas não o custo O(m) dessa cópia por processo.
+    """
+    blocks, arrays = _attach(spec)
+    _WORKER['blocks'] = blocks
+    _WORKER['adj'] = _adjacency(arrays['indptr'], arrays['indices'])
+    if 'costs' in arrays:
+        # Custos por vizinho, alinhados com as listas de adjacência
+        _WORKER['costs'] = _adjacency(arrays['indptr'], arrays['costs'])
+
+def bfs_counts(adj, s, dist, sigma):
+    """BFS a partir de `s` contando caminhos mínimos; devolve os nós na ordem de visita"""
+    dist[s] = 0
+    sigma[s] = 1.0
+    order = [s]  # ordem da BFS, também usada como fila
+    i = 0
+    while i < len(order):
+        v = order[i]
+        i += 1
+        next_dist = dist[v] + 1
+        sigma_v = sigma[v]
+        for w in adj[v]:
+            if dist[w] < 0:
+                dist[w] = next_dist
+                sigma[w] = sigma_v
+                order.append(w)
+            elif dist[w] == next_dist:
+                sigma[w] += sigma_v
+    return order
+
+def brandes_dependencies(adj, order, dist, sigma, delta):
+    """Acumulação reversa de Brandes: predecessores são os vizinhos um nível acima"""
+    for w in reversed(order):
+        coeff = (1.0 + delta[w]) / sigma[w]
+        pred_dist = dist[w] - 1
+        for v in adj[w]:
+            if dist[v] == pred_dist:
+                delta[v] += sigma[v] * coeff
+
+def sweep_buffers(n):
+    """Buffers de BFS (dist, sigma, delta) no estado limpo esperado por _fused_sweep"""
+    return [-1] * n, [0.0] * n, [0.0] * n
+
+def _fused_sweep(adj, sources, buffers=None):
+    """Uma BFS por fonte acumulando betweenness, distâncias, harmônica, excentricidade e alcance
+
+    Devolve um array (5, n): a linha 0 soma dependências nos nós intermediários;
+    as demais só são preenchidas nas posições das fontes processadas, de modo que
+    os resultados parciais de fatias disjuntas podem ser somados diretamente.
+    `buffers` (de sweep_buffers) permite reaproveitar as listas entre chamadas:
+    elas voltam ao estado limpo ao fim de cada fonte.
+    """
+    n = len(adj)
+    betweenness = [0.0] * n
+    dist_total = [0.0] * n
+    harmonic = [0.0] * n
+    eccentricity = [0.0] * n
+    reach = [0.0] * n
+    # Buffers reaproveitados entre fontes; só os nós visitados são zerados
+    dist, sigma, delta = buffers if buffers is not None else sweep_buffers(n)
+
+    for s in sources:
+        order = bfs_counts(adj, s, dist, sigma)
+        brandes_dependencies(adj, order, dist, sigma, delta)
+
+        # O último nó da BFS é o mais distante da fonte
+        eccentricity[s] = dist[order[-1]]
+        reach[s] = len(order)
+
+        total = 0
+        inverse = 0.0
+        for v in order:
+            d = dist[v]
+            if d:
+                total += d
+                inverse += 1.0 / d
+                betweenness[v] += delta[v]
+            dist[v] = -1
+            sigma[v] = 0.0
+            delta[v] = 0.0
+
+        dist_total[s] = total
+        harmonic[s] = inverse
+
+    return np.array([betweenness, dist_total, harmonic, eccentricity, reach])
+
+def _fused_task(sources):
+    return _fused_sweep(_WORKER['adj'], sources)
+
+def _local_runner(csr, kernel, costs=None):
+    """Versão sem pool de um kernel (monta as listas de adjacência uma única vez)"""
+    adj = cost_lists = None
+
+    def run(sources):
+        nonlocal adj, cost_lists
+        if adj is None:
+            adj = _adjacency(csr.indptr, csr.indices)
+            if costs is not None:
+                cost_lists = _adjacency(csr.indptr, costs)
+        return kernel(adj, sources) if costs is None else kernel(adj, cost_lists, sources)
+
+    return run
+
+def _shards(sources, workers):
+    """Divide as fontes em fatias intercaladas (equilibra fontes caras e baratas)"""
+    n_shards = min(len(sources), workers * 4)
+    return [sources[i::n_shards] for i in range(n_shards)]
+
+def resolve_workers(workers):
+    """Número de processos: None usa todos os núcleos disponíveis"""
+    if workers is None:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+def run_sharded(csr, task, sources, workers, local_task, costs=None):
+    """Executa `task` sobre fatias das fontes num pool anexado à CSR compartilhada"""
+    workers = resolve_workers(workers)
+    if workers == 1 or csr.n < MIN_NODES_FOR_POOL or len(sources) < 2:
+        return [local_task(sources)]
+
+    shards = _shards(sources, workers)
+    with SharedCSR(csr, costs) as shared:
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards)),
+                                 initializer=_init_worker, initargs=(shared.spec,)) as pool:
+            return list(pool.map(task, shards))
+
+def _rescale(betweenness, n, normalized):
+    """Mesma normalização de nx.betweenness_centrality (endpoints=False, não direcionado)"""
+    if n <= 2:
+        return betweenness
+    scale = 1 / ((n - 1) * (n - 2)) if normalized else 0.5
+    return betweenness * scale
+
+def sweep_all_sources(G, workers):
+    """Executa a varredura fundida a partir de todos os nós e soma as fatias"""
+    csr = get_csr(G)
+    sources = list(range(csr.n))
+    partials = run_sharded(csr, _fused_task, sources, workers,
+                           _local_runner(csr, _fused_sweep))
+    totals = np.sum(partials, axis=0) if partials else np.zeros((5, csr.n))
+    return csr, totals
+
+def shortest_path_centralities(G, normalized=True, workers=None):
+    """Closeness, harmônica, excentricidade e betweenness numa única varredura de BFS
+
+    Closeness e excentricidade são calculadas dentro do componente conexo de cada nó
+    (como na análise por componente); a harmônica segue nx.harmonic_centrality.
+    Devolve (métricas por nó, resumo com diâmetro e raio).
+    """
+    csr, (betweenness, dist_total, harmonic, eccentricity, reach) = sweep_all_sources(G, workers)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        closeness = np.where(dist_total > 0, (reach - 1) / dist_total, 0.0)
+
+    # Diâmetro: maior excentricidade; raio: menor excentricidade no maior componente
+    summary = {'diameter': int(eccentricity.max()) if csr.n else 0, 'radius': 0}
+    if csr.n:
+        largest = reach == reach.max()
+        summary['radius'] = int(eccentricity[largest].min())
+
+    nodes = csr.node_list()
+    metrics = {
+        'closeness': closeness,
+        'harmonic': harmonic,
+        'eccentricity': eccentricity,
+        'betweenness': _rescale(betweenness, csr.n, normalized),
+    }
+    return {name: dict(zip(nodes, values.tolist())) for name, values in metrics.items()}, summary
+
+def betweenness_centrality(G, normalized=True, workers=None):
+    """Betweenness exata (Brandes) com as fontes distribuídas entre processos
+
+    Coincide com nx.betweenness_centrality até o arredondamento de ponto flutuante
+    (a ordem das somas difere; diferenças da ordem de 1e-18 a 1e-15), com
+    qualquer número de workers.
+    """
+    csr, totals = sweep_all_sources(G, workers)
+    values = _rescale(totals[0], csr.n, normalized)
+    return dict(zip(csr.node_list(), values.tolist()))
+
+# ---------------------------------------------------------------------------
+# Modo ponderado: Dijkstra com heap sobre a CSR (custos positivos nas arestas)
+# ---------------------------------------------------------------------------
+
+def dijkstra_counts(adj, costs, s, dist, sigma):
+    """Dijkstra a partir de `s` contando caminhos mínimos; devolve os nós em ordem de distância
+
+    `dist` deve vir preenchido com infinito. Empates exigem igualdade exata das
+    somas de custos (o mesmo critério de nx.betweenness_centrality com weight).
+    """
+    dist[s] = 0.0
+    sigma[s] = 1.0
+    order = []
+    heap = [(0.0, s)]
+    while heap:
+        d, v = heapq.heappop(heap)
+        if d > dist[v]:
+            continue  # entrada antiga: v já foi fixado com distância menor
+        order.append(v)
+        sigma_v = sigma[v]
+        for w, c in zip(adj[v], costs[v]):
+            new_dist = d + c
+            dist_w = dist[w]
+            if new_dist < dist_w:
+                dist[w] = new_dist
+                sigma[w] = sigma_v
+                heapq.heappush(heap, (new_dist, w))
+            elif new_dist == dist_w:
+                sigma[w] += sigma_v
+    return order
+
+def weighted_dependencies(adj, costs, order, dist, sigma, delta):
+    """Acumulação reversa de Brandes: predecessores são os vizinhos v com dist[v] + c == dist[w]"""
+    for w in reversed(order):
+        coeff = (1.0 + delta[w]) / sigma[w]
+        dist_w = dist[w]
+        for v, c in zip(adj[w], costs[w]):
+            if dist[v] + c == dist_w:
+                delta[v] += sigma[v] * coeff
+
+def _weighted_sweep(adj, costs, sources):
+    """Como _fused_sweep, com Dijkstra no lugar da BFS (mesmo array (5, n) de saída)"""
+    n = len(adj)
+    betweenness = [0.0] * n
+    dist_total = [0.0] * n
+    harmonic = [0.0] * n
+    eccentricity = [0.0] * n
+    reach = [0.0] * n
+    inf = float('inf')
+    dist, sigma, delta = [inf] * n, [0.0] * n, [0.0] * n
+
+    for s in sources:
+        order = dijkstra_counts(adj, costs, s, dist, sigma)
+        weighted_dependencies(adj, costs, order, dist, sigma, delta)
+
+        # Nós saem do heap em ordem de distância: o último é o mais distante
+        eccentricity[s] = dist[order[-1]]
+        reach[s] = len(order)
+
+        total = 0.0
+        inverse = 0.0
+        for v in order:
+            d = dist[v]
+            if v != s:
+                total += d
+                inverse += 1.0 / d
+                betweenness[v] += delta[v]
+            dist[v] = inf
+            sigma[v] = 0.0
+            delta[v] = 0.0
+
+        dist_total[s] = total
+        harmonic[s] = inverse
+
+    return np.array([betweenness, dist_total, harmonic, eccentricity, reach])
+
+def _weighted_task(sources):
+    return _weighted_sweep(_WORKER['adj'], _WORKER['costs'], sources)
+
+def edge_costs(G, weight='cost'):
+    """Custo de cada entrada da CSR (alinhado com csr.indices) a partir do atributo `weight`
+
+    Arestas sem o atributo custam 1; custos devem ser positivos (Dijkstra).
+    """
+    csr = get_csr(G)
+    column = csr.edge_attrs.get(weight)
+    if column is None or csr.attr_kinds.get(f'edge:{weight}') == 'str':
+        values = np.ones(csr.m)
+    else:
+        values = np.where(np.isnan(column), 1.0, column).astype(np.float64)
+    if csr.m and values.min() <= 0:
+        raise ValueError(f"edge attribute '{weight}' must be positive for weighted shortest paths")
+    # Mesma montagem da CSR: os custos saem na ordem de csr.indices
+    _, _, costs = _build_csr(csr.n, np.asarray(csr.edges, dtype=np.int64).reshape(-1, 2), values)
+    return csr, costs
+
+def weighted_path_centralities(G, weight='cost', normalized=True, workers=None):
+    """Closeness, harmônica, excentricidade e betweenness ponderadas (Dijkstra em cada fonte)
+
+    Mesmas definições de shortest_path_centralities, com distâncias somando o
+    atributo `weight` das arestas. As fontes são divididas entre processos como
+    no modo não ponderado. Devolve (métricas por nó, resumo com diâmetro e raio).
+    """
+    csr, costs = edge_costs(G, weight)
+    sources = list(range(csr.n))
+    partials = run_sharded(csr, _weighted_task, sources, workers,
+                           _local_runner(csr, _weighted_sweep, costs), costs=costs)
+    totals = np.sum(partials, axis=0) if partials else np.zeros((5, csr.n))
+    betweenness, dist_total, harmonic, eccentricity, reach = totals
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        closeness = np.where(dist_total > 0, (reach - 1) / dist_total, 0.0)
+
+    summary = {'diameter': float(eccentricity.max()) if csr.n else 0.0, 'radius': 0.0,
+               'weight': weight}
+    if csr.n:
+        largest = reach == reach.max()
+        summary['radius'] = float(eccentricity[largest].min())
+
+    nodes = csr.node_list()
+    metrics = {
+        'closeness': closeness,
+        'harmonic': harmonic,
+        'eccentricity': eccentricity,
+        'betweenness': _rescale(betweenness, csr.n, normalized),
+    }
+    return {name: dict(zip(nodes, values.tolist())) for name, values in metrics.items()}, summary
+
+# ---------------------------------------------------------------------------
+# Modo aproximado: amostragem de pivôs com estimativa de erro
+# ---------------------------------------------------------------------------
+
+# Componentes com até este número de nós são sempre calculados de forma exata
+MIN_PIVOTS_PER_COMPONENT = 8
+
+def _pivot_accumulate(adj, sources):
+    """BFS + Brandes a partir dos pivôs, somando dependências, distâncias e seus quadrados
+
+    A quinta linha guarda, na posição de cada pivô, a sua excentricidade (limita
+    o alcance das distâncias no intervalo de Bernstein).
+    """
+    n = len(adj)
+    b_sum = [0.0] * n
+    b_sq = [0.0] * n
+    d_sum = [0.0] * n
+    d_sq = [0.0] * n
+    ecc = [0.0] * n
+    dist = [-1] * n
+    sigma = [0.0] * n
+    delta = [0.0] * n
+
+    for s in sources:
+        order = bfs_counts(adj, s, dist, sigma)
+        brandes_dependencies(adj, order, dist, sigma, delta)
+        ecc[s] = dist[order[-1]]
+
+        for v in order:
+            dv = dist[v]
+            if dv:
+                b = delta[v]
+                b_sum[v] += b
+                b_sq[v] += b * b
+                d_sum[v] += dv
+                d_sq[v] += dv * dv
+            dist[v] = -1
+            sigma[v] = 0.0
+            delta[v] = 0.0
+
+    return np.array([b_sum, b_sq, d_sum, d_sq, ecc])
+
+def _pivot_task(sources):
+    return _pivot_accumulate(_WORKER['adj'], sources)
+
+def pivot_sample_size(n, epsilon, delta):
+    """Número de pivôs pelo limite de Hoeffding com união sobre os n nós"""
+    return int(np.ceil(np.log(2 * n / delta) / (2 * epsilon ** 2)))
+
+def _components(csr):
+    """Rótulo do componente conexo de cada nó (scipy.sparse.csgraph)"""
+    from scipy.sparse.csgraph import connected_components
+    _, labels = connected_components(csr.to_scipy(), directed=False)
+    return labels
+
+def _bernstein(total, squares, k, value_range, delta):
+    """Meia-largura bilateral de Bernstein empírico (Maurer e Pontil) para a média amostral
+
+    Vale para variáveis em [0, value_range] com confiança 1 - delta por nó; sem
+    hipótese de normalidade, então é bem mais larga que um intervalo z.
+    """
+    mean = total / k
+    var = np.maximum(squares / k - mean ** 2, 0.0) * k / np.maximum(k - 1, 1)
+    log_term = np.log(4 / delta)
+    return np.sqrt(2 * var * log_term / k) + 7 * value_range * log_term / (3 * np.maximum(k - 1, 1))
+
+def _estimate(acc, k_node, size_node, ecc_node, n, delta):
+    """Estimadores por componente (Horvitz-Thompson) e meia-largura do intervalo de confiança
+
+    Componentes amostrados por inteiro têm erro zero. As dependências de Brandes
+    ficam em [0, tamanho - 2]; as distâncias em [0, diâmetro], com o diâmetro
+    limitado por 2 x a menor excentricidade de um pivô do componente.
+    """
+    b_sum, b_sq, d_sum, d_sq = acc[:4]
+    k = np.maximum(k_node, 1).astype(float)
+    size = size_node.astype(float)
+    complete = k_node >= size_node
+
+    b_err = np.where(complete, 0.0,
+                     size * _bernstein(b_sum, b_sq, k, np.maximum(size - 2, 0), delta))
+    scale = 1 / ((n - 1) * (n - 2)) if n > 2 else 1.0
+    betweenness, betweenness_err = size * b_sum / k * scale, b_err * scale
+
+    d_total = size * d_sum / k
+    d_err = np.where(complete, 0.0, size * _bernstein(d_sum, d_sq, k, 2 * ecc_node, delta))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        closeness = np.where(d_total > 0, (size - 1) / d_total, 0.0)
+        # Limite superior da closeness pelo limite inferior da soma das distâncias
+        low = d_total - d_err
+        closeness_err = np.where(d_total <= 0, 0.0,
+                                 np.where(low > 0, (size - 1) / low - closeness, np.inf))
+
+    return {'betweenness': betweenness, 'closeness': closeness}, \
+           {'betweenness': betweenness_err, 'closeness': closeness_err}
+
+def top_n_certified(values, errors, top_n):
+    """True se o intervalo do N-ésimo colocado não se sobrepõe ao do (N+1)-ésimo em diante"""
+    if top_n >= len(values):
+        return True
+    order = np.argpartition(-values, top_n)
+    top, rest = order[:top_n], order[top_n:]
+    return (values[top] - errors[top]).min() >= (values[rest] + errors[rest]).max()
+
+# Com top_n, a amostra dobra até no máximo este múltiplo de k (nunca vira o cálculo exato
+# só para certificar: em redes com empates no topo isso acabaria usando todos os nós)
+MAX_PIVOT_GROWTH = 4
+
+def approximate_centralities(G, k=None, epsilon=None, delta=0.1, top_n=None,
+                             certify=('betweenness',), max_pivots=None, seed=42, workers=None):
+    """Betweenness e closeness aproximadas por pivôs, com intervalo de confiança por nó
+
+    k: número total de pivôs (ou derivado de epsilon/delta). Os erros são
+    meias-larguras de Bernstein empírico com confiança 1 - delta por nó. Com
+    top_n, a amostra é dobrada (até max_pivots, padrão MAX_PIVOT_GROWTH x k)
+    enquanto o top-N das métricas em `certify` não fica separado pelos intervalos;
+    se o limite chega antes, certified_top_n é False.
+    """
+    csr = get_csr(G)
+    n = csr.n
+    if k is None:
+        k = pivot_sample_size(n, epsilon or 0.05, delta)
+    max_pivots = max_pivots or MAX_PIVOT_GROWTH * k
+
+    labels = _components(csr)
+    sizes = np.bincount(labels)
+    rng = np.random.default_rng(seed)
+
+    # Amostragem estratificada por componente: cada um recebe pivôs proporcionais ao tamanho
+    members = [rng.permutation(np.flatnonzero(labels == c)) for c in range(len(sizes))]
+
+    def quota_for(total):
+        return np.minimum(sizes, np.maximum(MIN_PIVOTS_PER_COMPONENT,
+                                            np.ceil(total * sizes / max(n, 1)).astype(int)))
+
+    budget = k
+    quota = quota_for(budget)
+    taken = np.zeros(len(sizes), dtype=int)
+    acc = np.zeros((5, n))
+    local_task = _local_runner(csr, _pivot_accumulate)
+
+    while True:
+        new_sources = [int(s) for c in range(len(sizes)) for s in members[c][taken[c]:quota[c]]]
+        if new_sources:
+            acc += np.sum(run_sharded(csr, _pivot_task, new_sources, workers, local_task), axis=0)
+        taken = quota.copy()
+
+        # Menor excentricidade entre os pivôs de cada componente
+        ecc = np.full(len(sizes), np.inf)
+        pivots = np.concatenate([members[c][:taken[c]] for c in range(len(sizes))]).astype(int)
+        np.minimum.at(ecc, labels[pivots], acc[4, pivots])
+        values, errors = _estimate(acc, taken[labels], sizes[labels], ecc[labels], n, delta)
+        certified = top_n is None or all(
+            top_n_certified(values[m], errors[m], top_n) for m in certify
+        )
+        if certified or np.all(taken == sizes) or budget >= max_pivots:
+            break
+        budget = min(budget * 2, max_pivots)
+        quota = np.maximum(quota_for(budget), taken)
+
+    nodes = csr.node_list()
+    info = {
+        'pivots': int(taken.sum()),
+        'exact': bool(np.all(taken == sizes)),
+        'certified_top_n': bool(certified),
+        'certified_metrics': list(certify) if top_n else [],
+        'confidence': 1 - delta,
+    }
+    return ({m: dict(zip(nodes, v.tolist())) for m, v in values.items()},
+            {m: dict(zip(nodes, e.tolist())) for m, e in errors.items()},
+            info)
+
+def compare_rankings(approx, exact, top_n=10):
+    """Correlação de Spearman e sobreposição do top-N entre duas métricas (dicts por nó)"""
+    from scipy.stats import spearmanr
+    nodes = list(exact)
+    a = np.array([approx[v] for v in nodes])
+    e = np.array([exact[v] for v in nodes])
+    rho = spearmanr(a, e).correlation if len(nodes) > 1 else 1.0
+    top_a = {nodes[i] for i in np.argsort(-a, kind='stable')[:top_n]}
+    top_e = {nodes[i] for i in np.argsort(-e, kind='stable')[:top_n]}
+    return rho, len(top_a & top_e) / max(min(top_n, len(nodes)), 1)
@@ -0,0 +1,162 @@
+"""Armazenamento persistente e colunar dos resultados de centralidade"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from graph_csr import get_csr
+
+DEFAULT_STORE_DIR = 'centrality_store'
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+class CentralityStore:
+    """Resultados por (impressão digital do grafo, métrica, parâmetros), com despejo LRU por tamanho
+
+    Cada entrada é uma pasta <raiz>/<fingerprint>/<métrica>-<hash dos parâmetros>/
+    com uma coluna .npy por vetor (na ordem canônica dos ids) e um meta.json; o
+    mtime do meta.json marca o último acesso.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def _entry_dir(self, G, name, params):
+        csr = get_csr(G)
+        params_key = json.dumps(params, sort_keys=True, default=str)
+        digest = hashlib.sha1(params_key.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.root, csr.fingerprint(), f'{name}-{digest}'), csr
+
+    @staticmethod
+    def _canonical_order(csr):
+        """Ordem dos nós por id (a mesma usada na impressão digital)"""
+        return np.argsort(np.asarray(csr.node_ids).astype(str), kind='stable')
+
+    def get(self, G, name, params):
+        """Devolve (colunas, extra) ou None se a entrada não existir"""
+        entry, csr = self._entry_dir(G, name, params)
+        meta_path = os.path.join(entry, 'meta.json')
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            order = self._canonical_order(csr)
+            nodes = np.asarray(csr.node_list(), dtype=object)[order].tolist()
+            columns = {}
+            for column in meta['columns']:
+                values = np.load(os.path.join(entry, f'{column}.npy'))
+                columns[column] = dict(zip(nodes, values.tolist()))
+            # Pode falhar se outro processo despejou a entrada agora mesmo
+            os.utime(meta_path)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        return columns, meta.get('extra', {})
+
+    def put(self, G, name, params, columns, extra=None):
+        """Grava as colunas (dicts nó -> valor) e despeja as entradas menos usadas"""
+        entry, csr = self._entry_dir(G, name, params)
+        os.makedirs(entry, exist_ok=True)
+
+        order = self._canonical_order(csr)
+        nodes = np.asarray(csr.node_list(), dtype=object)[order].tolist()
+        # Todos os arquivos são trocados atomicamente: processos que gravam a mesma entrada
+        # (ex.: figuras em paralelo) não disputam o temporário, e quem lê nunca vê um .npy pela metade
+        for column, values in columns.items():
+            array = np.array([values.get(node, np.nan) for node in nodes], dtype=np.float64)
+            _replace_atomically(entry, f'{column}.npy', lambda f, a=array: np.save(f, a))
+
+        graph_dir = os.path.dirname(entry)
+        if not os.path.exists(os.path.join(graph_dir, 'node_ids.npy')):
+            ids = np.asarray(csr.node_ids)[order]
+            _replace_atomically(graph_dir, 'node_ids.npy', lambda f: np.save(f, ids))
+
+        meta = {'metric': name, 'params': params, 'columns': list(columns), 'extra': extra or {}}
+        text = json.dumps(meta, indent=2, default=_json_default)
+        _replace_atomically(entry, 'meta.json', lambda f: f.write(text.encode('utf-8')))
+
+        self.evict(keep=entry)
+
+    def entries(self):
+        """Lista (pasta, tamanho em bytes, último acesso) de todas as entradas"""
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for fingerprint in os.listdir(self.root):
+            graph_dir = os.path.join(self.root, fingerprint)
+            if not os.path.isdir(graph_dir):
+                continue
+            for name in os.listdir(graph_dir):
+                entry = os.path.join(graph_dir, name)
+                meta_path = os.path.join(entry, 'meta.json')
+                # Outro processo pode estar gravando ou despejando a entrada: temporários
+                # (.*.tmp) não contam e arquivos que somem no meio da varredura são ignorados
+                try:
+                    size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry)
+                               if not f.startswith('.'))
+                    found.append((entry, size, os.path.getmtime(meta_path)))
+                except OSError:
+                    continue
+        return found
+
+    def evict(self, keep=None):
+        """Remove as entradas acessadas há mais tempo até caber em max_bytes"""
+        entries = sorted(self.entries(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in entries)
+        for entry, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            graph_dir = os.path.dirname(entry)
+            if not any(os.path.isdir(os.path.join(graph_dir, d)) for d in os.listdir(graph_dir)):
+                shutil.rmtree(graph_dir, ignore_errors=True)
+
+    def cached(self, G, name, params, compute):
+        """Leitura com fallback: usa a entrada existente ou chama compute() -> (colunas, extra)"""
+        hit = self.get(G, name, params)
+        if hit is not None:
+            print(f"{name}: loaded from centrality store")
+            return hit
+        columns, extra = compute()
+        # Falhas do solver (zeros, última iteração sem convergir) não são persistidas:
+        # a próxima execução tenta de novo em vez de ler o resultado ruim
+        if extra and (extra.get('error') or extra.get('converged') is False):
+            print(f"{name}: not written to the centrality store (solver did not converge)")
+            return columns, extra
+        try:
+            self.put(G, name, params, columns, extra)
+        except OSError as e:
+            print(f"Could not write '{name}' to the centrality store: {e}")
+        return columns, extra
+
+def _replace_atomically(folder, name, write):
+    """Grava folder/name via write(arquivo binário) num temporário único e os.replace"""
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f'.{name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, os.path.join(folder, name))
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _json_default(value):
+    """Converte escalares NumPy para tipos JSON"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+def cached_metrics(store, G, name, params, compute):
+    """Como CentralityStore.cached, mas sem store apenas calcula"""
+    if store is None:
+        return compute()
+    return store.cached(G, name, params, compute)
@@ -0,0 +1,207 @@
+"""Detecção de comunidades (Louvain com refinamento de conectividade) e partição de consenso"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from graph_csr import get_csr
+from centrality_engine import resolve_workers
+
+# Estado de cada processo do pool (preenchido por _init_worker)
+_WORKER = {}
+
+def modularity(matrix, labels, resolution=1.0):
+    """Modularidade de Newman (com resolução) de uma partição sobre a matriz de adjacência simétrica"""
+    matrix = sparse.coo_matrix(matrix)
+    m2 = matrix.sum()
+    if m2 == 0:
+        return 0.0
+    labels = np.asarray(labels)
+    inside = labels[matrix.row] == labels[matrix.col]
+    internal = matrix.data[inside].sum()
+    tot = np.bincount(labels, weights=np.asarray(matrix.sum(axis=1)).ravel())
+    return float(internal / m2 - resolution * ((tot / m2) ** 2).sum())
+
+def _move_nodes(matrix, resolution, rng):
+    """Fase local do Louvain: move cada nó para a comunidade vizinha de maior ganho até estabilizar"""
+    n = matrix.shape[0]
+    indptr, indices, data = matrix.indptr.tolist(), matrix.indices.tolist(), matrix.data.tolist()
+    strength = np.asarray(matrix.sum(axis=1)).ravel()
+    m2 = float(strength.sum())
+    if m2 == 0:
+        return np.arange(n, dtype=np.int64), False
+    k = strength.tolist()
+    tot = list(k)
+    comm = list(range(n))
+    order = rng.permutation(n).tolist()
+
+    moved = True
+    any_move = False
+    while moved:
+        moved = False
+        for v in order:
+            cv = comm[v]
+            kv = k[v]
+            links = {}
+            for j in range(indptr[v], indptr[v + 1]):
+                u = indices[j]
+                if u != v:
+                    links[comm[u]] = links.get(comm[u], 0.0) + data[j]
+            tot[cv] -= kv
+            best = cv
+            best_gain = links.get(cv, 0.0) - resolution * tot[cv] * kv / m2
+            for c, w in links.items():
+                gain = w - resolution * tot[c] * kv / m2
+                if gain > best_gain + 1e-12:
+                    best, best_gain = c, gain
+            tot[best] += kv
+            if best != cv:
+                comm[v] = best
+                moved = any_move = True
+    return np.array(comm, dtype=np.int64), any_move
+
+def _split_disconnected(matrix, labels):
+    """Refinamento: comunidades desconexas viram uma comunidade por componente (garantia do Leiden)"""
+    matrix = sparse.coo_matrix(matrix)
+    inside = labels[matrix.row] == labels[matrix.col]
+    internal = sparse.csr_matrix((matrix.data[inside], (matrix.row[inside], matrix.col[inside])),
+                                 shape=matrix.shape)
+    _, components = connected_components(internal, directed=False)
+    return _relabel(components)
+
+def _relabel(labels):
+    """Rótulos consecutivos 0..c-1 por ordem de primeira ocorrência"""
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first, kind='stable')] = np.arange(len(first))
+    return rank[inverse]
+
+def louvain(matrix, resolution=1.0, seed=0, max_levels=32):
+    """Louvain multinível sobre a matriz esparsa simétrica (pesos nas entradas)
+
+    A cada nível os nós são movidos localmente, as comunidades desconexas são
+    separadas e o grafo é agregado (P^T A P) até nenhum nó mudar de comunidade.
+    """
+    rng = np.random.default_rng(seed)
+    matrix = sparse.csr_matrix(matrix, dtype=np.float64)
+    labels = np.arange(matrix.shape[0], dtype=np.int64)
+    level_matrix = matrix
+    for _ in range(max_levels):
+        comm, changed = _move_nodes(level_matrix, resolution, rng)
+        if not changed:
+            break
+        comm = _split_disconnected(level_matrix, comm)
+        labels = comm[labels]
+        size = int(comm.max()) + 1
+        projection = sparse.csr_matrix((np.ones(len(comm)), (np.arange(len(comm)), comm)),
+                                       shape=(len(comm), size))
+        level_matrix = (projection.T @ level_matrix @ projection).tocsr()
+        if size == len(comm):
+            break
+    return _relabel(labels)
+
+def adjusted_rand_index(a, b):
+    """Índice de Rand ajustado entre duas partições (tabela de contingência em NumPy)"""
+    n = len(a)
+    if n < 2:
+        return 1.0
+    pairs = np.unique(np.column_stack([a, b]), axis=0, return_counts=True)[1]
+    comb = lambda x: x * (x - 1) / 2.0
+    index = comb(pairs).sum()
+    rows = comb(np.bincount(a)).sum()
+    cols = comb(np.bincount(b)).sum()
+    expected = rows * cols / comb(n)
+    maximum = (rows + cols) / 2
+    return float((index - expected) / (maximum - expected)) if maximum != expected else 1.0
+
+def node_stability(runs, consensus):
+    """Por nó: Jaccard médio entre sua comunidade em cada execução e sua comunidade de consenso"""
+    consensus_size = np.bincount(consensus)
+    total = np.zeros(len(consensus))
+    for labels in runs:
+        codes = labels * (consensus.max() + 1) + consensus
+        _, inverse, counts = np.unique(codes, return_inverse=True, return_counts=True)
+        intersection = counts[inverse.ravel()]
+        union = np.bincount(labels)[labels] + consensus_size[consensus] - intersection
+        total += intersection / union
+    return total / len(runs)
+
+def _init_worker(matrix, resolution):
+    """Inicializador do pool: a matriz é transferida uma única vez por processo"""
+    _WORKER['matrix'] = matrix
+    _WORKER['resolution'] = resolution
+
+def _run_seed(seed):
+    return louvain(_WORKER['matrix'], _WORKER['resolution'], seed)
+
+def _run_seeds(matrix, resolution, seeds, workers):
+    """Louvain para cada semente, em paralelo quando há mais de uma"""
+    workers = min(resolve_workers(workers), len(seeds))
+    if workers == 1:
+        return [louvain(matrix, resolution, seed) for seed in seeds]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(matrix, resolution)) as pool:
+        return list(pool.map(_run_seed, seeds))
+
+def consensus_partition(matrix, runs, resolution=1.0, threshold=0.5, max_rounds=5, workers=None):
+    """Consenso (Lancichinetti-Fortunato): reagrupa o grafo ponderado pela concordância das execuções
+
+    Cada aresta recebe a fração de execuções que põe as pontas juntas; arestas abaixo
+    de `threshold` são descartadas e o Louvain roda de novo sobre esse grafo até
+    todas as execuções concordarem.
+    """
+    coo = sparse.coo_matrix(matrix)
+    seeds = list(range(len(runs)))
+    for _ in range(max_rounds):
+        agreement = np.mean([labels[coo.row] == labels[coo.col] for labels in runs], axis=0)
+        keep = agreement >= threshold
+        weighted = sparse.csr_matrix((agreement[keep], (coo.row[keep], coo.col[keep])),
+                                     shape=matrix.shape)
+        if all(np.array_equal(runs[0], labels) for labels in runs[1:]):
+            break
+        runs = _run_seeds(weighted, resolution, seeds, workers)
+    # Nós sem nenhuma aresta de consenso ficam isolados; comunidades desconexas são separadas
+    return _relabel(_split_disconnected(weighted, runs[0]))
+
+def _order_by_size(labels):
+    """Renumera as comunidades da maior para a menor (rótulos estáveis entre execuções)"""
+    sizes = np.bincount(labels)
+    order = np.lexsort((np.arange(len(sizes)), -sizes))
+    rank = np.empty(len(sizes), dtype=np.int64)
+    rank[order] = np.arange(len(sizes))
+    return rank[labels]
+
+def detect_communities(G, resolution=1.0, runs=8, workers=None, threshold=0.5):
+    """Comunidades por Louvain com `runs` sementes em paralelo e partição de consenso
+
+    Devolve (classe por nó, estabilidade por nó, info) — info traz a modularidade do
+    consenso, a melhor e a média das execuções e o ARI médio entre pares de execuções.
+    """
+    csr = get_csr(G)
+    matrix = csr.to_scipy()
+    seeds = list(range(runs))
+    partitions = _run_seeds(matrix, resolution, seeds, workers)
+    scores = [modularity(matrix, labels, resolution) for labels in partitions]
+
+    if runs > 1:
+        consensus = consensus_partition(matrix, partitions, resolution, threshold, workers=workers)
+        pairs = [adjusted_rand_index(partitions[i], partitions[j])
+                 for i in range(runs) for j in range(i + 1, runs)]
+    else:
+        consensus, pairs = partitions[0], [1.0]
+    consensus = _order_by_size(consensus)
+    stability = node_stability(partitions, consensus)
+
+    info = {
+        'communities': int(consensus.max()) + 1 if len(consensus) else 0,
+        'modularity': modularity(matrix, consensus, resolution),
+        'best_run_modularity': max(scores, default=0.0),
+        'mean_run_modularity': float(np.mean(scores)) if scores else 0.0,
+        'mean_pairwise_ari': float(np.mean(pairs)),
+        'resolution': resolution,
+        'runs': runs,
+    }
+    nodes = csr.node_list()
+    return (dict(zip(nodes, consensus.tolist())), dict(zip(nodes, stability.tolist())), info)
@@ -0,0 +1,352 @@
+"""Rede de interação de resíduos a partir de coordenadas 3D (PDB, mmCIF ou tabela de coordenadas)"""
+
+import os
+import re
+import time
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+# Cortes padrão (Å) por tipo de interação; em VDW o corte é sobre a distância entre
+# as superfícies (distância - soma dos raios de van der Waals), como no RING
+DEFAULT_CUTOFFS = {
+    'SSBOND': 2.5,
+    'HBOND': 3.5,
+    'IONIC': 4.0,
+    'VDW': 0.5,
+    'CONTACT': 8.0,
+}
+
+# Interações calculadas por padrão a partir de átomos; tabelas de coordenadas
+# (um ponto por resíduo) só admitem CONTACT
+ATOM_INTERACTIONS = ('SSBOND', 'IONIC', 'HBOND', 'VDW')
+
+# Raios de van der Waals (Å) por elemento
+VDW_RADII = {'C': 1.70, 'N': 1.55, 'O': 1.52, 'S': 1.80, 'SE': 1.90, 'P': 1.80, 'H': 1.10}
+
+BACKBONE_ATOMS = {'N', 'CA', 'C', 'O', 'OXT'}
+
+# Átomos carregados das cadeias laterais (resíduo, átomo)
+POSITIVE_ATOMS = {('LYS', 'NZ'), ('ARG', 'NE'), ('ARG', 'NH1'), ('ARG', 'NH2'),
+                  ('HIS', 'ND1'), ('HIS', 'NE2')}
+NEGATIVE_ATOMS = {('ASP', 'OD1'), ('ASP', 'OD2'), ('GLU', 'OE1'), ('GLU', 'OE2')}
+
+WATER_RESIDUES = {'HOH', 'WAT', 'DOD'}
+
+ATOM_COLUMNS = ['model', 'chain', 'resseq', 'icode', 'resname', 'name', 'element',
+                'x', 'y', 'z', 'bfactor']
+
+def _atom_table(records):
+    """Lista de tuplas (na ordem de ATOM_COLUMNS) -> dict de arrays"""
+    if not records:
+        return {name: np.array([]) for name in ATOM_COLUMNS}
+    columns = list(zip(*records))
+    table = {name: np.array(values) for name, values in zip(ATOM_COLUMNS, columns)}
+    for name in ('x', 'y', 'z', 'bfactor'):
+        table[name] = table[name].astype(np.float64)
+    table['model'] = table['model'].astype(np.int64)
+    return table
+
+def _element(name, element):
+    """Elemento do átomo (coluna própria ou, na falta dela, primeira letra do nome)"""
+    element = element.strip().upper()
+    if element:
+        return element
+    return name.strip().lstrip('0123456789')[:1].upper()
+
+def iter_pdb_models(file_path, hetatm=False):
+    """Lê um PDB linha a linha e devolve um dict de arrays de átomos por modelo (MODEL/ENDMDL)"""
+    records = []
+    model = 1
+    with open(file_path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            record = line[:6]
+            if record.startswith('MODEL'):
+                model = int(line[10:14].strip() or model)
+                records = []
+            elif record == 'ATOM  ' or (hetatm and record == 'HETATM'):
+                if line[16] not in (' ', 'A'):
+                    continue  # só a primeira conformação alternativa
+                name = line[12:16].strip()
+                resname = line[17:20].strip()
+                if resname in WATER_RESIDUES:
+                    continue
+                records.append((model, line[21].strip() or '_', int(line[22:26]),
+                                line[26].strip() or '_', resname, name,
+                                _element(name, line[76:78]), float(line[30:38]),
+                                float(line[38:46]), float(line[46:54]),
+                                float(line[60:66] or 0.0)))
+            elif record.startswith('ENDMDL'):
+                yield _atom_table(records)
+                records = []
+    if records:
+        yield _atom_table(records)
+
+_CIF_TOKEN = re.compile(r"'[^']*'|\"[^\"]*\"|\S+")
+
+def iter_mmcif_models(file_path, hetatm=False):
+    """Lê o laço _atom_site de um mmCIF em streaming e devolve os átomos por modelo"""
+    fields = []
+    in_loop = False
+    records = []
+    model = None
+    with open(file_path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('_atom_site.'):
+                in_loop = True
+                fields.append(line.split('.', 1)[1].split()[0])
+                continue
+            if not in_loop or not fields:
+                continue
+            if line.startswith(('loop_', '_', '#')) or not line:
+                if records:
+                    break
+                continue
+            values = [token.strip('\'"') for token in _CIF_TOKEN.findall(line)]
+            row = dict(zip(fields, values))
+            group = row.get('group_PDB', 'ATOM')
+            if group != 'ATOM' and not (hetatm and group == 'HETATM'):
+                continue
+            if row.get('label_alt_id', '.') not in ('.', '?', 'A'):
+                continue
+            resname = row.get('auth_comp_id', row.get('label_comp_id', ''))
+            if resname in WATER_RESIDUES:
+                continue
+            row_model = int(row.get('pdbx_PDB_model_num', 1))
+            if model is not None and row_model != model:
+                yield _atom_table(records)
+                records = []
+            model = row_model
+            name = row.get('auth_atom_id', row.get('label_atom_id', ''))
+            icode = row.get('pdbx_PDB_ins_code', '?')
+            bfactor = row.get('B_iso_or_equiv', '0')
+            records.append((model, row.get('auth_asym_id', row.get('label_asym_id', '_')),
+                            int(row.get('auth_seq_id', row.get('label_seq_id', 0))),
+                            '_' if icode in ('?', '.') else icode, resname, name,
+                            _element(name, row.get('type_symbol', '')),
+                            float(row['Cartn_x']), float(row['Cartn_y']), float(row['Cartn_z']),
+                            float(bfactor) if bfactor not in ('?', '.') else 0.0))
+    if records:
+        yield _atom_table(records)
+
+def read_coordinate_table(file_path):
+    """Tabela com um ponto por resíduo (ex.: *_ringNodes): colunas NodeId (ou Chain/Position/Residue) e x/y/z"""
+    sep = ',' if file_path.lower().endswith('.csv') else '\t'
+    df = pd.read_csv(file_path, sep=sep)
+    if 'NodeId' not in df.columns:
+        df['NodeId'] = (df['Chain'].astype(str) + ':' + df['Position'].astype(str) + ':_:'
+                        + df['Residue'].astype(str))
+    return df
+
+def residue_index(atoms):
+    """Ids dos resíduos no formato do RING ('A:28:_:LEU'), na ordem do arquivo
+
+    Devolve (resíduo de cada átomo, ids dos resíduos, primeiro átomo de cada resíduo).
+    """
+    keys = np.char.add(np.char.add(np.char.add(np.char.add(
+        atoms['chain'].astype(str), ':'), atoms['resseq'].astype(str)), ':'),
+        np.char.add(np.char.add(atoms['icode'].astype(str), ':'), atoms['resname'].astype(str)))
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[order] = np.arange(len(first))
+    return rank[inverse.ravel()], keys[first[order]], first[order]
+
+class ContactIndex:
+    """Índice espacial (KD-tree) dos átomos de uma conformação
+
+    Os pares de átomos até o maior corte pedido são consultados uma única vez e
+    reaproveitados: reconstruir a rede com outros cortes (análise de
+    sensibilidade) só refiltra os pares já encontrados.
+    """
+
+    def __init__(self, atoms, source=''):
+        self.atoms = atoms
+        self.source = source
+        self.residue, self.residue_ids, self.first_atom = residue_index(atoms)
+
+        self.coords = np.column_stack([atoms['x'], atoms['y'], atoms['z']])
+        self.heavy = ~np.isin(atoms['element'], ('H', 'D'))
+        self.radius = np.array([VDW_RADII.get(e, 1.8) for e in atoms['element']])
+        self.backbone = np.isin(atoms['name'], list(BACKBONE_ATOMS))
+        pairs = list(zip(atoms['resname'].tolist(), atoms['name'].tolist()))
+        self.charge = np.array([1 if p in POSITIVE_ATOMS else -1 if p in NEGATIVE_ATOMS else 0
+                                for p in pairs], dtype=np.int8)
+        self.tree = cKDTree(self.coords)
+        self._pairs = None
+        self._radius = 0.0
+
+    def _atom_pairs(self, radius):
+        """Pares (i, j) de átomos de resíduos diferentes a até `radius` Å"""
+        if self._pairs is None or radius > self._radius:
+            pairs = self.tree.query_pairs(r=radius, output_type='ndarray')
+            pairs = pairs[self.residue[pairs[:, 0]] != self.residue[pairs[:, 1]]]
+            i, j = pairs[:, 0], pairs[:, 1]
+            self._pairs = (i, j, np.linalg.norm(self.coords[i] - self.coords[j], axis=1))
+            self._radius = radius
+        i, j, d = self._pairs
+        keep = d <= radius
+        return i[keep], j[keep], d[keep]
+
+    def residue_coords(self):
+        """Coordenadas de cada resíduo: CA quando existe, senão o centroide dos átomos"""
+        coords = np.zeros((len(self.residue_ids), 3))
+        counts = np.bincount(self.residue, minlength=len(self.residue_ids))
+        for axis in range(3):
+            coords[:, axis] = np.bincount(self.residue, weights=self.coords[:, axis],
+                                          minlength=len(self.residue_ids)) / np.maximum(counts, 1)
+        ca = np.flatnonzero(self.atoms['name'] == 'CA')
+        coords[self.residue[ca]] = self.coords[ca]
+        bfactor = np.zeros(len(self.residue_ids))
+        bfactor[self.residue[ca]] = self.atoms['bfactor'][ca]
+        return coords, bfactor
+
+    def contacts(self, cutoffs=None, interactions=ATOM_INTERACTIONS):
+        """Contatos por tipo: DataFrame com resíduos, tipo, distância e átomos (menor distância por par e tipo)"""
+        cutoffs = {**DEFAULT_CUTOFFS, **(cutoffs or {})}
+        frames = []
+        atom_types = [t for t in interactions if t != 'CONTACT']
+        if atom_types:
+            radius = max(cutoffs[t] for t in atom_types if t != 'VDW') if \
+                any(t != 'VDW' for t in atom_types) else 0.0
+            if 'VDW' in atom_types:
+                radius = max(radius, 2 * self.radius.max() + cutoffs['VDW'])
+            i, j, d = self._atom_pairs(radius)
+            element = self.atoms['element']
+            heavy = self.heavy[i] & self.heavy[j]
+            masks = {
+                'SSBOND': (element[i] == 'S') & (element[j] == 'S') & (d <= cutoffs['SSBOND']),
+                'IONIC': (self.charge[i] * self.charge[j] < 0) & (d <= cutoffs['IONIC']),
+                'HBOND': (np.isin(element[i], ('N', 'O')) & np.isin(element[j], ('N', 'O'))
+                          & ((element[i] == 'O') | (element[j] == 'O')) & (d <= cutoffs['HBOND'])),
+                'VDW': heavy & (d - self.radius[i] - self.radius[j] <= cutoffs['VDW']),
+            }
+            for kind in atom_types:
+                mask = masks[kind]
+                frames.append(pd.DataFrame({
+                    'a': i[mask], 'b': j[mask], 'kind': kind, 'Distance': d[mask],
+                }))
+
+        if 'CONTACT' in interactions:
+            coords, _ = self.residue_coords()
+            pairs = cKDTree(coords).query_pairs(r=cutoffs['CONTACT'], output_type='ndarray')
+            # Átomo que representa cada resíduo (CA, ou o primeiro átomo na falta dele)
+            ca = self.first_atom.copy()
+            is_ca = np.flatnonzero(self.atoms['name'] == 'CA')
+            ca[self.residue[is_ca]] = is_ca
+            a, b = ca[pairs[:, 0]], ca[pairs[:, 1]]
+            frames.append(pd.DataFrame({
+                'a': a, 'b': b, 'kind': 'CONTACT',
+                'Distance': np.linalg.norm(coords[pairs[:, 0]] - coords[pairs[:, 1]], axis=1),
+            }))
+
+        if not frames:
+            return pd.DataFrame(columns=['u', 'v', 'kind', 'Distance', 'Atom1', 'Atom2', 'Interaction'])
+        df = pd.concat(frames, ignore_index=True)
+        # Ordena as pontas por resíduo (u < v) e mantém o contato mais curto por par e tipo
+        swap = self.residue[df['a'].to_numpy()] > self.residue[df['b'].to_numpy()]
+        a = np.where(swap, df['b'], df['a'])
+        b = np.where(swap, df['a'], df['b'])
+        df['a'], df['b'] = a, b
+        df['u'], df['v'] = self.residue[a], self.residue[b]
+        df = df.sort_values('Distance', kind='stable').drop_duplicates(['u', 'v', 'kind'])
+        df = df.sort_values(['u', 'v', 'Distance'], kind='stable')
+
+        names = self.atoms['name']
+        side = np.where(self.backbone, 'MC', 'SC')
+        df['Atom1'] = names[df['a'].to_numpy()]
+        df['Atom2'] = names[df['b'].to_numpy()]
+        df['Interaction'] = (df['kind'] + ':' + side[df['a'].to_numpy()] + '_'
+                             + side[df['b'].to_numpy()])
+        return df.reset_index(drop=True)
+
+    def graph(self, cutoffs=None, interactions=ATOM_INTERACTIONS, multigraph=False):
+        """Rede de resíduos com os mesmos atributos de uma exportação do RING / load_gexf_file
+
+        Com multigraph=False cada par de resíduos vira uma única aresta (o contato
+        mais curto); com multigraph=True há uma aresta por tipo de interação.
+        """
+        df = self.contacts(cutoffs, interactions)
+        coords, bfactor = self.residue_coords()
+        ids = self.residue_ids.tolist()
+        atoms = self.atoms
+        first = self.first_atom
+        model = int(atoms['model'][0]) if len(atoms['model']) else 1
+
+        G = nx.MultiGraph() if multigraph else nx.Graph()
+        for r, node in enumerate(ids):
+            k = first[r]
+            G.add_node(node, Chain=str(atoms['chain'][k]), Position=int(atoms['resseq'][k]),
+                       Residue=str(atoms['resname'][k]), Type='RES', Bfactor_CA=float(bfactor[r]),
+                       x=float(coords[r, 0]), y=float(coords[r, 1]), z=float(coords[r, 2]),
+                       pdbFileName=f"{self.source}#{atoms['resseq'][k]}.{atoms['chain'][k]}",
+                       Model=model)
+
+        if not multigraph:
+            df = df.drop_duplicates(['u', 'v'])
+        for u, v, distance, atom1, atom2, interaction in zip(
+                df['u'].tolist(), df['v'].tolist(), df['Distance'].tolist(),
+                df['Atom1'].tolist(), df['Atom2'].tolist(), df['Interaction'].tolist()):
+            G.add_edge(ids[u], ids[v], Interaction=interaction, Distance=round(distance, 3),
+                       Atom1=atom1, Atom2=atom2, Model=model)
+        nx.set_node_attributes(G, dict(G.degree()), 'Degree')
+        return G
+
+def _table_atoms(df):
+    """Tabela de coordenadas por resíduo -> átomos 'CA' (um por resíduo)"""
+    parts = df['NodeId'].astype(str).str.split(':', expand=True)
+    n = len(df)
+    column = lambda name, default: (df[name] if name in df.columns else pd.Series([default] * n))
+    return {
+        'model': column('Model', 1).fillna(1).astype(np.int64).to_numpy(),
+        'chain': parts[0].to_numpy(),
+        'resseq': pd.to_numeric(parts[1], errors='coerce').fillna(0).astype(np.int64).to_numpy(),
+        'icode': parts[2].to_numpy() if parts.shape[1] > 3 else np.array(['_'] * n),
+        'resname': parts[parts.shape[1] - 1].to_numpy(),
+        'name': np.array(['CA'] * n),
+        'element': np.array(['C'] * n),
+        'x': df['x'].to_numpy(dtype=float), 'y': df['y'].to_numpy(dtype=float),
+        'z': df['z'].to_numpy(dtype=float),
+        'bfactor': column('Bfactor_CA', 0.0).fillna(0.0).to_numpy(dtype=float),
+    }
+
+def iter_structure_models(file_path, hetatm=False):
+    """Conformações do arquivo, uma a uma (PDB/ENT, mmCIF ou tabela de coordenadas)"""
+    lower = file_path.lower()
+    if lower.endswith(('.pdb', '.ent')):
+        yield from iter_pdb_models(file_path, hetatm)
+    elif lower.endswith(('.cif', '.mmcif')):
+        yield from iter_mmcif_models(file_path, hetatm)
+    else:
+        df = read_coordinate_table(file_path)
+        models = df['Model'] if 'Model' in df.columns else pd.Series([1] * len(df))
+        for _, frame in df.groupby(models, sort=False):
+            yield _table_atoms(frame.reset_index(drop=True))
+
+def is_coordinate_table(file_path):
+    return not file_path.lower().endswith(('.pdb', '.ent', '.cif', '.mmcif'))
+
+def build_contact_graph(file_path, cutoffs=None, interactions=None, multigraph=False, model=None):
+    """Constrói a rede de resíduos a partir das coordenadas (primeiro modelo, ou `model`)
+
+    interactions: tipos a calcular (padrão: SSBOND, IONIC, HBOND e VDW para
+    estruturas atômicas; CONTACT entre CAs para tabelas de coordenadas).
+    """
+    start_time = time.perf_counter()
+    if interactions is None:
+        interactions = ('CONTACT',) if is_coordinate_table(file_path) else ATOM_INTERACTIONS
+    for atoms in iter_structure_models(file_path):
+        if model is None or (len(atoms['model']) and atoms['model'][0] == model):
+            break
+    else:
+        raise ValueError(f"Model {model} not found in {file_path}")
+
+    index = ContactIndex(atoms, source=os.path.basename(file_path))
+    G = index.graph(cutoffs, interactions, multigraph)
+    elapsed = time.perf_counter() - start_time
+    print(f"Contact graph built from {os.path.basename(file_path)}: "
+          f"{G.number_of_nodes()} residues, {G.number_of_edges()} contacts ({elapsed:.2f}s)")
+    return G
@@ -0,0 +1,227 @@
+"""KDE por binning linear + convolução FFT (1D e 2D) e painéis de densidade para muitos pontos"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
+from scipy.signal import fftconvolve
+
+# Pontos da grade 1D e de cada eixo da grade 2D
+KDE_GRID = 512
+KDE_GRID_2D = 128
+
+# Extensão da grade além dos dados, em larguras de banda (o mesmo padrão do seaborn)
+KDE_CUT = 3
+
+# Acima deste número de pontos os painéis de dispersão viram histogramas 2D rasterizados
+SCATTER_MAX_POINTS = 5000
+
+def scott_factor(n, d=1):
+    """Fator de Scott (o mesmo do scipy.stats.gaussian_kde)"""
+    return n ** (-1.0 / (d + 4))
+
+def _linear_binning(coords, size):
+    """Binning linear: cada ponto divide seu peso entre os dois nós vizinhos da grade
+
+    `coords` são posições fracionárias (em unidades de passo) já dentro de [0, size - 1].
+    """
+    left = np.clip(np.floor(coords).astype(np.int64), 0, size - 2)
+    frac = coords - left
+    return (np.bincount(left, weights=1 - frac, minlength=size)
+            + np.bincount(left + 1, weights=frac, minlength=size))
+
+def _gaussian_kernel(step, sigma):
+    """Núcleo gaussiano amostrado no passo da grade (comprimento ímpar, centrado)"""
+    half = max(int(np.ceil(4 * sigma / step)), 1)
+    offsets = np.arange(-half, half + 1) * step
+    return np.exp(-0.5 * (offsets / sigma) ** 2) / (np.sqrt(2 * np.pi) * sigma)
+
+class MetricGrid:
+    """Grade de uma métrica, compartilhada por todos os painéis em que ela aparece
+
+    Guarda a largura de banda, a grade e a posição fracionária de cada valor nela;
+    o KDE 1D é calculado uma vez (binning linear + convolução FFT).
+    """
+
+    def __init__(self, values, size=KDE_GRID, cut=KDE_CUT):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.values = self.values[np.isfinite(self.values)]
+        n = len(self.values)
+        self.std = float(np.std(self.values, ddof=1)) if n > 1 else 0.0
+        self.bandwidth = scott_factor(n) * self.std if n > 1 else 0.0
+        lo = self.values.min() - cut * self.bandwidth if n else 0.0
+        hi = self.values.max() + cut * self.bandwidth if n else 1.0
+        if hi <= lo:
+            hi = lo + 1.0
+        self.size = size
+        self.axis = np.linspace(lo, hi, size)
+        self.step = self.axis[1] - self.axis[0]
+        self.coords = (self.values - lo) / self.step
+        self._kde = None
+
+    @property
+    def degenerate(self):
+        """Sem variância (ou um único ponto): não há densidade a estimar"""
+        return self.bandwidth <= 0
+
+    def kde(self):
+        """Densidade na grade (integra 1), ou None se a métrica for constante"""
+        if self.degenerate:
+            return None
+        if self._kde is None:
+            counts = _linear_binning(self.coords, self.size)
+            kernel = _gaussian_kernel(self.step, self.bandwidth)
+            self._kde = np.maximum(fftconvolve(counts, kernel, mode='same'), 0) / len(self.values)
+        return self._kde
+
+    def evaluate(self, points):
+        """KDE interpolado em pontos arbitrários (ex.: a grade de uma figura)"""
+        density = self.kde()
+        return None if density is None else np.interp(points, self.axis, density, left=0, right=0)
+
+    def coarse(self, size):
+        """Posições fracionárias dos valores numa grade de `size` pontos com o mesmo intervalo"""
+        return self.coords * (size - 1) / (self.size - 1)
+
+class DensityGrid:
+    """Grades das colunas de uma tabela: KDE 1D e 2D e histogramas 2D sobre a mesma binagem"""
+
+    def __init__(self, df, size=KDE_GRID, size_2d=KDE_GRID_2D):
+        self.size_2d = size_2d
+        self.grids = {name: MetricGrid(df[name].to_numpy(), size) for name in df.columns}
+        self._finite = {name: np.isfinite(np.asarray(df[name], dtype=np.float64))
+                        for name in df.columns}
+        self._cache = {}
+
+    def __getitem__(self, name):
+        return self.grids[name]
+
+    def _pair_mask(self, x, y):
+        """Para cada métrica, quais dos seus valores finitos têm a outra métrica também finita"""
+        both = self._finite[x] & self._finite[y]
+        return both[self._finite[x]], both[self._finite[y]]
+
+    def _pair_coords(self, x, y):
+        """Posições na grade 2D dos pontos com as duas métricas finitas"""
+        mx, my = self._pair_mask(x, y)
+        return self.grids[x].coarse(self.size_2d)[mx], self.grids[y].coarse(self.size_2d)[my]
+
+    def pair_values(self, x, y):
+        """Valores (x, y) dos pontos com as duas métricas finitas"""
+        mx, my = self._pair_mask(x, y)
+        return self.grids[x].values[mx], self.grids[y].values[my]
+
+    def axes_2d(self, x, y):
+        """Eixos da grade 2D (mesmo intervalo das grades 1D das métricas)"""
+        gx, gy = self.grids[x], self.grids[y]
+        return (np.linspace(gx.axis[0], gx.axis[-1], self.size_2d),
+                np.linspace(gy.axis[0], gy.axis[-1], self.size_2d))
+
+    def hist2d(self, x, y):
+        """Contagem de pontos por célula da grade 2D (linhas = y, colunas = x)"""
+        key = ('hist', x, y)
+        if key not in self._cache:
+            cx, cy = self._pair_coords(x, y)
+            size = self.size_2d
+            cells = np.rint(cy).astype(np.int64) * size + np.rint(cx).astype(np.int64)
+            self._cache[key] = np.bincount(cells, minlength=size * size).reshape(size, size)
+        return self._cache[key]
+
+    def kde2d(self, x, y):
+        """KDE 2D com covariância completa (fator de Scott para d=2); None se degenerado"""
+        key = ('kde', x, y)
+        if key in self._cache:
+            return self._cache[key]
+        gx, gy = self.grids[x], self.grids[y]
+        cx, cy = self._pair_coords(x, y)
+        n = len(cx)
+        if n < 3 or gx.degenerate or gy.degenerate:
+            self._cache[key] = None
+            return None
+        size = self.size_2d
+        ax_x, ax_y = self.axes_2d(x, y)
+        sx, sy = ax_x[1] - ax_x[0], ax_y[1] - ax_y[0]
+        # Covariância dos dados em unidades de célula da grade
+        data = np.column_stack([cx, cy])
+        cov = np.cov(data.T) * scott_factor(n, 2) ** 2
+        if np.linalg.det(cov) <= 0:
+            self._cache[key] = None
+            return None
+
+        left = np.clip(np.floor(data).astype(np.int64), 0, size - 2)
+        frac = data - left
+        counts = np.zeros(size * size)
+        for dx in (0, 1):
+            for dy in (0, 1):
+                w = (frac[:, 0] if dx else 1 - frac[:, 0]) * (frac[:, 1] if dy else 1 - frac[:, 1])
+                cells = (left[:, 1] + dy) * size + (left[:, 0] + dx)
+                counts += np.bincount(cells, weights=w, minlength=size * size)
+        counts = counts.reshape(size, size)
+
+        hx = min(int(np.ceil(4 * np.sqrt(cov[0, 0]))), size - 1)
+        hy = min(int(np.ceil(4 * np.sqrt(cov[1, 1]))), size - 1)
+        ox, oy = np.meshgrid(np.arange(-hx, hx + 1), np.arange(-hy, hy + 1))
+        offsets = np.stack([ox, oy], axis=-1)
+        inv = np.linalg.inv(cov)
+        kernel = np.exp(-0.5 * np.einsum('...i,ij,...j->...', offsets, inv, offsets))
+        kernel /= 2 * np.pi * np.sqrt(np.linalg.det(cov)) * sx * sy
+        density = np.maximum(fftconvolve(counts, kernel, mode='same'), 0) / n
+        self._cache[key] = (ax_x, ax_y, density)
+        return self._cache[key]
+
+def iso_proportion_levels(density, levels=10, thresh=0.05):
+    """Níveis que envolvem proporções iguais da massa (como os contornos do seaborn)"""
+    values = np.sort(density.ravel())[::-1]
+    mass = np.cumsum(values)
+    mass /= mass[-1] if mass[-1] > 0 else 1
+    proportions = np.linspace(thresh, 1, levels)
+    result = np.take(values, np.searchsorted(mass, 1 - proportions), mode='clip')
+    return np.unique(np.append(result, values[0]))
+
+def kde_plot(ax, grid, color='red', fill=False, alpha=0.1, linewidth=2, **kwargs):
+    """Curva do KDE 1D de uma métrica (preenchida como sns.kdeplot(fill=True) quando pedido)"""
+    density = grid.kde()
+    if density is None:
+        return None
+    line = ax.plot(grid.axis, density, color=color, linewidth=linewidth, **kwargs)[0]
+    if fill:
+        ax.fill_between(grid.axis, density, color=color, alpha=alpha, linewidth=0)
+    return line
+
+def kde_contourf(ax, density_grid, x, y, cmap='Reds_r', levels=10, thresh=0.05):
+    """KDE 2D preenchido com níveis de iso-proporção"""
+    result = density_grid.kde2d(x, y)
+    if result is None:
+        return None
+    ax_x, ax_y, density = result
+    bounds = iso_proportion_levels(density, levels, thresh)
+    if len(bounds) < 2:
+        return None
+    return ax.contourf(ax_x, ax_y, density, levels=bounds, cmap=cmap)
+
+def density_scatter(ax, density_grid, x, y, max_points=SCATTER_MAX_POINTS, cmap='Reds', **kwargs):
+    """Dispersão dos pontos; acima de max_points, histograma 2D rasterizado na grade compartilhada"""
+    xs, ys = density_grid.pair_values(x, y)
+    if len(xs) <= max_points:
+        return ax.scatter(xs, ys, **kwargs)
+    counts = density_grid.hist2d(x, y).astype(np.float64)
+    counts[counts == 0] = np.nan
+    ax_x, ax_y = density_grid.axes_2d(x, y)
+    half_x, half_y = (ax_x[1] - ax_x[0]) / 2, (ax_y[1] - ax_y[0]) / 2
+    vmax = np.nanmax(counts) if np.isfinite(counts).any() else 1
+    return ax.imshow(counts, origin='lower', aspect='auto', cmap=cmap, interpolation='nearest',
+                     norm=LogNorm(vmin=1, vmax=max(vmax, 1)),
+                     extent=(ax_x[0] - half_x, ax_x[-1] + half_x, ax_y[0] - half_y, ax_y[-1] + half_y))
+
+def pair_scatter(x, y, grid, hue=None, hue_order=None, palette=None, label=None, **kwargs):
+    """Para PairGrid.map_upper: dispersão (ou histograma 2D) de duas colunas da tabela"""
+    return density_scatter(plt.gca(), grid, x.name, y.name, **kwargs)
+
+def pair_kde_fill(x, y, grid, hue=None, hue_order=None, palette=None, label=None, color=None,
+                  cmap='Reds_r', **kwargs):
+    """Para PairGrid.map_lower: KDE 2D preenchido (substitui sns.kdeplot(fill=True))"""
+    return kde_contourf(plt.gca(), grid, x.name, y.name, cmap=cmap, **kwargs)
+
+def pair_kde(x, grid, hue=None, hue_order=None, palette=None, label=None, legend=None, color=None,
+             **kwargs):
+    """Para PairGrid.map_diag: curva do KDE 1D (substitui sns.kdeplot, mesma cor padrão)"""
+    return kde_plot(plt.gca(), grid[x.name], color=color or 'C0', **kwargs)
@@ -0,0 +1,237 @@
+"""Renderização das figuras em paralelo (backend Agg) com cache por hash dos dados e do estilo"""
+
+import functools
+import hashlib
+import importlib
+import inspect
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+import numpy as np
+
+from graph_csr import get_csr
+from centrality_engine import resolve_workers
+
+DEFAULT_FIGURE_CACHE = 'figure_cache'
+
+# Tamanho máximo do cache de figuras; as entradas usadas há mais tempo saem primeiro
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+
+# Módulos auxiliares que desenham as figuras: o código deles entra na chave de
+# todas as figuras, então mudar o estilo de um helper invalida os PNGs guardados
+STYLE_MODULES = ('density', 'network_render', 'layout_engine')
+
+@functools.lru_cache(maxsize=None)
+def _module_source_digest(name):
+    """Hash do código-fonte de um módulo ('' se não puder ser lido)"""
+    try:
+        source = inspect.getsource(importlib.import_module(name))
+    except (ImportError, OSError, TypeError):
+        return ''
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+class FigureJob:
+    """Uma figura independente: func(*args, output_folder, **kwargs) grava os PNGs em output_folder
+
+    `prepare`: função sem argumentos executada no processo principal antes da
+    renderização (uma vez por objeto, mesmo se várias figuras a compartilham),
+    ex.: gravar no store o layout que as figuras vão ler.
+    """
+
+    def __init__(self, name, func, args=(), kwargs=None, prepare=None):
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.kwargs = kwargs or {}
+        self.prepare = prepare
+
+    def key(self):
+        """Hash dos dados de entrada e do código que define o estilo da figura"""
+        h = hashlib.sha256()
+        h.update(f'{self.func.__module__}.{self.func.__qualname__}'.encode('utf-8'))
+        try:
+            h.update(inspect.getsource(self.func).encode('utf-8'))
+        except (OSError, TypeError):
+            pass
+        for module in STYLE_MODULES:
+            h.update(_module_source_digest(module).encode('utf-8'))
+        for value in self.args:
+            _feed(h, value)
+        for name in sorted(self.kwargs):
+            h.update(name.encode('utf-8'))
+            _feed(h, self.kwargs[name])
+        return h.hexdigest()[:20]
+
+def _feed(h, value):
+    """Atualiza o hash com um argumento em forma canônica
+
+    Grafos entram pela impressão digital; números como float64, dicionários e
+    conjuntos com as chaves ordenadas. Assim a chave não depende da ordem de
+    inserção nem do tipo numérico (float, np.float32, int) de quem montou o valor.
+    """
+    if isinstance(value, nx.Graph):
+        csr = get_csr(value)
+        h.update(b'G' + csr.fingerprint().encode('utf-8'))
+        h.update(np.asarray(csr.node_ids).astype(str).tobytes())
+    elif value is None or isinstance(value, (bool, np.bool_)):
+        h.update(b'c' + repr(None if value is None else bool(value)).encode('utf-8'))
+    elif isinstance(value, (int, float, np.integer, np.floating)):
+        h.update(b'f' + np.float64(value).tobytes())
+    elif isinstance(value, str):
+        h.update(b's%d:' % len(value) + value.encode('utf-8'))
+    elif isinstance(value, bytes):
+        h.update(b'b%d:' % len(value) + value)
+    elif isinstance(value, np.ndarray):
+        h.update(b'a' + repr(value.shape).encode('utf-8'))
+        if value.dtype.kind in 'biuf':
+            h.update(np.ascontiguousarray(value, dtype=np.float64).tobytes())
+        else:
+            h.update(value.astype(str).tobytes())
+    elif isinstance(value, dict):
+        h.update(b'd%d' % len(value))
+        for key, item in sorted(value.items(), key=lambda kv: str(kv[0])):
+            _feed(h, key)
+            _feed(h, item)
+    elif isinstance(value, (set, frozenset)):
+        h.update(b'S%d' % len(value))
+        for item in sorted(value, key=str):
+            _feed(h, item)
+    elif isinstance(value, (list, tuple)):
+        h.update(b'l%d' % len(value))
+        for item in value:
+            _feed(h, item)
+    elif hasattr(value, '__dict__'):
+        # Objetos simples (ex.: CentralityStore) entram pelo tipo e pelos atributos
+        h.update(f'o{type(value).__module__}.{type(value).__qualname__}'.encode('utf-8'))
+        _feed(h, vars(value))
+    else:
+        h.update(b'p' + pickle.dumps(value, protocol=4))
+
+def _init_worker():
+    """Inicializador do pool: figuras sempre no backend não interativo"""
+    import matplotlib.pyplot as plt
+    plt.switch_backend('Agg')
+
+def _render(func, args, kwargs, folder):
+    """Executa a função de figura numa pasta temporária e mede o tempo"""
+    start = time.perf_counter()
+    result = func(*args, folder, **kwargs)
+    return result, time.perf_counter() - start
+
+def _cached(cache_dir, key):
+    """Pasta do cache da figura, se já renderizada"""
+    entry = os.path.join(cache_dir, key)
+    return entry if os.path.exists(os.path.join(entry, 'result.pkl')) else None
+
+def _store(cache_dir, key, folder, result):
+    """Grava o valor de retorno na pasta renderizada e a publica no cache com os.replace
+
+    A pasta de staging fica dentro do cache, então a entrada aparece completa de
+    uma só vez; se outra execução publicou a mesma chave antes, vale a dela.
+    """
+    with open(os.path.join(folder, 'result.pkl'), 'wb') as f:
+        pickle.dump(result, f)
+    entry = os.path.join(cache_dir, key)
+    if os.path.isdir(entry) and _cached(cache_dir, key) is None:
+        # Resto de uma entrada incompleta
+        shutil.rmtree(entry, ignore_errors=True)
+    try:
+        os.replace(folder, entry)
+    except OSError:
+        if _cached(cache_dir, key) is None:
+            raise
+    return entry
+
+def _publish(entry, output_folder):
+    """Copia os arquivos de uma entrada do cache para a pasta de resultados"""
+    for name in os.listdir(entry):
+        if name != 'result.pkl':
+            shutil.copy2(os.path.join(entry, name), os.path.join(output_folder, name))
+    result_path = os.path.join(entry, 'result.pkl')
+    with open(result_path, 'rb') as f:
+        result = pickle.load(f)
+    # O mtime do result.pkl marca o último uso (despejo LRU)
+    os.utime(result_path)
+    return result
+
+def evict(cache_dir, max_bytes=DEFAULT_MAX_BYTES, keep=()):
+    """Remove as figuras usadas há mais tempo até o cache caber em max_bytes"""
+    entries = []
+    for key in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, key)
+        result_path = os.path.join(entry, 'result.pkl')
+        if not os.path.exists(result_path):
+            continue
+        size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+        entries.append((os.path.getmtime(result_path), entry, size))
+
+    total = sum(size for _, _, size in entries)
+    for _, entry, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if entry in keep:
+            continue
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+
+def render_figures(jobs, output_folder, cache_dir=DEFAULT_FIGURE_CACHE, workers=None,
+                   max_bytes=DEFAULT_MAX_BYTES):
+    """Renderiza as figuras que mudaram num pool de processos e reaproveita as demais
+
+    Devolve ({nome: valor de retorno}, {nome: segundos de renderização ou None se veio do cache}).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    results, timings = {}, {}
+
+    pending = []
+    for job in jobs:
+        key = job.key()
+        entry = _cached(cache_dir, key)
+        if entry is not None:
+            results[job.name] = _publish(entry, output_folder)
+            timings[job.name] = None
+            print(f"   {job.name}: unchanged, reused from cache")
+        else:
+            pending.append((job, key))
+
+    if pending:
+        # Preparos compartilhados (ex.: layout) rodam uma vez aqui, não em cada processo do pool
+        for prepare in {id(job.prepare): job.prepare for job, _ in pending if job.prepare}.values():
+            prepare()
+
+        workers = min(resolve_workers(workers), len(pending))
+        staging = tempfile.mkdtemp(prefix='figures_', dir=cache_dir)
+        try:
+            folders = {}
+            for job, _ in pending:
+                folders[job.name] = os.path.join(staging, job.name)
+                os.makedirs(folders[job.name])
+
+            if workers == 1:
+                _init_worker()
+                outcomes = {job.name: _render(job.func, job.args, job.kwargs, folders[job.name])
+                            for job, _ in pending}
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                    futures = {job.name: pool.submit(_render, job.func, job.args, job.kwargs,
+                                                     folders[job.name])
+                               for job, _ in pending}
+                    outcomes = {name: future.result() for name, future in futures.items()}
+
+            for job, key in pending:
+                result, elapsed = outcomes[job.name]
+                entry = _store(cache_dir, key, folders[job.name], result)
+                results[job.name] = _publish(entry, output_folder)
+                timings[job.name] = elapsed
+                print(f"   {job.name}: rendered in {elapsed:.2f}s")
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        evict(cache_dir, max_bytes, keep={os.path.join(cache_dir, key) for _, key in pending})
+
+    return results, timings
@@ -0,0 +1,393 @@
+"""Representação CSR (compressed sparse row) do grafo e cache binário em disco"""
+
+import hashlib
+import json
+import os
+import time
+from itertools import chain
+
+import networkx as nx
+import numpy as np
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = '.csr'
+
+class CSRGraph:
+    """Grafo não direcionado simples em arrays CSR, com atributos colunares"""
+
+    def __init__(self, node_ids, indptr, indices, weights=None,
+                 edges=None, node_attrs=None, edge_attrs=None, attr_kinds=None):
+        self.node_ids = node_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights if weights is not None else np.ones(len(indices))
+        # Lista canônica de arestas (u < v), alinhada com edge_attrs
+        self.edges = edges if edges is not None else _edges_from_csr(indptr, indices)
+        self.node_attrs = node_attrs or {}
+        self.edge_attrs = edge_attrs or {}
+        self.attr_kinds = attr_kinds or {}
+        self._index = None
+        self._lists = None
+        self._fingerprint = None
+        self._edge_keys = None
+        self._weights_digest = None
+
+    @property
+    def n(self):
+        return len(self.indptr) - 1
+
+    @property
+    def m(self):
+        return len(self.edges)
+
+    @property
+    def index(self):
+        """Dicionário id do nó -> posição nos arrays (construído sob demanda)"""
+        if self._index is None:
+            self._index = {node: i for i, node in enumerate(self.node_list())}
+        return self._index
+
+    def node_list(self):
+        """Ids dos nós como objetos Python, na ordem dos arrays"""
+        return self.node_ids.tolist()
+
+    def degree(self):
+        return np.diff(self.indptr)
+
+    def neighbors(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def adjacency_lists(self):
+        """indptr/indices como listas Python (acesso escalar rápido nos laços de BFS)"""
+        if self._lists is None:
+            self._lists = (self.indptr.tolist(), self.indices.tolist())
+        return self._lists
+
+    def to_scipy(self):
+        """Matriz de adjacência esparsa (scipy.sparse.csr_matrix) sem copiar os arrays"""
+        from scipy import sparse
+        return sparse.csr_matrix((self.weights, self.indices, self.indptr),
+                                 shape=(self.n, self.n))
+
+    def edge_keys(self):
+        """Entradas da matriz como chaves linha * n + coluna, ordenadas (para comparar com um grafo)"""
+        if self._edge_keys is None:
+            src = np.repeat(np.arange(self.n, dtype=np.int64), np.diff(self.indptr))
+            self._edge_keys = np.sort(src * self.n + self.indices)
+        return self._edge_keys
+
+    def matches(self, G):
+        """Confere se o grafo ainda tem exatamente estes nós e arestas (O(m), sem atributos)
+
+        Comparar só n e m não basta: remover uma aresta e adicionar outra mantém
+        as contagens e deixaria o CSR (e a impressão digital) desatualizados.
+        """
+        if self.n != G.number_of_nodes():
+            return False
+        index = self.index
+        if any(node not in index for node in G):
+            return False
+        # Percorre o dicionário de adjacência do NetworkX em nível C (map/chain), sem as
+        # views de G.adj/G.edges(); a contagem de arestas sai dos graus
+        adj = G._adj
+        get = index.__getitem__
+        rows = np.fromiter(map(get, adj), dtype=np.int64, count=self.n)
+        degree = np.fromiter(map(len, adj.values()), dtype=np.int64, count=self.n)
+        if degree.sum() != len(self.indices):
+            return False
+        cols = np.fromiter(chain.from_iterable(map(get, nbrs) for nbrs in adj.values()),
+                           dtype=np.int64, count=len(self.indices))
+        keys = np.sort(np.repeat(rows, degree) * self.n + cols)
+        return np.array_equal(keys, self.edge_keys())
+
+    def fingerprint(self):
+        """Hash da lista canônica de arestas (ids ordenados), independente da ordem de leitura"""
+        if self._fingerprint is not None:
+            return self._fingerprint
+        ids = np.asarray(self.node_ids).astype(str)
+        order = np.argsort(ids, kind='stable')
+        rank = np.empty(self.n, dtype=np.int64)
+        rank[order] = np.arange(self.n)
+
+        edges = rank[np.asarray(self.edges, dtype=np.int64)].reshape(-1, 2)
+        edges.sort(axis=1)
+        edges = edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+
+        h = hashlib.sha256()
+        h.update('\n'.join(ids[order].tolist()).encode('utf-8'))
+        h.update(np.ascontiguousarray(edges).tobytes())
+        self._fingerprint = h.hexdigest()[:16]
+        return self._fingerprint
+
+    def weights_digest(self):
+        """Hash dos pesos das arestas (atributo 'weight'), independente da ordem de leitura
+
+        A impressão digital cobre só a topologia; métricas que leem os pesos
+        (PageRank, comunidades) levam este hash nos parâmetros do store.
+        """
+        if self._weights_digest is not None:
+            return self._weights_digest
+        ids = np.asarray(self.node_ids).astype(str)
+        rank = np.empty(self.n, dtype=np.int64)
+        rank[np.argsort(ids, kind='stable')] = np.arange(self.n)
+        src = rank[np.repeat(np.arange(self.n), np.diff(self.indptr))]
+        dst = rank[self.indices]
+        order = np.lexsort((dst, src))
+        weights = np.ascontiguousarray(self.weights[order], dtype=np.float64)
+        self._weights_digest = hashlib.sha256(weights.tobytes()).hexdigest()[:16]
+        return self._weights_digest
+
+    @classmethod
+    def from_networkx(cls, G):
+        """Converte um grafo NetworkX (arestas paralelas são mescladas)"""
+        nodes = list(G.nodes())
+        index = {node: i for i, node in enumerate(nodes)}
+        n = len(nodes)
+
+        seen = {}
+        for u, v, data in G.edges(data=True):
+            a, b = index[u], index[v]
+            key = (a, b) if a <= b else (b, a)
+            if key not in seen:
+                seen[key] = data
+        edges = np.array(list(seen.keys()), dtype=np.int64).reshape(-1, 2)
+        edge_data = list(seen.values())
+
+        weights = np.array([float(d.get('weight', 1.0)) for d in edge_data], dtype=np.float64)
+        indptr, indices, csr_weights = _build_csr(n, edges, weights)
+
+        node_attrs, kinds = _columnar([G.nodes[node] for node in nodes])
+        edge_attrs, edge_kinds = _columnar(edge_data)
+        kinds.update({f'edge:{k}': v for k, v in edge_kinds.items()})
+
+        return cls(_id_array(nodes), indptr, indices, csr_weights,
+                   edges=edges.astype(np.int32), node_attrs=node_attrs,
+                   edge_attrs=edge_attrs, attr_kinds=kinds)
+
+    def to_networkx(self):
+        """Reconstrói um nx.Graph com os atributos originais"""
+        G = nx.Graph()
+        nodes = self.node_list()
+
+        node_columns = {name: _column_values(col, self.attr_kinds.get(name))
+                        for name, col in self.node_attrs.items()}
+        for i, node in enumerate(nodes):
+            G.add_node(node, **{name: values[i] for name, values in node_columns.items()
+                                if values[i] is not None})
+
+        edge_columns = {name: _column_values(col, self.attr_kinds.get(f'edge:{name}'))
+                        for name, col in self.edge_attrs.items()}
+        for k, (a, b) in enumerate(np.asarray(self.edges).tolist()):
+            attrs = {name: values[k] for name, values in edge_columns.items()
+                     if values[k] is not None}
+            G.add_edge(nodes[a], nodes[b], **attrs)
+
+        G.graph['csr'] = self
+        return G
+
+def _id_array(nodes):
+    """Ids dos nós como array NumPy (texto de largura fixa ou inteiros)"""
+    if all(isinstance(node, (int, np.integer)) and not isinstance(node, bool) for node in nodes):
+        return np.array(nodes, dtype=np.int64)
+    return np.array([str(node) for node in nodes], dtype=str)
+
+def _build_csr(n, edges, weights):
+    """Monta indptr/indices/pesos a partir da lista de arestas não direcionadas"""
+    loops = edges[:, 0] == edges[:, 1]
+    src = np.concatenate([edges[:, 0], edges[~loops, 1]])
+    dst = np.concatenate([edges[:, 1], edges[~loops, 0]])
+    w = np.concatenate([weights, weights[~loops]])
+
+    order = np.lexsort((dst, src))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst[order].astype(np.int32), w[order]
+
+def _edges_from_csr(indptr, indices):
+    """Lista canônica (u <= v) das arestas de uma matriz CSR simétrica"""
+    src = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    mask = src <= indices
+    return np.column_stack([src[mask], indices[mask]]).astype(np.int32)
+
+def _columnar(records):
+    """Converte uma lista de dicionários de atributos em colunas tipadas"""
+    names = []
+    for record in records:
+        for name in record:
+            if name not in names:
+                names.append(name)
+
+    columns, kinds = {}, {}
+    for name in names:
+        values = [record.get(name) for record in records]
+        present = [v for v in values if v is not None]
+        if all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in present):
+            kinds[name] = 'int'
+        elif all(isinstance(v, (int, float, np.number)) and not isinstance(v, bool) for v in present):
+            kinds[name] = 'float'
+        else:
+            kinds[name] = 'str'
+
+        if kinds[name] == 'str':
+            columns[name] = np.array(['' if v is None else str(v) for v in values], dtype=str)
+        else:
+            columns[name] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return columns, kinds
+
+def _column_values(column, kind):
+    """Converte uma coluna de volta para valores Python (None para ausentes)"""
+    values = column.tolist()
+    if kind == 'str':
+        return [v if v != '' else None for v in values]
+    if kind == 'int':
+        return [None if v != v else int(v) for v in values]
+    return [None if v != v else v for v in values]
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    """Hash SHA-256 do conteúdo do arquivo, lido em blocos"""
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def cache_dir_for(file_path):
+    """Pasta do cache binário ao lado do GEXF ('rede.gexf' -> 'rede.gexf.csr/')"""
+    return file_path + CACHE_SUFFIX
+
+def save_csr_cache(csr, file_path, source_hash=None):
+    """Grava o grafo CSR como arrays .npy brutos (mapeáveis em memória) ao lado do GEXF"""
+    cache_dir = cache_dir_for(file_path)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    arrays = {
+        'indptr': csr.indptr,
+        'indices': csr.indices,
+        'weights': csr.weights,
+        'edges': csr.edges,
+        'node_ids': csr.node_ids,
+    }
+    for i, name in enumerate(csr.node_attrs):
+        arrays[f'node_attr_{i}'] = csr.node_attrs[name]
+    for i, name in enumerate(csr.edge_attrs):
+        arrays[f'edge_attr_{i}'] = csr.edge_attrs[name]
+
+    for name, array in arrays.items():
+        np.save(os.path.join(cache_dir, f'{name}.npy'), np.asarray(array))
+
+    stat = os.stat(file_path)
+    meta = {
+        'version': CACHE_VERSION,
+        'source_sha256': source_hash or file_sha256(file_path),
+        'source_size': stat.st_size,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'n': csr.n,
+        'm': csr.m,
+        'node_attrs': list(csr.node_attrs),
+        'edge_attrs': list(csr.edge_attrs),
+        'attr_kinds': csr.attr_kinds,
+    }
+    # meta.json é escrito por último: sua presença indica um cache completo
+    tmp_path = os.path.join(cache_dir, 'meta.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(cache_dir, 'meta.json'))
+    return cache_dir
+
+def load_csr_cache(file_path, mmap_mode='r'):
+    """Abre o cache do GEXF se ele corresponder ao conteúdo atual do arquivo, senão None"""
+    cache_dir = cache_dir_for(file_path)
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != CACHE_VERSION:
+        return None
+
+    # Tamanho e mtime iguais dispensam o re-hash; caso contrário confere o conteúdo
+    stat = os.stat(file_path)
+    unchanged = (stat.st_size == meta.get('source_size')
+                 and stat.st_mtime_ns == meta.get('source_mtime_ns'))
+    if not unchanged and file_sha256(file_path) != meta.get('source_sha256'):
+        return None
+
+    def load(name):
+        return np.load(os.path.join(cache_dir, f'{name}.npy'), mmap_mode=mmap_mode)
+
+    try:
+        node_attrs = {name: load(f'node_attr_{i}') for i, name in enumerate(meta['node_attrs'])}
+        edge_attrs = {name: load(f'edge_attr_{i}') for i, name in enumerate(meta['edge_attrs'])}
+        return CSRGraph(load('node_ids'), load('indptr'), load('indices'), load('weights'),
+                        edges=load('edges'), node_attrs=node_attrs,
+                        edge_attrs=edge_attrs, attr_kinds=meta.get('attr_kinds', {}))
+    except (OSError, ValueError, KeyError):
+        return None
+
+def get_csr(G):
+    """CSR associado ao grafo (reaproveita G.graph['csr'] enquanto o grafo não mudar)
+
+    Grafos congelados (nx.freeze, como os de load_graph_cached) não mudam de
+    topologia: o CSR é reaproveitado direto. Nos demais, o CSR guardado é
+    conferido contra o conjunto de arestas atual (O(m)) e reconstruído se o grafo
+    foi editado.
+    """
+    csr = G.graph.get('csr')
+    # O token é o id do grafo congelado: uma cópia (G.copy() leva G.graph junto) não herda a confiança
+    if csr is not None and nx.is_frozen(G) and G.graph.get('csr_frozen') == id(G):
+        return csr
+    if csr is None or not csr.matches(G):
+        csr = CSRGraph.from_networkx(G)
+        G.graph['csr'] = csr
+    _trust_frozen(G)
+    return csr
+
+def _trust_frozen(G):
+    """Marca o CSR de um grafo congelado como válido para sempre"""
+    if nx.is_frozen(G):
+        G.graph['csr_frozen'] = id(G)
+    else:
+        G.graph.pop('csr_frozen', None)
+
+def freeze_with_csr(G):
+    """Congela o grafo (nx.freeze) e marca o CSR atual como válido: get_csr em O(1)"""
+    get_csr(G)
+    nx.freeze(G)
+    _trust_frozen(G)
+    return G
+
+def load_graph_cached(file_path, loader, use_cache=True):
+    """Carrega o grafo pelo cache CSR; na primeira vez usa `loader` e grava o cache
+
+    O grafo devolvido é congelado (a topologia não pode mudar; atributos podem)
+    e leva o CSR já validado. As etapas ainda recebem um nx.Graph: a leitura do
+    cache reconstrói o dicionário de adjacência em cada processo.
+    """
+    if use_cache:
+        start_time = time.perf_counter()
+        csr = load_csr_cache(file_path)
+        if csr is not None:
+            G = freeze_with_csr(csr.to_networkx())
+            G.graph['from_cache'] = True
+            print(f"Grafo carregado do cache binário '{cache_dir_for(file_path)}' "
+                  f"({time.perf_counter() - start_time:.3f}s)")
+            print(f"Número de nós: {G.number_of_nodes()}")
+            print(f"Número de arestas: {G.number_of_edges()}")
+            return G
+
+    G = loader(file_path)
+    if G is None or not use_cache:
+        return G
+
+    csr = CSRGraph.from_networkx(G)
+    G.graph['csr'] = csr
+    freeze_with_csr(G)
+    try:
+        save_csr_cache(csr, file_path)
+    except OSError as e:
+        print(f"Não foi possível gravar o cache binário: {e}")
+    return G
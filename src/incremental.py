@@ -0,0 +1,294 @@
+"""Atualização incremental de centralidades após remoção/inserção de arestas e nós"""
+
+import networkx as nx
+import numpy as np
+from scipy.sparse.csgraph import shortest_path
+
+from graph_csr import get_csr
+from centrality_engine import bfs_counts, brandes_dependencies, sweep_all_sources
+from kcore import core_numbers
+
+# Distância usada para pares sem caminho (a matriz é uint16)
+UNREACHABLE = np.iinfo(np.uint16).max
+
+# Linhas da matriz de distâncias calculadas por bloco na inicialização
+DISTANCE_BLOCK = 512
+
+class IncrementalCentrality:
+    """Estado (distâncias entre todos os pares, betweenness bruta, coreness) atualizável localmente
+
+    Uma remoção só afeta as fontes s em cujo DAG de caminhos mínimos a aresta
+    aparece (|d(s,u) - d(s,v)| = 1); uma inserção só afeta as fontes com
+    d(s,u) != d(s,v). Para essas fontes a contribuição de Brandes antiga é
+    subtraída e a nova somada; as demais linhas da matriz não mudam. A memória é
+    O(n²) em uint16, adequada a redes de resíduos de até algumas dezenas de
+    milhares de nós.
+    """
+
+    def __init__(self, G, workers=None):
+        csr = get_csr(G)
+        self.nodes = csr.node_list()
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        indptr, indices = csr.adjacency_lists()
+        self.adj = [indices[indptr[i]:indptr[i + 1]] for i in range(csr.n)]
+        self.alive = np.ones(csr.n, dtype=bool)
+
+        self.distances = np.full((csr.n, csr.n), UNREACHABLE, dtype=np.uint16)
+        matrix = csr.to_scipy()
+        for start in range(0, csr.n, DISTANCE_BLOCK):
+            rows = np.arange(start, min(start + DISTANCE_BLOCK, csr.n))
+            block = shortest_path(matrix, directed=False, unweighted=True, indices=rows)
+            reachable = np.isfinite(block)
+            self.distances[rows[:, None], np.arange(csr.n)] = np.where(reachable, block, UNREACHABLE)
+
+        # Soma bruta das dependências de Brandes (sem normalização)
+        _, totals = sweep_all_sources(G, workers)
+        self.betweenness = totals[0].copy()
+
+        self.core = core_numbers(csr)
+
+        self._row_stats(np.arange(csr.n))
+        self.last_affected = 0
+
+    def copy(self):
+        """Cópia independente (para cenários 'e se' a partir do mesmo estado base)"""
+        other = object.__new__(IncrementalCentrality)
+        other.nodes = list(self.nodes)
+        other.index = dict(self.index)
+        other.adj = [list(neighbors) for neighbors in self.adj]
+        for name in ('alive', 'distances', 'betweenness', 'core',
+                     'dist_total', 'reach', 'eccentricity'):
+            setattr(other, name, getattr(self, name).copy())
+        other.last_affected = self.last_affected
+        return other
+
+    @property
+    def n(self):
+        return int(self.alive.sum())
+
+    def _row_stats(self, rows):
+        """Recalcula soma de distâncias, alcance e excentricidade das linhas informadas"""
+        if not hasattr(self, 'dist_total'):
+            size = len(self.nodes)
+            self.dist_total = np.zeros(size)
+            self.reach = np.zeros(size, dtype=np.int64)
+            self.eccentricity = np.zeros(size, dtype=np.int64)
+        if len(rows) == 0:
+            return
+        block = self.distances[rows].astype(np.int64)
+        mask = (block != UNREACHABLE) & self.alive[None, :]
+        self.dist_total[rows] = np.where(mask, block, 0).sum(axis=1)
+        self.reach[rows] = mask.sum(axis=1)
+        self.eccentricity[rows] = np.where(mask, block, 0).max(axis=1)
+
+    def _dependencies(self, s):
+        """BFS + Brandes a partir de s: devolve (nós alcançados, distâncias, dependências)"""
+        size = len(self.nodes)
+        dist = [-1] * size
+        sigma = [0.0] * size
+        delta = [0.0] * size
+        order = bfs_counts(self.adj, s, dist, sigma)
+        brandes_dependencies(self.adj, order, dist, sigma, delta)
+        dependencies = np.array([delta[v] for v in order])
+        dependencies[0] = 0.0  # a fonte não conta para si mesma
+        return (np.array(order, dtype=np.int64),
+                np.array([dist[v] for v in order], dtype=np.int64), dependencies)
+
+    def _affected_sources(self, edges, inserting):
+        """Fontes cujo DAG de caminhos mínimos muda com as arestas informadas"""
+        affected = np.zeros(len(self.nodes), dtype=bool)
+        for a, b in edges:
+            du = self.distances[:, a].astype(np.int64)
+            dv = self.distances[:, b].astype(np.int64)
+            if inserting:
+                affected |= du != dv
+            else:
+                reachable = (du != UNREACHABLE) & (dv != UNREACHABLE)
+                affected |= reachable & (np.abs(du - dv) == 1)
+        return np.flatnonzero(affected & self.alive)
+
+    def _update(self, edges, inserting):
+        """Aplica um lote de remoções ou inserções, recalculando só as fontes afetadas"""
+        if not edges:
+            return
+        affected = self._affected_sources(edges, inserting)
+
+        # Componentes tocados pelas arestas: quando as fontes afetadas são a maioria
+        # (ex.: pontes em redes quase arbóreas), recalcular o componente inteiro a
+        # partir do zero custa menos que subtrair e somar as contribuições
+        touched = np.zeros(len(self.nodes), dtype=bool)
+        for a, b in edges:
+            touched |= (self.distances[a] != UNREACHABLE) | (self.distances[b] != UNREACHABLE)
+        component = np.flatnonzero(touched & self.alive)
+        rebuild = 2 * len(affected) > len(component)
+
+        if rebuild:
+            affected = component
+            self.betweenness[component] = 0.0
+        else:
+            for s in affected:
+                order, _, dependencies = self._dependencies(s)
+                self.betweenness[order] -= dependencies
+
+        for a, b in edges:
+            if inserting:
+                self.adj[a].append(b)
+                self.adj[b].append(a)
+            else:
+                self.adj[a].remove(b)
+                self.adj[b].remove(a)
+            self._update_core(a, b, inserting)
+
+        for s in affected:
+            order, dist, dependencies = self._dependencies(s)
+            self.betweenness[order] += dependencies
+            self.distances[s] = UNREACHABLE
+            self.distances[s, order] = dist
+        # A matriz é simétrica: as colunas das fontes afetadas acompanham as linhas
+        self.distances[:, affected] = self.distances[affected].T
+        self._row_stats(affected)
+        self.last_affected = len(affected)
+
+    def _update_core(self, a, b, inserting):
+        """Manutenção da coreness pelo algoritmo de subcore (muda no máximo 1 por aresta)"""
+        k = min(self.core[a], self.core[b])
+        roots = [x for x in (a, b) if self.core[x] == k]
+
+        # Subcore: nós com coreness k conectados às raízes por nós de coreness k
+        candidates = set(roots)
+        stack = list(roots)
+        while stack:
+            v = stack.pop()
+            for w in self.adj[v]:
+                if self.core[w] == k and w not in candidates:
+                    candidates.add(w)
+                    stack.append(w)
+
+        if inserting:
+            # Quem não tem mais de k vizinhos "fortes" não sobe para k + 1
+            strong = {v: sum(1 for w in self.adj[v]
+                             if self.core[w] > k or w in candidates) for v in candidates}
+            evicted = set()
+            queue = [v for v in candidates if strong[v] <= k]
+            while queue:
+                v = queue.pop()
+                if v in evicted:
+                    continue
+                evicted.add(v)
+                for w in self.adj[v]:
+                    if w in candidates and w not in evicted:
+                        strong[w] -= 1
+                        if strong[w] <= k:
+                            queue.append(w)
+            for v in candidates - evicted:
+                self.core[v] = k + 1
+        else:
+            # Quem fica com menos de k vizinhos de coreness >= k desce para k - 1
+            support = {v: sum(1 for w in self.adj[v] if self.core[w] >= k) for v in candidates}
+            queue = [v for v in candidates if support[v] < k]
+            dropped = set()
+            while queue:
+                v = queue.pop()
+                if v in dropped:
+                    continue
+                dropped.add(v)
+                self.core[v] = k - 1
+                for w in self.adj[v]:
+                    if w in candidates and w not in dropped:
+                        support[w] -= 1
+                        if support[w] < k:
+                            queue.append(w)
+
+    def _edge_indices(self, edges, must_exist):
+        """Converte pares de ids em índices, validando existência da aresta"""
+        result = []
+        for u, v in edges:
+            if u not in self.index or v not in self.index:
+                raise nx.NetworkXError(f"Node {u if u not in self.index else v} not in graph")
+            a, b = self.index[u], self.index[v]
+            exists = b in self.adj[a]
+            if must_exist and not exists:
+                raise nx.NetworkXError(f"The edge {u}-{v} is not in the graph")
+            if not must_exist and (exists or a == b or (a, b) in result or (b, a) in result):
+                continue
+            result.append((a, b))
+        return result
+
+    def apply(self, removed_edges=(), added_edges=(), removed_nodes=(), added_nodes=()):
+        """Aplica remoções (nós e arestas) e depois inserções (nós e arestas)"""
+        removed = self._edge_indices(removed_edges, must_exist=True)
+        for node in removed_nodes:
+            if node not in self.index or not self.alive[self.index[node]]:
+                raise nx.NetworkXError(f"The node {node} is not in the graph")
+            i = self.index[node]
+            removed.extend((i, j) for j in self.adj[i]
+                           if (i, j) not in removed and (j, i) not in removed)
+        self._update(removed, inserting=False)
+
+        for node in removed_nodes:
+            i = self.index[node]
+            self.alive[i] = False
+            self.core[i] = 0
+            self.betweenness[i] = 0.0
+        if removed_nodes:
+            # O nó removido deixa de contar no alcance das demais linhas
+            self._row_stats(np.flatnonzero(self.alive))
+
+        for node in added_nodes:
+            self._add_node(node)
+        self._update(self._edge_indices(added_edges, must_exist=False), inserting=True)
+        return self
+
+    def _add_node(self, node):
+        """Acrescenta um nó isolado (cresce a matriz de distâncias)"""
+        if node in self.index:
+            i = self.index[node]
+            if not self.alive[i]:
+                self.alive[i] = True
+                self.distances[i] = UNREACHABLE
+                self.distances[:, i] = UNREACHABLE
+                self.distances[i, i] = 0
+                self._row_stats(np.flatnonzero(self.alive))
+            return
+        i = len(self.nodes)
+        self.nodes.append(node)
+        self.index[node] = i
+        self.adj.append([])
+        self.distances = np.pad(self.distances, ((0, 1), (0, 1)), constant_values=UNREACHABLE)
+        self.distances[i, i] = 0
+        self.alive = np.append(self.alive, True)
+        self.betweenness = np.append(self.betweenness, 0.0)
+        self.core = np.append(self.core, 0)
+        self.dist_total = np.append(self.dist_total, 0.0)
+        self.reach = np.append(self.reach, 1)
+        self.eccentricity = np.append(self.eccentricity, 0)
+
+    def remove_edge(self, u, v):
+        return self.apply(removed_edges=[(u, v)])
+
+    def add_edge(self, u, v):
+        return self.apply(added_nodes=[x for x in (u, v) if x not in self.index],
+                          added_edges=[(u, v)])
+
+    def remove_node(self, node):
+        return self.apply(removed_nodes=[node])
+
+    def metrics(self):
+        """Centralidades atuais (mesmas convenções de calculate_centrality_metrics)"""
+        n = self.n
+        alive = np.flatnonzero(self.alive)
+        degree = np.array([len(self.adj[i]) for i in alive], dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            closeness = np.where(self.dist_total[alive] > 0,
+                                 (self.reach[alive] - 1) / self.dist_total[alive], 0.0)
+        scale = 1 / ((n - 1) * (n - 2)) if n > 2 else 1.0
+        nodes = [self.nodes[i] for i in alive]
+
+        metrics = {
+            'degree': degree / (n - 1) if n > 1 else degree,
+            'closeness': closeness,
+            'betweenness': self.betweenness[alive] * scale,
+            'eccentricity': self.eccentricity[alive].astype(float),
+            'core': self.core[alive].astype(float),
+        }
+        return {name: dict(zip(nodes, values.tolist())) for name, values in metrics.items()}
@@ -0,0 +1,226 @@
+"""Instrumentação do pipeline: tempo, CPU, memória e fallbacks de cada etapa (JSON e trace-event)"""
+
+import contextlib
+import cProfile
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage, a CPU dos processos filhos não é medida
+    resource = None
+
+PROFILE_FORMAT = 'pipeline-profile'
+PROFILE_VERSION = 1
+
+# Arquivos gravados na pasta de saída: resumo por etapa, trace para chrome://tracing
+# ou Perfetto e os dumps do cProfile (um por etapa de primeiro nível)
+PROFILE_FILE = 'profile.json'
+TRACE_FILE = 'trace.json'
+CPROFILE_DIR = 'cprofile'
+
+# Intervalo (s) da amostragem da memória residente durante cada etapa
+RSS_INTERVAL = 0.01
+
+def rss_mb():
+    """Memória residente atual do processo (MB)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        return max_rss_mb()
+
+def max_rss_mb():
+    """Pico de memória residente do processo desde o início (MB; None sem getrusage)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+def _address_limited():
+    """Há limite de espaço de endereçamento (RLIMIT_AS, ex.: --memory-budget)?"""
+    if resource is None:
+        return False
+    return resource.getrlimit(resource.RLIMIT_AS)[0] != resource.RLIM_INFINITY
+
+def _children_cpu():
+    """CPU (s) dos processos filhos já encerrados (pools de workers)"""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class PeakSampler:
+    """Pico de RSS durante um bloco, amostrado numa thread
+
+    Com RLIMIT_AS ativo a thread não é criada: se a inicialização dela falhar por
+    falta de memória, Thread.start() espera para sempre. Nesse caso só o início e
+    o fim são medidos (o pico do processo continua em max_rss_mb).
+    """
+
+    def __init__(self, interval=RSS_INTERVAL):
+        self.interval = interval
+        self.start = self.peak = rss_mb()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        if _address_limited():
+            self._thread = None
+            return self
+        try:
+            self._thread.start()
+        except RuntimeError:  # sem memória para a pilha da thread
+            self._thread = None
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+        return False
+
+class PipelineProfiler:
+    """Registro das etapas de uma análise (etapas aninhadas, fallbacks e tempos externos)
+
+    Cada etapa guarda tempo de parede, CPU do processo e dos filhos, RSS no
+    início/fim e pico, e o tamanho do grafo. Com `cprofile`, as etapas de primeiro
+    nível também gravam um dump do cProfile (.prof) em CPROFILE_DIR.
+    """
+
+    def __init__(self, output_folder=None, cprofile=False, interval=RSS_INTERVAL, **info):
+        self.output_folder = output_folder
+        self.cprofile = cprofile
+        self.interval = interval
+        self.info = info
+        self.stages = []
+        self.fallbacks = []
+        self._open = []
+        self._origin = time.perf_counter()
+        self._started = time.time()
+
+    def _now_us(self):
+        return (time.perf_counter() - self._origin) * 1e6
+
+    @contextlib.contextmanager
+    def stage(self, name, G=None, **info):
+        """Mede o bloco como a etapa `name`; devolve o registro (extras via note())"""
+        record = {'name': name, 'parent': self._open[-1]['name'] if self._open else None,
+                  'depth': len(self._open), 'start_us': self._now_us(), **info}
+        self._open.append(record)
+        profile = cProfile.Profile() if self.cprofile and record['depth'] == 0 else None
+        cpu, children = time.process_time(), _children_cpu()
+        start = time.perf_counter()
+        sampler = None
+        try:
+            sampler = PeakSampler(self.interval)
+            with sampler:
+                if profile is not None:
+                    profile.enable()
+                try:
+                    yield record
+                finally:
+                    if profile is not None:
+                        profile.disable()
+        except Exception as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record.update({
+                'seconds': time.perf_counter() - start,
+                'cpu_seconds': time.process_time() - cpu,
+                'children_cpu_seconds': _children_cpu() - children,
+                'rss_start_mb': sampler.start if sampler else None, 'rss_end_mb': rss_mb(),
+                'peak_rss_mb': sampler.peak if sampler else None,
+                'max_rss_mb': max_rss_mb(),
+            })
+            if G is not None:
+                record.update(nodes=G.number_of_nodes(), edges=G.number_of_edges())
+            if profile is not None:
+                record['cprofile'] = self._dump(profile, name)
+            self._open.pop()
+            self.stages.append(record)
+
+    def note(self, **info):
+        """Acrescenta informações à etapa aberta mais interna (ex.: computed=True)"""
+        if self._open:
+            self._open[-1].update(info)
+
+    def fallback(self, name, reason, **details):
+        """Registra um caminho alternativo que foi tomado (ex.: autovetor zerado)"""
+        event = {'name': name, 'reason': reason, 'stage': self._open[-1]['name'] if self._open else None,
+                 'time_us': self._now_us(), **details}
+        self.fallbacks.append(event)
+        print(f"   [fallback] {name}: {reason}")
+
+    def record(self, name, seconds, start_us=None, **info):
+        """Etapa medida fora deste processo (ex.: uma figura renderizada no pool)"""
+        parent = self._open[-1] if self._open else None
+        self.stages.append({
+            'name': name, 'parent': parent['name'] if parent else None,
+            'depth': len(self._open),
+            'start_us': start_us if start_us is not None else self._now_us() - seconds * 1e6,
+            'seconds': seconds, 'external': True, **info})
+
+    def _dump(self, profile, name):
+        folder = os.path.join(self.output_folder or '.', CPROFILE_DIR)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f'{name}.prof')
+        profile.dump_stats(path)
+        return os.path.relpath(path, self.output_folder or '.')
+
+    def summary(self):
+        """Resumo serializável: ambiente, etapas (ordem de início) e fallbacks"""
+        return {
+            'format': PROFILE_FORMAT,
+            'version': PROFILE_VERSION,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self._started)),
+            'total_seconds': time.perf_counter() - self._origin,
+            'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                            'cpus': os.cpu_count()},
+            **self.info,
+            'stages': sorted(self.stages, key=lambda s: s['start_us']),
+            'fallbacks': self.fallbacks,
+        }
+
+    def trace_events(self):
+        """Eventos no formato Trace Event (chrome://tracing, Perfetto, speedscope)"""
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                   'args': {'name': self.info.get('input', 'analysis')}}]
+        lanes = {}
+        for stage in sorted(self.stages, key=lambda s: s['start_us']):
+            # Etapas externas (paralelas entre si) ganham uma linha cada, abaixo do processo
+            tid = 0
+            if stage.get('external'):
+                tid = lanes.setdefault(stage['name'], len(lanes) + 1)
+            args = {k: v for k, v in stage.items()
+                    if k not in ('name', 'start_us', 'seconds', 'parent', 'depth')}
+            events.append({'name': stage['name'], 'cat': 'external' if tid else 'stage', 'ph': 'X',
+                           'ts': round(stage['start_us'], 1), 'dur': round(stage['seconds'] * 1e6, 1),
+                           'pid': pid, 'tid': tid, 'args': args})
+        for event in self.fallbacks:
+            events.append({'name': f"fallback: {event['name']}", 'cat': 'fallback', 'ph': 'i',
+                           's': 'p', 'ts': round(event['time_us'], 1), 'pid': pid, 'tid': 0,
+                           'args': {k: v for k, v in event.items() if k not in ('name', 'time_us')}})
+        return events
+
+    def write(self, output_folder=None):
+        """Grava profile.json e trace.json; devolve o caminho do resumo"""
+        folder = output_folder or self.output_folder or '.'
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, PROFILE_FILE)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2, default=str)
+        with open(os.path.join(folder, TRACE_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, f, default=str)
+        return path
@@ -0,0 +1,54 @@
+"""Decomposição k-core / k-shell em tempo linear (Batagelj-Zaversnik) sobre a CSR"""
+
+import numpy as np
+
+def core_numbers(csr):
+    """Coreness de cada nó (na ordem dos arrays da CSR) em O(V + E)
+
+    Os nós ficam ordenados por grau em `vert`, com `bin_start[d]` marcando o início
+    do bloco de grau d; ao processar v, cada vizinho u de grau maior troca de
+    lugar com o primeiro nó do seu bloco e desce um grau, sem reordenar nada.
+    """
+    n = csr.n
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    indptr, indices = csr.adjacency_lists()
+    degree = np.diff(csr.indptr)
+    # Laços (v, v) não contam para o grau no core
+    rows = np.repeat(np.arange(n), degree)
+    degree = (degree - np.bincount(rows[csr.indices == rows], minlength=n)).astype(np.int64)
+
+    # Ordenação por contagem: vert em ordem de grau, pos[v] = posição de v em vert
+    counts = np.bincount(degree)
+    bin_start = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    vert = np.argsort(degree, kind='stable')
+    pos = np.empty(n, dtype=np.int64)
+    pos[vert] = np.arange(n)
+
+    deg = degree.tolist()
+    vert = vert.tolist()
+    pos = pos.tolist()
+    bin_start = bin_start.tolist()
+
+    for i in range(n):
+        v = vert[i]
+        dv = deg[v]
+        for j in range(indptr[v], indptr[v + 1]):
+            u = indices[j]
+            du = deg[u]
+            if du > dv:
+                pu = pos[u]
+                pw = bin_start[du]
+                w = vert[pw]
+                if u != w:
+                    vert[pu], vert[pw] = w, u
+                    pos[u], pos[w] = pw, pu
+                bin_start[du] += 1
+                deg[u] = du - 1
+    return np.array(deg, dtype=np.int64)
+
+def shell_sizes(core):
+    """Número de nós em cada k-shell (índice k) e no k-core (nós com coreness >= k)"""
+    shells = np.bincount(core) if len(core) else np.zeros(1, dtype=np.int64)
+    cores = np.cumsum(shells[::-1])[::-1]
+    return shells, cores
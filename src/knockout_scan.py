@@ -0,0 +1,187 @@
+"""Varredura de robustez: remoção in silico de resíduos com checkpoint em disco"""
+
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import spearmanr
+
+from graph_csr import get_csr
+from centrality_engine import resolve_workers
+from incremental import IncrementalCentrality, UNREACHABLE
+
+# Colunas da tabela de resultados (uma linha por remoção)
+SCAN_COLUMNS = ['step', 'removed', 'largest_component', 'n_components', 'global_efficiency',
+                'avg_shortest_path', 'betweenness_spearman', 'closeness_spearman',
+                'degree_spearman', 'top_n_overlap']
+
+# Estado de cada processo do pool (preenchido por _init_worker)
+_WORKER = {}
+
+def network_summary(state):
+    """Tamanho do maior componente, eficiência global e caminho médio a partir da matriz de distâncias"""
+    alive = np.flatnonzero(state.alive)
+    n = len(alive)
+    if n < 2:
+        return {'largest_component': n, 'n_components': n,
+                'global_efficiency': 0.0, 'avg_shortest_path': 0.0}
+
+    block = state.distances[np.ix_(alive, alive)].astype(np.float64)
+    pairs = (block != UNREACHABLE) & (block > 0)
+    with np.errstate(divide='ignore'):
+        inverse = np.where(pairs, 1.0 / block, 0.0)
+    reach = state.reach[alive]
+    return {
+        'largest_component': int(reach.max()),
+        # Cada componente de tamanho c contribui c nós com alcance c
+        'n_components': int(np.round((1.0 / reach).sum())),
+        'global_efficiency': float(inverse.sum() / (n * (n - 1))),
+        'avg_shortest_path': float(block[pairs].mean()) if pairs.any() else 0.0,
+    }
+
+def _rank_shifts(baseline, metrics, top_n):
+    """Correlação de Spearman com o ranking original (nós restantes) e sobreposição do top-N"""
+    row = {}
+    for metric in ('betweenness', 'closeness', 'degree'):
+        nodes = list(metrics[metric])
+        before = np.array([baseline[metric][v] for v in nodes])
+        after = np.array([metrics[metric][v] for v in nodes])
+        rho = spearmanr(before, after).correlation if len(nodes) > 2 else np.nan
+        row[f'{metric}_spearman'] = float(rho) if rho == rho else np.nan
+
+    nodes = list(metrics['betweenness'])
+    before = np.array([baseline['betweenness'][v] for v in nodes])
+    after = np.array([metrics['betweenness'][v] for v in nodes])
+    k = min(top_n, len(nodes))
+    top_before = set(np.argsort(-before, kind='stable')[:k])
+    top_after = set(np.argsort(-after, kind='stable')[:k])
+    row['top_n_overlap'] = len(top_before & top_after) / max(k, 1)
+    return row
+
+def _measure(state, baseline, step, removed, top_n):
+    """Linha da tabela para o estado após a remoção"""
+    row = {'step': step, 'removed': str(removed)}
+    row.update(network_summary(state))
+    row.update(_rank_shifts(baseline, state.metrics(), top_n))
+    return row
+
+def _init_worker(G, top_n):
+    """Inicializador do pool: cada processo monta o estado base uma única vez"""
+    base = IncrementalCentrality(G, workers=1)
+    _WORKER['base'] = base
+    _WORKER['baseline'] = base.metrics()
+    _WORKER['top_n'] = top_n
+
+def _single_batch(batch):
+    """Remove cada resíduo do lote isoladamente, sempre a partir do estado base"""
+    rows = []
+    for step, node in batch:
+        state = _WORKER['base'].copy()
+        state.remove_node(node)
+        rows.append(_measure(state, _WORKER['baseline'], step, node, _WORKER['top_n']))
+    return rows
+
+def _write_chunk(output_dir, index, rows):
+    """Grava um lote de linhas como arquivo colunar compactado (checkpoint)"""
+    columns = {name: np.array([row[name] for row in rows]) for name in SCAN_COLUMNS}
+    tmp_path = os.path.join(output_dir, f'chunk_{index:05d}.tmp.npz')
+    np.savez_compressed(tmp_path, **columns)
+    os.replace(tmp_path, os.path.join(output_dir, f'chunk_{index:05d}.npz'))
+
+def _read_chunks(output_dir):
+    """Lê todos os lotes concluídos: devolve {índice do lote: DataFrame}"""
+    chunks = {}
+    for path in sorted(glob.glob(os.path.join(output_dir, 'chunk_*.npz'))):
+        name = os.path.basename(path)
+        if '.tmp.' in name:
+            continue
+        with np.load(path, allow_pickle=False) as data:
+            chunks[int(name[6:11])] = pd.DataFrame({c: data[c] for c in SCAN_COLUMNS})
+    return chunks
+
+def _prepare_output(output_dir, manifest):
+    """Cria a pasta do scan; descarta checkpoints de um scan com parâmetros diferentes"""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous.get('key') == manifest['key']:
+            return
+        print("Existing checkpoints belong to a different scan; starting over.")
+        for path in glob.glob(os.path.join(output_dir, 'chunk_*.npz')):
+            os.remove(path)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+def knockout_scan(G, targets, mode='single', output_dir='knockout_scan', workers=None,
+                  batch_size=32, top_n=10):
+    """Remove os resíduos de `targets` e mede o impacto na rede, com checkpoint/resume
+
+    mode='single': cada resíduo é removido isoladamente (lotes distribuídos num pool).
+    mode='cumulative': os resíduos são removidos em sequência (ordem de ataque).
+    Lotes concluídos ficam em output_dir/chunk_*.npz; uma nova chamada com os mesmos
+    parâmetros continua de onde parou. Devolve a tabela completa (DataFrame).
+    """
+    if mode not in ('single', 'cumulative'):
+        raise ValueError(f"Unknown scan mode: {mode}")
+    targets = list(targets)
+    key = hashlib.sha1(json.dumps(
+        [get_csr(G).fingerprint(), mode, [str(t) for t in targets], top_n, batch_size]
+    ).encode('utf-8')).hexdigest()
+    _prepare_output(output_dir, {'key': key, 'mode': mode, 'targets': len(targets),
+                                 'batch_size': batch_size, 'top_n': top_n})
+
+    batches = [list(enumerate(targets))[i:i + batch_size]
+               for i in range(0, len(targets), batch_size)]
+    done = _read_chunks(output_dir)
+    pending = [i for i in range(len(batches)) if i not in done]
+    if done:
+        print(f"Resuming knockout scan: {len(done)}/{len(batches)} batches already on disk")
+
+    if pending and mode == 'single':
+        workers = min(resolve_workers(workers), len(pending))
+        if workers == 1:
+            _init_worker(G, top_n)
+            for i in pending:
+                _write_chunk(output_dir, i, _single_batch(batches[i]))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(G, top_n)) as pool:
+                futures = {i: pool.submit(_single_batch, batches[i]) for i in pending}
+                for i, future in futures.items():
+                    _write_chunk(output_dir, i, future.result())
+                    print(f"   batch {i + 1}/{len(batches)} done")
+    elif pending:
+        # Ordem de ataque: é sequencial; ao retomar, reaplica de uma vez as remoções já feitas
+        state = IncrementalCentrality(G, workers=workers)
+        baseline = state.metrics()
+        removed = [node for i in range(pending[0]) for _, node in batches[i]]
+        if removed:
+            state.apply(removed_nodes=removed)
+        for i in pending:
+            rows = []
+            for step, node in batches[i]:
+                state.remove_node(node)
+                rows.append(_measure(state, baseline, step, node, top_n))
+            _write_chunk(output_dir, i, rows)
+            print(f"   batch {i + 1}/{len(batches)} done")
+
+    chunks = _read_chunks(output_dir)
+    table = pd.concat([chunks[i] for i in sorted(chunks)], ignore_index=True) \
+        if chunks else pd.DataFrame(columns=SCAN_COLUMNS)
+    # Ids como texto de largura fixa ('<U') e nenhuma coluna object: o .npz abre sem pickle
+    columns = {}
+    for name in SCAN_COLUMNS:
+        values = table[name].to_numpy()
+        if name == 'removed':
+            values = values.astype(str)
+        elif values.dtype == object:  # tabela vazia
+            values = values.astype(np.float64)
+        columns[name] = values
+    np.savez_compressed(os.path.join(output_dir, 'knockout_scan.npz'), **columns)
+    return table
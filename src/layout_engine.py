@@ -0,0 +1,227 @@
+"""Layout force-directed (Fruchterman-Reingold) vetorizado com repulsão Barnes-Hut"""
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from graph_csr import get_csr
+from centrality_store import cached_metrics
+
+# Abaixo deste número de nós a repulsão é calculada exatamente (todos os pares)
+EXACT_REPULSION_MAX_NODES = 1000
+
+# Profundidade máxima da quadtree
+MAX_DEPTH = 16
+
+def _morton(cells, depth):
+    """Código de Morton (bits de x e y intercalados) das células no nível mais profundo"""
+    code = np.zeros(len(cells), dtype=np.int64)
+    for bit in range(depth):
+        code |= ((cells[:, 0] >> bit) & 1) << (2 * bit + 1)
+        code |= ((cells[:, 1] >> bit) & 1) << (2 * bit)
+    return code
+
+def _quadtree(pos, depth):
+    """Níveis da quadtree: por nível, códigos ordenados das células ocupadas, massa e centro de massa
+
+    Com códigos de Morton a célula-mãe é code >> 2, então uma única ordenação
+    serve para todos os níveis.
+    """
+    lo = pos.min(axis=0)
+    size = max(float((pos.max(axis=0) - lo).max()), 1e-12) * (1 + 1e-9)
+    side = 1 << depth
+    cells = np.minimum(((pos - lo) / size * side).astype(np.int64), side - 1)
+    morton = _morton(cells, depth)
+    order = np.argsort(morton, kind='stable')
+    sorted_codes = morton[order]
+
+    levels = []
+    for level in range(depth + 1):
+        codes = sorted_codes >> (2 * (depth - level))
+        starts = np.r_[True, codes[1:] != codes[:-1]]
+        first = np.flatnonzero(starts)
+        inverse = np.empty(len(pos), dtype=np.int64)
+        inverse[order] = np.cumsum(starts) - 1
+        mass = np.bincount(inverse).astype(float)
+        center = np.column_stack([np.bincount(inverse, weights=pos[:, d]) for d in range(2)]) / mass[:, None]
+        levels.append({'ids': codes[first], 'node_cell': inverse, 'mass': mass,
+                       'center': center, 'width': size / (1 << level)})
+    return levels
+
+def _barnes_hut_repulsion(pos, k, theta):
+    """Repulsão k²/d aproximada: células distantes (largura/d < theta) agem pelo centro de massa
+
+    A árvore é percorrida nível a nível sobre arrays de pares (nó, célula), sem laço
+    Python por nó: cada nível aceita os pares distantes e expande os demais nos filhos.
+    """
+    n = len(pos)
+    depth = min(MAX_DEPTH, int(np.ceil(np.log2(max(n, 2)) / 2)) + 4)
+    levels = _quadtree(pos, depth)
+    force = np.zeros_like(pos)
+
+    nodes = np.arange(n)
+    cells = np.zeros(n, dtype=np.int64)  # índice da célula dentro do nível (a raiz é 0)
+    for level, info in enumerate(levels):
+        if len(nodes) == 0:
+            break
+        center = info['center'][cells]
+        mass = info['mass'][cells]
+        own = info['node_cell'][nodes] == cells
+        last = level == len(levels) - 1
+        if last:
+            # Folhas no nível máximo que contêm o próprio nó: usa a massa restante
+            remaining = np.where(own, mass - 1, mass)
+            center = np.where(own[:, None],
+                              (center * mass[:, None] - pos[nodes]) / np.maximum(remaining, 1)[:, None],
+                              center)
+            mass = remaining
+        delta = pos[nodes] - center
+        dist2 = np.maximum((delta ** 2).sum(axis=1), 1e-18)
+
+        far = (info['width'] ** 2 < theta ** 2 * dist2) & ~own
+        leaf = (mass == 1) & ~own
+        accept = far | leaf | last
+        scale = np.where(accept, k * k * mass / dist2, 0.0)
+        for d in range(2):
+            force[:, d] += np.bincount(nodes, weights=scale * delta[:, d], minlength=n)
+
+        # Pares não aceitos descem para os filhos ocupados (códigos 4c .. 4c + 3)
+        expand = ~accept & (mass > 0)
+        if last or not expand.any():
+            break
+        parent_codes = info['ids'][cells[expand]]
+        parent_nodes = nodes[expand]
+        child_ids = levels[level + 1]['ids']
+        lo = np.searchsorted(child_ids, 4 * parent_codes)
+        hi = np.searchsorted(child_ids, 4 * parent_codes + 4)
+        counts = hi - lo
+        nodes = np.repeat(parent_nodes, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = np.repeat(lo, counts) + offsets
+    return force
+
+def _exact_repulsion(pos, k):
+    """Repulsão k²/d entre todos os pares (grafos pequenos)"""
+    delta = pos[:, None, :] - pos[None, :, :]
+    dist2 = np.maximum((delta ** 2).sum(axis=2), 1e-18)
+    np.fill_diagonal(dist2, np.inf)
+    return np.einsum('ijk,ij->ik', delta, k * k / dist2)
+
+def force_layout(csr, pos=None, iterations=50, k=None, theta=0.8, seed=42):
+    """Fruchterman-Reingold (mesmo esquema de resfriamento de nx.spring_layout) sobre a CSR
+
+    pos: posições iniciais (n x 2); sem elas o início é aleatório com semente fixa.
+    Devolve um array (n x 2) centrado na origem e reescalado para [-1, 1].
+    """
+    n = csr.n
+    rng = np.random.default_rng(seed)
+    if pos is None:
+        pos = rng.random((n, 2))
+    pos = _normalize(np.asarray(pos, dtype=float))
+    if n <= 1:
+        return np.zeros((n, 2))
+
+    # Nós sobrepostos não têm direção de repulsão: pequena perturbação determinística
+    pos = pos + rng.normal(scale=1e-6, size=pos.shape)
+    k = k if k is not None else np.sqrt(1.0 / n)
+    edges = np.asarray(csr.edges, dtype=np.int64)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+
+    t = 0.1 * max(float(np.ptp(pos[:, 0])), float(np.ptp(pos[:, 1])))
+    dt = t / (iterations + 1)
+    for _ in range(iterations):
+        if n <= EXACT_REPULSION_MAX_NODES:
+            displacement = _exact_repulsion(pos, k)
+        else:
+            displacement = _barnes_hut_repulsion(pos, k, theta)
+
+        # Atração d²/k ao longo das arestas
+        delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+        dist = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-9)
+        pull = (dist / k)[:, None] * delta
+        for d in range(2):
+            displacement[:, d] += np.bincount(edges[:, 1], weights=pull[:, d], minlength=n) \
+                - np.bincount(edges[:, 0], weights=pull[:, d], minlength=n)
+
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 0.01)
+        pos = pos + displacement * (t / length)[:, None]
+        t -= dt
+    return _rescale(pos)
+
+def _normalize(pos):
+    """Leva as posições para o quadrado [0, 1]²"""
+    if len(pos) == 0:
+        return pos
+    pos = pos - pos.min(axis=0)
+    span = pos.max()
+    return pos / span if span > 0 else pos
+
+def _rescale(pos):
+    """Centraliza e reescala para [-1, 1] (como nx.rescale_layout)"""
+    pos = pos - pos.mean(axis=0)
+    span = np.abs(pos).max()
+    return pos / span if span > 0 else pos
+
+def coordinate_seed(csr):
+    """Posições iniciais a partir das coordenadas x/y/z dos resíduos (projeção nos 2 eixos principais)"""
+    columns = [csr.node_attrs.get(axis) for axis in ('x', 'y', 'z')]
+    if any(column is None for column in columns):
+        return None
+    try:
+        # Colunas de texto (atributos type="string" no GEXF): vazios e não numéricos viram NaN
+        coords = np.column_stack([pd.to_numeric(np.char.strip(column), errors='coerce')
+                                  if column.dtype.kind in 'US' else column
+                                  for column in columns]).astype(float)
+    except (ValueError, TypeError):  # TypeError inclui o DTypePromotionError do NumPy 2
+        return None
+    missing = np.isnan(coords).any(axis=1)
+    if missing.all():
+        return None
+    coords[missing] = np.nanmean(coords, axis=0)
+    centered = coords - coords.mean(axis=0)
+    _, _, axes = np.linalg.svd(centered, full_matrices=False)
+    return centered @ axes[:2].T
+
+def gephi_seed(csr, json_path):
+    """Posições iniciais a partir do x/y exportado pelo Gephi (ex.: docs/data.json)"""
+    with open(json_path, encoding='utf-8') as f:
+        data = json.load(f)
+    positions = {str(node['id']): (node['x'], node['y']) for node in data.get('nodes', [])
+                 if 'x' in node and 'y' in node}
+    if not positions:
+        return None
+    known = np.array([positions.get(str(node), (np.nan, np.nan)) for node in csr.node_list()],
+                     dtype=float)
+    missing = np.isnan(known).any(axis=1)
+    known[missing] = np.nanmean(known, axis=0) if (~missing).any() else 0.0
+    return known
+
+def compute_layout(G, seed_from='coordinates', gephi_json=None, iterations=50,
+                   theta=0.8, seed=42, store=None):
+    """Layout determinístico do grafo (dict nó -> (x, y)), persistido por impressão digital
+
+    seed_from: 'coordinates' (x/y/z dos resíduos), 'gephi' (x/y de gephi_json) ou 'random'.
+    """
+    csr = get_csr(G)
+    start = None
+    if seed_from == 'coordinates':
+        start = coordinate_seed(csr)
+    elif seed_from == 'gephi' and gephi_json:
+        start = gephi_seed(csr, gephi_json)
+    # As posições iniciais (x/y/z dos resíduos ou do Gephi) não fazem parte da impressão
+    # digital: o hash delas entra nos parâmetros do store
+    params = {'seed_from': seed_from, 'gephi_json': gephi_json, 'iterations': iterations,
+              'theta': theta, 'seed': seed,
+              'start': None if start is None else
+              hashlib.sha256(np.ascontiguousarray(start, dtype=np.float64).tobytes()).hexdigest()[:16]}
+
+    def compute():
+        pos = force_layout(csr, start, iterations=iterations, theta=theta, seed=seed)
+        nodes = csr.node_list()
+        return {'x': dict(zip(nodes, pos[:, 0].tolist())),
+                'y': dict(zip(nodes, pos[:, 1].tolist()))}, {}
+
+    columns, _ = cached_metrics(store, G, 'layout', params, compute)
+    return {node: np.array([columns['x'][node], columns['y'][node]]) for node in G.nodes()}
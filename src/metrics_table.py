@@ -0,0 +1,136 @@
+"""Exportação colunar das métricas por nó (Arrow/Feather ou Parquet; CSV sem pyarrow)"""
+
+import datetime
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional: sem ele as partes são gravadas em CSV
+    pa = None
+
+from graph_csr import get_csr
+
+# Atributos de resíduo copiados dos nós (quando presentes), na ordem da tabela
+RESIDUE_COLUMNS = ['Chain', 'Position', 'Residue', 'Type', 'Dssp', 'Bfactor_CA', 'x', 'y', 'z', 'Model']
+
+# Colunas categóricas: gravadas com codificação por dicionário
+CATEGORICAL_COLUMNS = {'Chain', 'Residue', 'Type', 'Dssp', 'source', 'graph'}
+
+# Extensão de cada formato das partes do dataset
+PART_EXTENSIONS = {'feather': '.arrow', 'parquet': '.parquet', 'csv': '.csv'}
+
+def node_metrics_frame(G, centrality_metrics, combined_scores=None, source='', run_id=None):
+    """Tabela com uma linha por nó: id, metadados do resíduo e todas as métricas calculadas
+
+    Além de centrality_metrics entram as métricas guardadas em G.graph['path_metrics']
+    (harmônica, excentricidade), os erros do modo aproximado e os atributos
+    'coreness', 'Modularity Class' e 'community_stability' dos nós.
+    """
+    nodes = list(G.nodes())
+    csr = get_csr(G)
+    columns = {
+        'run_id': run_id or datetime.datetime.now().strftime("%Y%m%d_%H%M%S"),
+        'graph': csr.fingerprint(),
+        'source': os.path.basename(source),
+        'node_id': [str(node) for node in nodes],
+    }
+    for name in RESIDUE_COLUMNS:
+        values = [G.nodes[node].get(name) for node in nodes]
+        if any(v is not None for v in values):
+            columns[name] = values
+
+    metrics = dict(centrality_metrics)
+    path_metrics = G.graph.get('path_metrics', {})
+    for name in ('harmonic', 'eccentricity'):
+        if isinstance(path_metrics.get(name), dict):
+            metrics[name] = path_metrics[name]
+    for name, errors in G.graph.get('centrality_errors', {}).items():
+        metrics[f'{name}_error'] = errors
+    if combined_scores is not None:
+        metrics['combined_score'] = combined_scores
+    for name, values in metrics.items():
+        columns[name] = np.array([values.get(node, np.nan) for node in nodes], dtype=np.float64)
+
+    for attribute, name, dtype in (('coreness', 'coreness', np.int32),
+                                   ('Modularity Class', 'modularity_class', np.int32),
+                                   ('community_stability', 'community_stability', np.float64)):
+        values = [G.nodes[node].get(attribute) for node in nodes]
+        if all(v is not None for v in values) and values:
+            columns[name] = np.array(values, dtype=dtype)
+
+    df = pd.DataFrame(columns)
+    for name in CATEGORICAL_COLUMNS & set(df.columns):
+        df[name] = df[name].astype('string').astype('category')
+    return df
+
+def default_format():
+    """Feather (Arrow IPC, lido por memory map) quando pyarrow existe; senão CSV"""
+    return 'feather' if pa is not None else 'csv'
+
+def write_part(df, dataset_dir, name, fmt=None):
+    """Acrescenta uma parte ao dataset (um arquivo por grafo e execução) e devolve o caminho"""
+    fmt = fmt or default_format()
+    if fmt != 'csv' and pa is None:
+        print("pyarrow is not installed; writing node metrics as CSV.")
+        fmt = 'csv'
+    os.makedirs(dataset_dir, exist_ok=True)
+    path = os.path.join(dataset_dir, f"{name}{PART_EXTENSIONS[fmt]}")
+    tmp_path = f"{path}.tmp"
+
+    if fmt == 'csv':
+        df.to_csv(tmp_path, index=False)
+    else:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if fmt == 'feather':
+            # Sem compressão: o arquivo pode ser mapeado em memória sem cópia na leitura
+            feather.write_feather(table, tmp_path, compression='uncompressed')
+        else:
+            pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+    return path
+
+def export_node_metrics(G, centrality_metrics, dataset_dir, combined_scores=None, source='',
+                        run_id=None, fmt=None):
+    """Grava as métricas por nó do grafo como nova parte do dataset"""
+    df = node_metrics_frame(G, centrality_metrics, combined_scores, source, run_id)
+    stem = os.path.splitext(os.path.basename(source))[0] or 'graph'
+    name = f"{stem}-{df['graph'].iloc[0]}-{df['run_id'].iloc[0]}"
+    path = write_part(df, dataset_dir, name, fmt)
+    print(f"Node metrics ({len(df)} rows x {len(df.columns)} columns) written to '{path}'")
+    return path
+
+def read_metrics(dataset_dir, columns=None, memory_map=True, as_pandas=True):
+    """Lê todas as partes do dataset numa única tabela
+
+    As partes Feather são abertas por memory map (sem cópia até as colunas serem
+    usadas); as Parquet pelo leitor colunar, lendo só `columns`. Sem pyarrow só
+    as partes CSV são lidas.
+    """
+    parts = sorted(glob.glob(os.path.join(dataset_dir, '*')))
+    tables, frames = [], []
+    for path in parts:
+        if path.endswith('.tmp'):
+            continue
+        if path.endswith('.csv'):
+            frames.append(pd.read_csv(path, usecols=columns))
+        elif pa is None:
+            continue
+        elif path.endswith('.arrow'):
+            tables.append(feather.read_table(path, columns=columns, memory_map=memory_map))
+        elif path.endswith('.parquet'):
+            tables.append(pq.read_table(path, columns=columns, memory_map=memory_map))
+
+    if tables:
+        table = pa.concat_tables(tables, promote_options='permissive')
+        if not as_pandas:
+            return table
+        frames.insert(0, table.to_pandas())
+    if not frames:
+        return pd.DataFrame(columns=columns or [])
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
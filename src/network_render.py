@@ -0,0 +1,148 @@
+"""Desenho de redes grandes: arestas em LineCollection, níveis de detalhe e raster de densidade"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+
+from graph_csr import get_csr
+
+# Até este número de arestas o modo 'auto' desenha tudo
+FULL_DETAIL_MAX_EDGES = 20000
+
+# Até este número de nós o modo 'auto' desenha as arestas como raster; acima, agrega em super-nós
+RASTER_MAX_NODES = 50000
+
+# Lado (pixels) do raster de densidade
+RASTER_SIZE = 1024
+
+# Pontos amostrados ao longo das arestas no raster de densidade (limita o tempo em grafos enormes)
+RASTER_POINT_BUDGET = 4_000_000
+
+LOD_MODES = ('auto', 'full', 'sample', 'raster', 'aggregate')
+
+def choose_lod(n, m, lod='auto', max_edges=FULL_DETAIL_MAX_EDGES):
+    """Resolve o nível de detalhe: 'full', 'sample', 'raster' ou 'aggregate'"""
+    if lod != 'auto':
+        return lod
+    if m <= max_edges:
+        return 'full'
+    return 'raster' if n <= RASTER_MAX_NODES else 'aggregate'
+
+def node_coordinates(G, pos):
+    """Posições como array n x 2 na ordem dos nós (a mesma dos arrays do CSR)"""
+    return np.array([pos[node] for node in G.nodes()], dtype=np.float64).reshape(-1, 2)
+
+def edge_endpoints(G):
+    """Pontas (u, v) das arestas sem laços (o CSR já mescla as arestas paralelas)"""
+    edges = np.asarray(get_csr(G).edges, dtype=np.int64).reshape(-1, 2)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    return edges[:, 0], edges[:, 1]
+
+def draw_edges(ax, coords, u, v, color='gray', alpha=0.3, width=0.5, rasterized=True, zorder=1):
+    """Todas as arestas num único LineCollection (rasterizado: custo fixo no arquivo de saída)"""
+    segments = np.stack([coords[u], coords[v]], axis=1)
+    lines = LineCollection(segments, colors=color, alpha=alpha, linewidths=width,
+                           rasterized=rasterized, zorder=zorder)
+    ax.add_collection(lines)
+    return lines
+
+def draw_nodes(ax, coords, colors, sizes, alpha=0.8, rasterized=True, zorder=2, **kwargs):
+    """Nós como um único scatter (com cor e tamanho únicos, marcadores de Line2D, bem mais rápidos)"""
+    if isinstance(colors, str) and np.isscalar(sizes):
+        return ax.plot(coords[:, 0], coords[:, 1], 'o', color=colors, markersize=np.sqrt(sizes),
+                       markeredgewidth=0, alpha=alpha, rasterized=rasterized, zorder=zorder,
+                       **kwargs)[0]
+    return ax.scatter(coords[:, 0], coords[:, 1], c=colors, s=sizes, alpha=alpha,
+                      rasterized=rasterized, zorder=zorder, linewidths=0, **kwargs)
+
+def sample_edges(u, v, max_edges, keep=None, seed=0):
+    """Índices das arestas desenhadas: todas as de `keep` e uma amostra uniforme das demais"""
+    m = len(u)
+    keep = np.zeros(m, dtype=bool) if keep is None else keep
+    rest = np.flatnonzero(~keep)
+    budget = max(max_edges - int(keep.sum()), 0)
+    if len(rest) > budget:
+        rest = np.random.default_rng(seed).choice(rest, size=budget, replace=False)
+    return np.sort(np.concatenate([np.flatnonzero(keep), rest]))
+
+def neighbourhood(G, nodes):
+    """Máscara (ordem dos nós) dos nós dados e dos seus vizinhos diretos"""
+    csr = get_csr(G)
+    index = {node: i for i, node in enumerate(G.nodes())}
+    seeds = np.array([index[node] for node in nodes if node in index], dtype=np.int64)
+    mask = np.zeros(csr.n, dtype=bool)
+    mask[seeds] = True
+    for i in seeds:
+        mask[csr.indices[csr.indptr[i]:csr.indptr[i + 1]]] = True
+    return mask
+
+def super_nodes(coords, u, v, groups):
+    """Agrega os nós por grupo (comunidade ou k-shell)
+
+    Devolve (rótulos dos grupos, centroides g x 2, tamanhos, arestas entre grupos
+    (a, b, número de arestas)).
+    """
+    labels, groups = np.unique(groups, return_inverse=True)
+    g = len(labels)
+    sizes = np.bincount(groups, minlength=g)
+    centroids = np.column_stack([np.bincount(groups, weights=coords[:, d], minlength=g)
+                                 for d in range(2)]) / np.maximum(sizes, 1)[:, None]
+    a, b = groups[u], groups[v]
+    a, b = np.minimum(a, b)[a != b], np.maximum(a, b)[a != b]
+    codes, counts = np.unique(a * g + b, return_counts=True)
+    return labels, centroids, sizes, (codes // g, codes % g, counts)
+
+def density_raster(coords, u, v, size=RASTER_SIZE, block=200000):
+    """Comprimento de aresta por pixel (estilo datashader): pontos amostrados ao longo das arestas
+
+    Cada aresta recebe amostras proporcionais ao seu comprimento em pixels, com
+    um total limitado a RASTER_POINT_BUDGET; o peso de cada ponto compensa a
+    subamostragem. O custo é linear no número de arestas e a memória fica
+    limitada pelo processamento em blocos.
+    """
+    raster = np.zeros(size * size, dtype=np.float64)
+    if len(coords) == 0 or len(u) == 0:
+        return raster.reshape(size, size)
+    lo, span = _extent(coords)
+    pix = ((coords - lo) / span * (size - 1)).astype(np.float32)
+    length = np.linalg.norm(pix[v] - pix[u], axis=1)
+    scale = min(1.0, RASTER_POINT_BUDGET / max(float(length.sum()), 1.0))
+    samples = np.maximum(np.ceil(length * scale).astype(np.int64), 1)
+    weights = np.maximum(length, 1.0) / samples
+    for start in range(0, len(u), block):
+        stop = start + block
+        a, b, k = pix[u[start:stop]], pix[v[start:stop]], samples[start:stop]
+        edge = np.repeat(np.arange(len(a)), k)
+        offsets = np.arange(len(edge)) - np.repeat(np.cumsum(k) - k, k)
+        t = ((offsets + 0.5) / k[edge]).astype(np.float32)[:, None]
+        points = a[edge] + (b[edge] - a[edge]) * t
+        cells = np.clip(np.rint(points).astype(np.int64), 0, size - 1)
+        raster += np.bincount(cells[:, 1] * size + cells[:, 0], weights=weights[start:stop][edge],
+                              minlength=size * size)
+    return raster.reshape(size, size)
+
+def _extent(coords):
+    """Quadrado que contém as posições (mesmo enquadramento usado por density_raster)"""
+    lo = coords.min(axis=0)
+    span = max(float((coords.max(axis=0) - lo).max()), 1e-12)
+    return lo, span
+
+def draw_edge_raster(ax, coords, raster, color=(0.5, 0.5, 0.5), alpha=0.6, zorder=1):
+    """Camada de arestas como imagem (raster de density_raster): custo independente do número de arestas"""
+    shaded = np.log1p(raster)
+    if shaded.max() > 0:
+        shaded /= shaded.max()
+    rgba = np.zeros(raster.shape + (4,))
+    rgba[..., :3] = color
+    rgba[..., 3] = shaded * alpha
+    (x0, y0), span = _extent(coords)
+    return ax.imshow(rgba, origin='lower', extent=(x0, x0 + span, y0, y0 + span),
+                     interpolation='nearest', zorder=zorder, aspect='auto')
+
+def save_density_raster(raster, path, cmap='inferno'):
+    """Grava o raster com sombreamento logarítmico (origem no canto inferior esquerdo)"""
+    shaded = np.log1p(raster.astype(np.float64))
+    if shaded.max() > 0:
+        shaded /= shaded.max()
+    # Compressão PNG leve: o raster é ruidoso e o nível padrão custa mais que o próprio cálculo
+    plt.imsave(path, shaded[::-1], cmap=cmap, pil_kwargs={'compress_level': 1})
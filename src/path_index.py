@@ -0,0 +1,413 @@
+"""Índice de distâncias (saltos) entre resíduos em disco e consultas de caminhos de comunicação"""
+
+import argparse
+import heapq
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.sparse.csgraph import shortest_path
+
+from graph_csr import get_csr
+
+INDEX_FORMAT = 'path-index'
+INDEX_VERSION = 1
+
+DEFAULT_INDEX_DIR = 'path_index'
+
+# Linhas da matriz calculadas por bloco de BFS (scipy) ao construir o índice
+DISTANCE_BLOCK = 512
+
+# Até este número de nós a matriz n x n completa é gravada (uint8: 400 MB em 20000 nós);
+# acima, só as distâncias aos marcos (landmarks) e as demais linhas sob demanda
+DENSE_MAX_NODES = 20000
+DEFAULT_LANDMARKS = 32
+
+# Linhas calculadas sob demanda mantidas em memória (modo landmarks)
+ROW_CACHE_SIZE = 256
+
+# Distância interna para pares sem caminho (mantém as somas d(s,w) + d(w,t) em int64)
+FAR = np.iinfo(np.int32).max // 4
+
+def _bfs_rows(matrix, rows):
+    """Distâncias em saltos das fontes `rows` (float, inf sem caminho)"""
+    return shortest_path(matrix, directed=False, unweighted=True, indices=np.asarray(rows))
+
+def _encode(block, dtype):
+    """float (inf = sem caminho) -> inteiros com o máximo do tipo como sentinela; None se não couber"""
+    sentinel = np.iinfo(dtype).max
+    reachable = np.isfinite(block)
+    if reachable.any() and block[reachable].max() >= sentinel:
+        return None
+    return np.where(reachable, block, sentinel).astype(dtype)
+
+def _choose_landmarks(matrix, degree, count):
+    """Marcos por amostragem do ponto mais distante, a partir do nó de maior grau
+
+    Nós inalcançáveis contam como infinitamente distantes, então cada componente
+    recebe um marco antes de um segundo marco em qualquer componente.
+    """
+    n = len(degree)
+    chosen = [int(np.argmax(degree))]
+    rows = [_bfs_rows(matrix, chosen)[0]]
+    nearest = rows[0].copy()
+    while len(chosen) < min(count, n):
+        score = np.where(np.isinf(nearest), np.inf, nearest)
+        score[chosen] = -1
+        nxt = int(np.argmax(score))
+        chosen.append(nxt)
+        rows.append(_bfs_rows(matrix, [nxt])[0])
+        nearest = np.minimum(nearest, rows[-1])
+    return np.array(chosen, dtype=np.int64), np.array(rows)
+
+class PathIndex:
+    """Distâncias em saltos entre todos os pares (ou até marcos), mapeadas do disco
+
+    Os nós são identificados pelos mesmos ids de load_gexf_file/load_network.
+    No modo 'dense' cada linha vem da matriz uint8/uint16 em memory map; no modo
+    'landmarks' a distância de um par é exata quando os limites dos marcos
+    coincidem e, caso contrário, sai de uma BFS da origem (linha guardada em cache).
+    """
+
+    def __init__(self, folder, meta, csr):
+        self.folder = folder
+        self.meta = meta
+        self.csr = csr
+        self.nodes = csr.node_list()
+        self.index = csr.index
+        self.mode = meta['mode']
+        self.dtype = np.dtype(meta['dtype'])
+        self.sentinel = np.iinfo(self.dtype).max
+        shape = (meta['rows'], meta['n'])
+        self.matrix = np.memmap(os.path.join(folder, 'distances.bin'), dtype=self.dtype,
+                                mode='r', shape=shape)
+        self.landmarks = np.load(os.path.join(folder, 'landmarks.npy')) \
+            if self.mode == 'landmarks' else None
+        self._landmark_row = {int(l): i for i, l in enumerate(self.landmarks)} \
+            if self.landmarks is not None else {}
+        self._scipy = None
+        self._adj = None
+        self._cache = {}
+
+    # ------------------------------------------------------------------
+    # Construção e abertura
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def folder_for(G, root=DEFAULT_INDEX_DIR):
+        return os.path.join(root, get_csr(G).fingerprint())
+
+    @classmethod
+    def build(cls, G, root=DEFAULT_INDEX_DIR, landmarks=None, dense_max_nodes=DENSE_MAX_NODES):
+        """Calcula e grava o índice do grafo em <root>/<fingerprint>/
+
+        `landmarks`: número de marcos (força o modo landmarks); por padrão a matriz
+        completa é usada até dense_max_nodes nós.
+        """
+        csr = get_csr(G)
+        folder = cls.folder_for(G, root)
+        os.makedirs(folder, exist_ok=True)
+        matrix = csr.to_scipy()
+        path = os.path.join(folder, 'distances.bin')
+        meta = {'format': INDEX_FORMAT, 'version': INDEX_VERSION, 'fingerprint': csr.fingerprint(),
+                'n': csr.n, 'm': csr.m}
+
+        if landmarks is None and csr.n <= dense_max_nodes:
+            # uint8 cobre diâmetros < 255 (redes de resíduos); senão recomeça em uint16
+            for dtype in (np.uint8, np.uint16):
+                out = np.memmap(path, dtype=dtype, mode='w+', shape=(max(csr.n, 1), max(csr.n, 1)))
+                for start in range(0, csr.n, DISTANCE_BLOCK):
+                    rows = np.arange(start, min(start + DISTANCE_BLOCK, csr.n))
+                    block = _encode(_bfs_rows(matrix, rows), dtype)
+                    if block is None:
+                        break
+                    out[rows] = block
+                else:
+                    break
+                del out
+            out.flush()
+            del out
+            meta.update(mode='dense', dtype=np.dtype(dtype).name, rows=max(csr.n, 1))
+        else:
+            count = landmarks or DEFAULT_LANDMARKS
+            chosen, rows = _choose_landmarks(matrix, csr.degree(), count)
+            dtype = np.uint8 if _encode(rows, np.uint8) is not None else np.uint16
+            out = np.memmap(path, dtype=dtype, mode='w+', shape=rows.shape)
+            out[:] = _encode(rows, dtype)
+            out.flush()
+            del out
+            np.save(os.path.join(folder, 'landmarks.npy'), chosen)
+            meta.update(mode='landmarks', dtype=np.dtype(dtype).name, rows=len(chosen))
+
+        np.save(os.path.join(folder, 'node_ids.npy'), np.asarray(csr.node_ids))
+        # meta.json é escrito por último: sua presença indica um índice completo
+        tmp_path = os.path.join(folder, 'meta.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, os.path.join(folder, 'meta.json'))
+        return cls(folder, meta, csr)
+
+    @classmethod
+    def open(cls, G, root=DEFAULT_INDEX_DIR):
+        """Abre o índice já gravado para o grafo (mesma impressão digital), ou None"""
+        csr = get_csr(G)
+        folder = cls.folder_for(G, root)
+        try:
+            with open(os.path.join(folder, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+            node_ids = np.load(os.path.join(folder, 'node_ids.npy'))
+        except (OSError, ValueError):
+            return None
+        if meta.get('version') != INDEX_VERSION or meta.get('fingerprint') != csr.fingerprint() \
+                or not np.array_equal(node_ids.astype(str), np.asarray(csr.node_ids).astype(str)):
+            return None
+        return cls(folder, meta, csr)
+
+    @classmethod
+    def for_graph(cls, G, root=DEFAULT_INDEX_DIR, **kwargs):
+        """Índice do grafo: reaproveitado do disco ou construído na primeira vez"""
+        index = cls.open(G, root)
+        return index if index is not None else cls.build(G, root, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Distâncias
+    # ------------------------------------------------------------------
+
+    def _positions(self, nodes):
+        """Ids (um ou vários) -> posições nos arrays"""
+        if isinstance(nodes, (str, bytes)) or np.isscalar(nodes):
+            nodes = [nodes]
+        try:
+            return np.array([self.index[node] for node in nodes], dtype=np.int64)
+        except KeyError as e:
+            raise KeyError(f"node {e.args[0]!r} is not in the indexed graph") from None
+
+    def _decode(self, block):
+        """Bloco do disco -> int64 com FAR nos pares sem caminho"""
+        block = np.asarray(block).astype(np.int64)
+        block[block == self.sentinel] = FAR
+        return block
+
+    def rows(self, positions):
+        """Distâncias (int64, FAR sem caminho) das posições dadas a todos os nós"""
+        positions = np.asarray(positions, dtype=np.int64)
+        if self.mode == 'dense':
+            return self._decode(self.matrix[positions])
+        found = {}
+        for p in dict.fromkeys(positions.tolist()):
+            if p in self._landmark_row:
+                found[p] = self._decode(self.matrix[self._landmark_row[p]])
+            elif p in self._cache:
+                found[p] = self._cache.pop(p)
+        missing = [p for p in dict.fromkeys(positions.tolist()) if p not in found]
+        if missing:
+            if self._scipy is None:
+                self._scipy = self.csr.to_scipy()
+            for p, row in zip(missing, _bfs_rows(self._scipy, missing)):
+                found[p] = np.where(np.isfinite(row), row, FAR).astype(np.int64)
+        # LRU: as linhas usadas agora voltam ao fim do cache
+        for p, row in found.items():
+            if p not in self._landmark_row:
+                self._cache[p] = row
+        while len(self._cache) > ROW_CACHE_SIZE:
+            self._cache.pop(next(iter(self._cache)))
+        return np.array([found[p] for p in positions.tolist()]).reshape(len(positions), -1)
+
+    def bounds(self, sources, targets):
+        """Limites inferior e superior dos marcos para os pares (sources[i], targets[i])"""
+        u, v = self._positions(sources), self._positions(targets)
+        if self.mode == 'dense':
+            exact = self._decode(self.matrix[u, v])
+            return exact, exact
+        lu = self._decode(self.matrix[:, u])
+        lv = self._decode(self.matrix[:, v])
+        reachable = (lu < FAR) & (lv < FAR)
+        upper = np.where(reachable, lu + lv, FAR).min(axis=0)
+        lower = np.where(reachable, np.abs(lu - lv), 0).max(axis=0)
+        # Um marco alcança só um dos dois: nós em componentes diferentes
+        split = ((lu < FAR) != (lv < FAR)).any(axis=0)
+        return np.where(split, FAR, lower), np.where(split, FAR, np.minimum(upper, FAR))
+
+    def pair_distances(self, sources, targets):
+        """Distância de cada par (sources[i], targets[i]), vetorizada (inf sem caminho)"""
+        u, v = self._positions(sources), self._positions(targets)
+        lower, upper = self.bounds(sources, targets)
+        result = upper.copy()
+        pending = np.flatnonzero(lower != upper)
+        if len(pending):
+            origins, inverse = np.unique(u[pending], return_inverse=True)
+            result[pending] = self.rows(origins)[inverse, v[pending]]
+        return np.where(result >= FAR, np.inf, result.astype(np.float64))
+
+    def distances(self, sources, targets):
+        """Matriz |sources| x |targets| de distâncias (inf sem caminho)"""
+        block = self.rows(self._positions(sources))[:, self._positions(targets)]
+        return np.where(block >= FAR, np.inf, block.astype(np.float64))
+
+    def distance(self, u, v):
+        """Distância em saltos entre dois resíduos (inf se não houver caminho)"""
+        d = self.pair_distances([u], [v])[0]
+        return int(d) if np.isfinite(d) else d
+
+    # ------------------------------------------------------------------
+    # Caminhos
+    # ------------------------------------------------------------------
+
+    def _adjacency(self):
+        if self._adj is None:
+            indptr, indices = self.csr.adjacency_lists()
+            self._adj = [indices[indptr[i]:indptr[i + 1]] for i in range(self.csr.n)]
+        return self._adj
+
+    def path_counts(self, positions, rows=None):
+        """Número de caminhos mínimos de cada origem até cada nó (propagação por camadas da BFS)"""
+        rows = self.rows(positions) if rows is None else rows
+        indptr, indices = self.csr.indptr, self.csr.indices
+        src = np.repeat(np.arange(self.csr.n), np.diff(indptr))
+        sigma = np.zeros(rows.shape)
+        for i, (p, d) in enumerate(zip(np.asarray(positions).tolist(), rows)):
+            dag = (d[src] < FAR) & (d[indices] == d[src] + 1)
+            a, b = src[dag], indices[dag]
+            layer = d[a]
+            order = np.argsort(layer, kind='stable')
+            a, b, layer = a[order], b[order], layer[order]
+            cuts = np.flatnonzero(np.diff(layer)) + 1
+            sigma[i, p] = 1.0
+            for ea, eb in zip(np.split(a, cuts), np.split(b, cuts)):
+                sigma[i] += np.bincount(eb, weights=sigma[i, ea], minlength=self.csr.n)
+        return sigma
+
+    def on_shortest_paths(self, u, v):
+        """Resíduos em algum caminho mínimo entre u e v, em ordem de distância a partir de u"""
+        du, dv = self.rows(self._positions([u, v]))
+        total = du[self.index[v]]
+        if total >= FAR:
+            return []
+        members = np.flatnonzero(du + dv == total)
+        return [self.nodes[i] for i in members[np.argsort(du[members], kind='stable')]]
+
+    def k_shortest_paths(self, sources, targets, k=5, max_length=None):
+        """Até k caminhos simples mais curtos de qualquer origem a qualquer destino (listas de ids)
+
+        Busca best-first sobre caminhos simples com a distância até o conjunto de
+        destinos (linha do índice) como heurística exata: os caminhos saem em ordem
+        não decrescente de comprimento, e um caminho termina no primeiro destino.
+        """
+        origins, ends = self._positions(sources), self._positions(targets)
+        to_target = self.rows(ends).min(axis=0).tolist()
+        is_target = np.zeros(self.csr.n, dtype=bool)
+        is_target[ends] = True
+        adj = self._adjacency()
+
+        heap, counter, found = [], 0, []
+        for s in dict.fromkeys(origins.tolist()):
+            if to_target[s] < FAR:
+                heap.append((to_target[s], 0, counter, (s,)))
+                counter += 1
+        heapq.heapify(heap)
+        while heap and len(found) < k:
+            bound, length, _, path = heapq.heappop(heap)
+            if max_length is not None and bound > max_length:
+                break
+            last = path[-1]
+            if is_target[last]:
+                found.append([self.nodes[i] for i in path])
+                continue
+            for w in adj[last]:
+                if to_target[w] < FAR and w not in path:
+                    heapq.heappush(heap, (length + 1 + to_target[w], length + 1, counter, path + (w,)))
+                    counter += 1
+        return found
+
+    def path_overlap(self, sources, targets):
+        """Quanto cada resíduo intermediário participa dos caminhos mínimos entre dois conjuntos
+
+        Para os pares (s, t) com caminho: 'pairs' conta em quantos pares o resíduo
+        está em algum caminho mínimo e 'path_fraction' soma a fração dos caminhos
+        mínimos do par que passam por ele (a betweenness restrita a S x T).
+        Devolve uma tabela ordenada por path_fraction.
+        """
+        s_pos, t_pos = self._positions(sources), self._positions(targets)
+        d_s, d_t = self.rows(s_pos), self.rows(t_pos)
+        sigma_s, sigma_t = self.path_counts(s_pos, d_s), self.path_counts(t_pos, d_t)
+        n = self.csr.n
+        pairs = np.zeros(n)
+        fraction = np.zeros(n)
+        connected = 0
+        columns = np.arange(n)
+        for i, s in enumerate(s_pos.tolist()):
+            d_st = d_s[i, t_pos]
+            valid = (d_st < FAR) & (t_pos != s)
+            if not valid.any():
+                continue
+            t, dt, sg_t = t_pos[valid], d_t[valid], sigma_t[valid]
+            on_path = (d_s[i][None, :] + dt == d_st[valid][:, None]) & (dt < FAR)
+            # Só intermediários: as pontas do próprio par não contam
+            on_path &= (columns[None, :] != s) & (columns[None, :] != t[:, None])
+            share = np.where(on_path, sigma_s[i][None, :] * sg_t, 0.0) / sigma_s[i, t][:, None]
+            pairs += on_path.sum(axis=0)
+            fraction += share.sum(axis=0)
+            connected += len(t)
+
+        table = pd.DataFrame({'node': self.nodes, 'pairs': pairs.astype(np.int64),
+                              'path_fraction': fraction})
+        table = table[table['pairs'] > 0].sort_values(['path_fraction', 'pairs'], ascending=False)
+        table.attrs['connected_pairs'] = connected
+        return table.reset_index(drop=True)
+
+    def size_mb(self):
+        return os.path.getsize(os.path.join(self.folder, 'distances.bin')) / 2 ** 20
+
+    def describe(self):
+        return (f"path index ({self.mode}, {self.dtype.name}, {self.meta['n']} nodes, "
+                f"{self.size_mb():.1f} MB) at '{self.folder}'")
+
+def main(argv=None):
+    """Consultas de caminhos pela linha de comando (o índice é construído na primeira vez)"""
+    parser = argparse.ArgumentParser(description="Residue communication-path queries over a "
+                                                 "precomputed hop-distance index")
+    parser.add_argument('graph', help="GEXF, PDB or mmCIF file")
+    parser.add_argument('--source', nargs='+', help="source residue id(s)")
+    parser.add_argument('--target', nargs='+', help="target residue id(s)")
+    parser.add_argument('-k', type=int, default=5, help="number of shortest paths listed")
+    parser.add_argument('--top', type=int, default=10, help="residues listed in the path overlap")
+    parser.add_argument('--index-dir', default=DEFAULT_INDEX_DIR)
+    parser.add_argument('--landmarks', type=int, default=None,
+                        help="store distances to this many landmarks instead of all pairs")
+    args = parser.parse_args(argv)
+
+    from aed2 import load_network
+    G = load_network(args.graph)
+    if G is None:
+        return 1
+    index = PathIndex.for_graph(G, args.index_dir, landmarks=args.landmarks)
+    print(index.describe())
+    if not args.source or not args.target:
+        return 0
+
+    unknown = [node for node in args.source + args.target if node not in index.index]
+    if unknown:
+        print(f"Unknown residue id(s): {', '.join(unknown)}")
+        return 1
+
+    if len(args.source) == 1 and len(args.target) == 1:
+        print(f"\nDistance {args.source[0]} -> {args.target[0]}: "
+              f"{index.distance(args.source[0], args.target[0])}")
+    else:
+        print("\nDistances (sources x targets):")
+        print(pd.DataFrame(index.distances(args.source, args.target),
+                           index=args.source, columns=args.target).to_string())
+
+    print(f"\n{args.k} shortest paths:")
+    for i, path in enumerate(index.k_shortest_paths(args.source, args.target, args.k), 1):
+        print(f"   {i}. ({len(path) - 1} hops) " + ' -> '.join(map(str, path)))
+
+    overlap = index.path_overlap(args.source, args.target)
+    print(f"\nResidues on most shortest paths ({overlap.attrs['connected_pairs']} connected pairs):")
+    for row in overlap.head(args.top).itertuples():
+        print(f"   {row.node}: {row.pairs} pairs, path fraction = {row.path_fraction:.3f}")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
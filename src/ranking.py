@@ -0,0 +1,95 @@
+"""Matriz nós x métricas, score combinado vetorizado e seleção top/bottom-N em O(n)"""
+
+import numpy as np
+
+# Agregação das métricas no score combinado: média dos valores brutos (padrão
+# histórico), média dos postos normalizados em [0, 1] ou média dos z-scores
+SCORE_METHODS = ('mean', 'rank', 'zscore')
+
+class MetricMatrix:
+    """Métricas como um array denso float64 (nós x métricas), na ordem de G.nodes()
+
+    Valores ausentes ficam como NaN; `index` mapeia id do nó -> linha.
+    """
+
+    def __init__(self, nodes, names, values):
+        self.nodes = nodes
+        self.names = list(names)
+        self.values = values
+        self._index = None
+
+    @classmethod
+    def from_metrics(cls, G, centrality_metrics):
+        nodes = list(G.nodes())
+        values = np.full((len(nodes), len(centrality_metrics)), np.nan)
+        for j, metric in enumerate(centrality_metrics.values()):
+            values[:, j] = [metric.get(node, np.nan) for node in nodes]
+        return cls(nodes, centrality_metrics.keys(), values)
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {node: i for i, node in enumerate(self.nodes)}
+        return self._index
+
+    def column(self, name):
+        return self.values[:, self.names.index(name)]
+
+    def mask(self, nodes):
+        """Máscara booleana (ordem das linhas) dos nós dados que existem na matriz"""
+        mask = np.zeros(len(self.nodes), dtype=bool)
+        rows = [self.index[node] for node in nodes if node in self.index]
+        mask[rows] = True
+        return mask
+
+def _normalize(values, method):
+    """Coloca as colunas numa escala comum (NaN preservado)"""
+    if method == 'mean':
+        return values
+    finite = np.isfinite(values)
+    count = finite.sum(axis=0)
+    if method == 'rank':
+        # Posto médio dos empates, só entre os valores finitos, levado a [0, 1]
+        result = np.full(values.shape, np.nan)
+        for j in range(values.shape[1]):
+            rows = np.flatnonzero(finite[:, j])
+            column = values[rows, j]
+            order = np.argsort(column, kind='stable')
+            _, first, counts = np.unique(column[order], return_index=True, return_counts=True)
+            ranks = np.repeat(first + (counts - 1) / 2, counts)
+            result[rows[order], j] = ranks / max(len(rows) - 1, 1)
+        return result
+    if method == 'zscore':
+        filled = np.where(finite, values, 0.0)
+        mean = filled.sum(axis=0) / np.maximum(count, 1)
+        std = np.sqrt(np.where(finite, (filled - mean) ** 2, 0).sum(axis=0) / np.maximum(count, 1))
+        # Métrica constante: z-score 0 em vez de divisão por zero
+        return np.where(finite, (values - mean) / np.where(std > 0, std, 1), np.nan)
+    raise ValueError(f"unknown score method '{method}' (expected one of {SCORE_METHODS})")
+
+def combined_scores(matrix, method='mean'):
+    """Média, por nó, das métricas disponíveis (NaN ignorado; 0 se o nó não tem nenhuma)"""
+    values = _normalize(matrix.values, method)
+    finite = np.isfinite(values)
+    count = finite.sum(axis=1)
+    total = np.where(finite, values, 0.0).sum(axis=1)
+    return np.where(count > 0, total / np.maximum(count, 1), 0.0)
+
+def top_indices(scores, k, largest=True):
+    """Índices dos k maiores (ou menores) scores em O(n) com argpartition
+
+    A ordem é decrescente e os empates seguem a ordem das linhas, como numa
+    ordenação estável decrescente completa (os menores são o final dela). NaN
+    nunca é selecionado.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(scores))
+    k = min(k, len(valid))
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    keys = -scores[valid] if largest else scores[valid]
+    # Limiar do k-ésimo elemento; entram todos os empatados com ele e a ordem estável decide
+    threshold = keys[np.argpartition(keys, k - 1)[k - 1]]
+    candidates = valid[keys <= threshold]
+    order = candidates[np.lexsort((candidates, -scores[candidates]))]
+    return order[:k] if largest else order[len(order) - k:]
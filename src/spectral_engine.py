@@ -0,0 +1,98 @@
+"""Centralidades espectrais (autovetor e PageRank) como produtos matriz-vetor esparsos"""
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import eigsh, ArpackError, ArpackNoConvergence
+
+from graph_csr import get_csr
+
+class SpectralBackend:
+    """Matriz de adjacência esparsa construída uma vez e reutilizada por todas as métricas"""
+
+    def __init__(self, G):
+        self.csr = get_csr(G)
+        n = self.csr.n
+        # nx.eigenvector_centrality ignora pesos; o PageRank usa o atributo 'weight'
+        self.weighted = self.csr.to_scipy()
+        self.adjacency = sparse.csr_matrix(
+            (np.ones(len(self.csr.indices)), self.csr.indices, self.csr.indptr), shape=(n, n)
+        )
+        out_weight = np.asarray(self.weighted.sum(axis=1)).ravel()
+        self.dangling = out_weight == 0
+        inverse = np.divide(1.0, out_weight, out=np.zeros(n), where=~self.dangling)
+        # Transição transposta: x_novo = P^T x (o grafo é não direcionado)
+        self.transition_t = (sparse.diags(inverse) @ self.weighted).T.tocsr()
+
+    def _result(self, x):
+        return dict(zip(self.csr.node_list(), x.tolist()))
+
+    def eigenvector(self, x0=None, tol=1.0e-6, max_iter=1000, method='power'):
+        """Centralidade de autovetor; devolve (valores por nó, informações da convergência)
+
+        method='power' repete a iteração de nx.eigenvector_centrality (x <- x + Ax);
+        se não convergir, ou com method='arpack', usa eigsh. Nunca substitui por zeros.
+        """
+        n = self.csr.n
+        if n == 0:
+            return {}, {'method': method, 'iterations': 0, 'residual': 0.0, 'converged': True}
+        x = self._start(x0)
+        info = {'method': 'power', 'iterations': 0, 'residual': np.inf, 'converged': False}
+
+        if method == 'power':
+            x = x / x.sum()
+            for iteration in range(1, max_iter + 1):
+                x_last = x
+                x = x_last + self.adjacency @ x_last
+                norm = np.linalg.norm(x)
+                if norm == 0:
+                    break
+                x = x / norm
+                info['iterations'] = iteration
+                if np.abs(x - x_last).sum() < n * tol:
+                    info['converged'] = True
+                    break
+
+        if not info['converged'] and n > 1:
+            try:
+                _, vectors = eigsh(self.adjacency.astype(float), k=1, which='LA',
+                                   v0=x if np.any(x) else None, tol=tol, maxiter=max_iter * 10)
+                x = vectors[:, 0]
+                x = x * np.sign(x.sum() or 1.0)
+                x = x / np.linalg.norm(x)
+                info.update(method='arpack', converged=True)
+            except (ArpackNoConvergence, ArpackError) as e:
+                info['error'] = str(e)
+
+        rayleigh = x @ (self.adjacency @ x)
+        info['residual'] = float(np.linalg.norm(self.adjacency @ x - rayleigh * x))
+        return self._result(x), info
+
+    def pagerank(self, alpha=0.85, x0=None, tol=1.0e-6, max_iter=100):
+        """PageRank (mesma formulação de nx.pagerank) por iteração de potência esparsa"""
+        n = self.csr.n
+        if n == 0:
+            return {}, {'method': 'power', 'iterations': 0, 'residual': 0.0, 'converged': True}
+        x = self._start(x0)
+        x = x / x.sum()
+        info = {'method': 'power', 'iterations': 0, 'residual': np.inf, 'converged': False}
+
+        for iteration in range(1, max_iter + 1):
+            x_last = x
+            dangling_sum = x_last[self.dangling].sum()
+            x = alpha * (self.transition_t @ x_last + dangling_sum / n) + (1 - alpha) / n
+            info['iterations'] = iteration
+            info['residual'] = float(np.abs(x - x_last).sum())
+            if info['residual'] < n * tol:
+                info['converged'] = True
+                break
+
+        return self._result(x), info
+
+    def _start(self, x0):
+        """Vetor inicial: o informado (array ou dict nó -> valor) ou o vetor de uns"""
+        if x0 is None:
+            return np.ones(self.csr.n)
+        if isinstance(x0, dict):
+            x0 = np.array([x0.get(node, 0.0) for node in self.csr.node_list()], dtype=float)
+        x0 = np.abs(np.asarray(x0, dtype=float))
+        return x0 if x0.sum() > 0 else np.ones(self.csr.n)
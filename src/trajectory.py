@@ -0,0 +1,208 @@
+"""Modo trajetória: centralidades por conformação (modelos de RMN ou frames de MD) em streaming"""
+
+import collections
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from centrality_engine import _adjacency, _fused_sweep, _rescale, resolve_workers, sweep_buffers
+from contact_graph import (
+    ATOM_INTERACTIONS, ContactIndex, iter_structure_models, is_coordinate_table, residue_index
+)
+
+# Métricas gravadas por frame e resíduo (última dimensão da série temporal)
+FRAME_METRICS = ('degree', 'closeness', 'betweenness')
+
+# Frames em processamento ao mesmo tempo por worker (limita a memória do pipeline)
+FRAMES_IN_FLIGHT_PER_WORKER = 2
+
+# Estado de cada processo do pool (preenchido por _init_worker)
+_WORKER = {}
+
+def structure_frames(file_paths, cutoffs=None, interactions=None):
+    """Gerador de frames a partir de arquivos PDB/mmCIF (um ou vários modelos cada)
+
+    Cada frame leva os átomos; a rede de contatos é montada no worker.
+    """
+    for file_path in file_paths:
+        kinds = interactions or (('CONTACT',) if is_coordinate_table(file_path) else None)
+        for i, atoms in enumerate(iter_structure_models(file_path)):
+            yield {'label': f"{os.path.basename(file_path)}#{i + 1}", 'atoms': atoms,
+                   'cutoffs': cutoffs, 'interactions': kinds}
+
+def _model_order(model):
+    """Chave de ordenação dos modelos: numérica quando possível ('2' antes de '10'), senão texto"""
+    try:
+        return (0, float(model), '')
+    except (TypeError, ValueError):
+        return (1, 0.0, str(model))
+
+def multigraph_frames(G, attribute='Model'):
+    """Gerador de frames a partir de um multigrafo com o modelo de cada aresta (ex.: GEXF do RING)"""
+    by_model = collections.defaultdict(list)
+    for u, v, data in G.edges(data=True):
+        by_model[data.get(attribute, 1)].append((u, v))
+    residues = np.array([str(node) for node in G.nodes()])
+    for model in sorted(by_model, key=_model_order):
+        pairs = np.array(by_model[model], dtype=str).reshape(-1, 2)
+        yield {'label': f"{attribute} {model}", 'residues': residues, 'pairs': pairs}
+
+def _frame_residues(frame):
+    """Ids dos resíduos presentes num frame"""
+    if 'atoms' in frame:
+        return residue_index(frame['atoms'])[1]
+    return frame['residues']
+
+def _frame_edges(frame, index):
+    """Arestas do frame como índices da topologia (pares fora da topologia são descartados)"""
+    if 'atoms' in frame:
+        contacts = ContactIndex(frame['atoms'])
+        df = contacts.contacts(frame['cutoffs'], frame['interactions'] or ATOM_INTERACTIONS)
+        ids = contacts.residue_ids
+        u, v = ids[df['u'].to_numpy()], ids[df['v'].to_numpy()]
+    else:
+        u, v = frame['pairs'][:, 0], frame['pairs'][:, 1]
+    a = np.array([index.get(r, -1) for r in u.tolist()], dtype=np.int64)
+    b = np.array([index.get(r, -1) for r in v.tolist()], dtype=np.int64)
+    keep = (a >= 0) & (b >= 0) & (a != b)
+    a, b = np.minimum(a[keep], b[keep]), np.maximum(a[keep], b[keep])
+    return np.unique(a * len(index) + b)
+
+def _init_worker(residues):
+    """Inicializador do pool: topologia e buffers de BFS compartilhados por todos os frames"""
+    _WORKER['index'] = {r: i for i, r in enumerate(residues)}
+    _WORKER['buffers'] = sweep_buffers(len(residues))
+
+def _frame_metrics(frame):
+    """Grau, closeness e betweenness de um frame; devolve (métricas n x 3, arestas codificadas)"""
+    index = _WORKER['index']
+    n = len(index)
+    codes = _frame_edges(frame, index)
+    a, b = codes // n, codes % n
+
+    degree = np.bincount(a, minlength=n) + np.bincount(b, minlength=n)
+    indptr = np.concatenate(([0], np.cumsum(degree)))
+    order = np.argsort(np.concatenate((a, b)), kind='stable')
+    indices = np.concatenate((b, a))[order]
+    adj = _adjacency(indptr, indices)
+
+    betweenness, dist_total, _, _, reach = _fused_sweep(adj, range(n), _WORKER['buffers'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        closeness = np.where(dist_total > 0, (reach - 1) / dist_total, 0.0)
+    metrics = np.column_stack([degree / (n - 1) if n > 1 else degree, closeness,
+                               _rescale(betweenness, n, True)]).astype(np.float32)
+    return metrics, codes
+
+def _ordered_results(frames, workers, residues):
+    """Resultados na ordem dos frames, com no máximo alguns frames em memória por worker"""
+    if workers == 1:
+        _init_worker(residues)
+        for frame in frames:
+            yield frame['label'], _frame_metrics(frame)
+        return
+
+    window = collections.deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(residues,)) as pool:
+        for frame in frames:
+            window.append((frame['label'], pool.submit(_frame_metrics, frame)))
+            if len(window) >= workers * FRAMES_IN_FLIGHT_PER_WORKER:
+                label, future = window.popleft()
+                yield label, future.result()
+        while window:
+            label, future = window.popleft()
+            yield label, future.result()
+
+def trajectory_centralities(frames, output_dir, workers=None, top_n=10):
+    """Processa os frames em streaming e grava a série temporal por resíduo em disco
+
+    A topologia (lista de resíduos) vem do primeiro frame. A série temporal fica em
+    output_dir/timeseries.f32 (frames x resíduos x métricas, float32, lida com
+    load_timeseries como memmap), sem manter as redes em memória. Devolve a tabela
+    de persistência por resíduo (também gravada em residue_persistence.csv).
+    """
+    frames = iter(frames)
+    try:
+        first = next(frames)
+    except StopIteration:
+        raise ValueError("The trajectory has no frames")
+    residues = np.asarray(_frame_residues(first)).astype(str)
+    n = len(residues)
+    os.makedirs(output_dir, exist_ok=True)
+
+    def all_frames():
+        yield first
+        yield from frames
+
+    edge_counts = collections.Counter()
+    hub_counts = np.zeros(n, dtype=np.int64)
+    labels = []
+    data_path = os.path.join(output_dir, 'timeseries.f32')
+    with open(data_path, 'wb') as out:
+        for label, (metrics, codes) in _ordered_results(all_frames(), resolve_workers(workers),
+                                                        residues.tolist()):
+            out.write(metrics.tobytes())
+            edge_counts.update(codes.tolist())
+            k = min(top_n, n)
+            if k:
+                hub_counts[np.argpartition(-metrics[:, 2], k - 1)[:k]] += 1
+            labels.append(label)
+            if len(labels) % 50 == 0:
+                print(f"   {len(labels)} frames processed")
+
+    meta = {'frames': labels, 'residues': residues.tolist(), 'metrics': list(FRAME_METRICS),
+            'dtype': 'float32', 'shape': [len(labels), n, len(FRAME_METRICS)], 'top_n': top_n}
+    with open(os.path.join(output_dir, 'timeseries.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    print(f"Trajectory: {len(labels)} frames x {n} residues written to '{data_path}'")
+
+    series, _ = load_timeseries(output_dir)
+    table = persistence_statistics(series, residues, hub_counts)
+    table.to_csv(os.path.join(output_dir, 'residue_persistence.csv'), index=False)
+
+    codes = np.fromiter(edge_counts.keys(), dtype=np.int64, count=len(edge_counts))
+    counts = np.fromiter(edge_counts.values(), dtype=np.int64, count=len(edge_counts))
+    order = np.argsort(-counts, kind='stable')
+    pd.DataFrame({'source': residues[codes[order] // n], 'target': residues[codes[order] % n],
+                  'persistence': counts[order] / max(len(labels), 1)}) \
+        .to_csv(os.path.join(output_dir, 'edge_persistence.csv'), index=False)
+    return table
+
+def load_timeseries(output_dir, mode='r'):
+    """Série temporal gravada por trajectory_centralities: (memmap frames x resíduos x métricas, meta)"""
+    with open(os.path.join(output_dir, 'timeseries.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    series = np.memmap(os.path.join(output_dir, 'timeseries.f32'), dtype=meta['dtype'],
+                       mode=mode, shape=tuple(meta['shape']))
+    return series, meta
+
+def persistence_statistics(series, residues, hub_counts, block=4096):
+    """Média, desvio, mínimo e máximo de cada métrica e frações de presença por resíduo
+
+    A série é lida em blocos de resíduos, então o custo de memória não depende do
+    número de frames vezes o número de resíduos.
+    """
+    frames, n, _ = series.shape
+    columns = {f'{metric}_{stat}': np.zeros(n) for metric in FRAME_METRICS
+               for stat in ('mean', 'std', 'min', 'max')}
+    contact_fraction = np.zeros(n)
+    for start in range(0, n, block):
+        chunk = np.asarray(series[:, start:start + block, :], dtype=np.float64)
+        if frames == 0:
+            break
+        for m, metric in enumerate(FRAME_METRICS):
+            values = chunk[:, :, m]
+            columns[f'{metric}_mean'][start:start + block] = values.mean(axis=0)
+            columns[f'{metric}_std'][start:start + block] = values.std(axis=0)
+            columns[f'{metric}_min'][start:start + block] = values.min(axis=0)
+            columns[f'{metric}_max'][start:start + block] = values.max(axis=0)
+        contact_fraction[start:start + block] = (chunk[:, :, 0] > 0).mean(axis=0)
+
+    table = pd.DataFrame({'residue': residues, **columns})
+    # Fração de frames em que o resíduo tem algum contato / está no top-N de betweenness
+    table['contact_persistence'] = contact_fraction
+    table['hub_persistence'] = hub_counts / max(frames, 1)
+    return table
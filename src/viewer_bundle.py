@@ -0,0 +1,228 @@
+"""Pacote compacto para o visualizador sigma.js de docs/ (arrays tipados e atributos por dicionário)"""
+
+import argparse
+import gzip
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele só a versão gzip é gerada
+    brotli = None
+
+BUNDLE_FORMAT = 'sigma-bundle'
+BUNDLE_VERSION = 1
+
+# Arestas por arquivo: o visualizador desenha os nós e carrega as arestas em blocos
+DEFAULT_EDGE_CHUNK = 20000
+
+# Atributos internos que não vão para o visualizador
+DROPPED_ATTRIBUTES = {'networkx_key', 'viz', 'label'}
+
+# Prefixo das colunas que o visualizador mostra no painel de informações (node.attributes)
+ATTRIBUTE_PREFIX = 'attributes.'
+
+# Paleta das comunidades (mesmas cores do Gephi para as primeiras classes)
+COMMUNITY_PALETTE = [
+    'rgb(0,115,243)', 'rgb(205,140,179)', 'rgb(255,148,0)', 'rgb(0,192,90)', 'rgb(235,60,60)',
+    'rgb(140,90,200)', 'rgb(0,180,190)', 'rgb(170,170,0)', 'rgb(120,80,40)', 'rgb(90,90,90)',
+]
+
+def load_sigma_json(json_path):
+    """Lê um data.json do sigma/Gephi e devolve (tabela de nós, tabela de arestas)"""
+    with open(json_path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    def table(items, keys):
+        rows = []
+        for item in items:
+            row = {key: item.get(key) for key in keys}
+            row.update({ATTRIBUTE_PREFIX + name: value
+                        for name, value in item.get('attributes', {}).items()
+                        if name not in DROPPED_ATTRIBUTES})
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    nodes = table(data['nodes'], ('id', 'label', 'x', 'y', 'size', 'color'))
+    edges = table(data['edges'], ('source', 'target', 'size', 'color'))
+    return nodes, edges
+
+def graph_tables(G, pos, attributes=None):
+    """Tabelas de nós e arestas a partir de um grafo analisado e do seu layout
+
+    A cor dos nós segue 'Modularity Class' (quando existe) e o tamanho o grau.
+    """
+    nodes = list(G.nodes())
+    degree = dict(G.degree())
+    classes = [G.nodes[node].get('Modularity Class') for node in nodes]
+    colors = [COMMUNITY_PALETTE[int(c) % len(COMMUNITY_PALETTE)] if c is not None
+              else 'rgb(150,150,150)' for c in classes]
+    node_rows = []
+    for node, color in zip(nodes, colors):
+        row = {'id': str(node), 'label': str(G.nodes[node].get('label', node)),
+               'x': float(pos[node][0]) * 1000, 'y': float(pos[node][1]) * 1000,
+               'size': 5.0 + 2.5 * degree[node], 'color': color}
+        attrs = G.nodes[node] if attributes is None else \
+            {k: G.nodes[node][k] for k in attributes if k in G.nodes[node]}
+        row.update({ATTRIBUTE_PREFIX + k: v for k, v in attrs.items() if k not in DROPPED_ATTRIBUTES})
+        node_rows.append(row)
+
+    color_of = dict(zip(nodes, colors))
+    edge_rows = []
+    for u, v, data in G.edges(data=True):
+        row = {'source': str(u), 'target': str(v), 'size': 1.0, 'color': color_of[u]}
+        row.update({ATTRIBUTE_PREFIX + k: val for k, val in data.items()
+                    if k not in DROPPED_ATTRIBUTES})
+        edge_rows.append(row)
+    return pd.DataFrame(node_rows), pd.DataFrame(edge_rows)
+
+def _encode_column(values):
+    """Escolhe a codificação de uma coluna: inteiro, float32, dicionário de strings ou texto
+
+    Devolve (array, especificação para o manifesto).
+    """
+    series = pd.Series(values)
+    present = series.notna() & (series.astype(str) != '')
+    numeric = pd.to_numeric(series.where(present), errors='coerce')
+    if present.any() and numeric[present].notna().all():
+        finite = numeric[present].to_numpy(dtype=np.float64)
+        if present.all() and np.all(finite == np.round(finite)):
+            for dtype in (np.int8, np.int16, np.int32):
+                info = np.iinfo(dtype)
+                if finite.min(initial=0) >= info.min and finite.max(initial=0) <= info.max:
+                    return numeric.to_numpy().astype(dtype), {'dtype': np.dtype(dtype).name}
+        return numeric.to_numpy().astype(np.float32), {'dtype': 'float32'}
+
+    strings = series.where(present, '').astype(str)
+    dictionary, codes = np.unique(strings.to_numpy(), return_inverse=True)
+    if len(dictionary) > len(strings) // 2:
+        # Quase todos distintos (ex.: nome do arquivo por resíduo): o dicionário não compensa
+        return _text_column(strings)
+    dtype = np.uint8 if len(dictionary) <= 2 ** 8 else np.uint16 if len(dictionary) <= 2 ** 16 \
+        else np.uint32
+    return codes.astype(dtype), {'dtype': np.dtype(dtype).name, 'dictionary': dictionary.tolist()}
+
+def _pack(columns):
+    """Concatena as colunas num único buffer (cada uma alinhada a 4 bytes)"""
+    specs, chunks, offset = [], [], 0
+    for name, (array, spec) in columns.items():
+        data = np.ascontiguousarray(array).astype(array.dtype.newbyteorder('<')).tobytes()
+        padding = (-len(data)) % 4
+        specs.append({'name': name, 'offset': offset, 'bytes': len(data), **spec})
+        chunks.append(data + b'\0' * padding)
+        offset += len(data) + padding
+    return b''.join(chunks), specs
+
+def _text_column(values):
+    """Strings únicas (ids, rótulos) como texto UTF-8 separado por quebras de linha"""
+    data = '\n'.join(str(v).replace('\n', ' ') for v in values).encode('utf-8')
+    return np.frombuffer(data, dtype=np.uint8), {'dtype': 'text'}
+
+def _write(path, data, compress):
+    """Grava o arquivo e as versões pré-comprimidas; devolve o tamanho de cada uma"""
+    with open(path, 'wb') as f:
+        f.write(data)
+    sizes = {'raw': len(data)}
+    if 'gzip' in compress:
+        packed = gzip.compress(data, compresslevel=9, mtime=0)
+        with open(f'{path}.gz', 'wb') as f:
+            f.write(packed)
+        sizes['gzip'] = len(packed)
+    if 'br' in compress and brotli is not None:
+        packed = brotli.compress(data, quality=11)
+        with open(f'{path}.br', 'wb') as f:
+            f.write(packed)
+        sizes['br'] = len(packed)
+    return sizes
+
+def write_viewer_bundle(nodes, edges, output_dir, edge_chunk=DEFAULT_EDGE_CHUNK,
+                        compress=('gzip', 'br')):
+    """Grava manifest.json, nodes.bin e edges-NNNNN.bin (e irmãos .gz/.br) em output_dir"""
+    os.makedirs(output_dir, exist_ok=True)
+    compress = tuple(c for c in compress if c != 'br' or brotli is not None)
+    index = {node: i for i, node in enumerate(nodes['id'].astype(str))}
+
+    node_columns = {'id': _text_column(nodes['id'])}
+    labels = nodes['label'] if 'label' in nodes else nodes['id']
+    if not (labels.astype(str) == nodes['id'].astype(str)).all():
+        node_columns['label'] = _text_column(labels)
+    for name in nodes.columns:
+        if name not in ('id', 'label'):
+            node_columns[name] = _encode_column(nodes[name])
+    node_data, node_specs = _pack(node_columns)
+    sizes = _write(os.path.join(output_dir, 'nodes.bin'), node_data, compress)
+
+    source = edges['source'].astype(str).map(index)
+    target = edges['target'].astype(str).map(index)
+    valid = source.notna() & target.notna()
+    edges = edges[valid].reset_index(drop=True)
+    index_dtype = np.uint16 if len(nodes) <= 2 ** 16 else np.uint32
+    endpoints = {'source': source[valid].to_numpy().astype(index_dtype),
+                 'target': target[valid].to_numpy().astype(index_dtype)}
+
+    # Dicionários calculados sobre todas as arestas, para serem iguais em todos os blocos
+    encoded = {name: _encode_column(edges[name]) for name in edges.columns
+               if name not in ('source', 'target')}
+    chunks = []
+    for start in range(0, len(edges), edge_chunk):
+        stop = min(start + edge_chunk, len(edges))
+        columns = {name: (array[start:stop], {'dtype': array.dtype.name})
+                   for name, array in endpoints.items()}
+        for name, (array, spec) in encoded.items():
+            if spec['dtype'] == 'text':
+                columns[name] = _text_column(edges[name].iloc[start:stop].fillna(''))
+            else:
+                columns[name] = (array[start:stop], {'dtype': spec['dtype']})
+        data, specs = _pack(columns)
+        file_name = f'edges-{len(chunks):05d}.bin'
+        chunk_sizes = _write(os.path.join(output_dir, file_name), data, compress)
+        chunks.append({'file': file_name, 'count': stop - start, 'columns': specs})
+        for kind, size in chunk_sizes.items():
+            sizes[kind] = sizes.get(kind, 0) + size
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': BUNDLE_VERSION,
+        'compression': list(compress),
+        'nodes': {'count': len(nodes), 'file': 'nodes.bin', 'columns': node_specs},
+        'edges': {'count': len(edges), 'chunks': chunks,
+                  'dictionaries': {name: spec['dictionary'] for name, (_, spec) in encoded.items()
+                                   if 'dictionary' in spec}},
+    }
+    manifest_path = os.path.join(output_dir, 'manifest.json')
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    sizes = {kind: size + os.path.getsize(manifest_path) for kind, size in sizes.items()}
+    return manifest, sizes
+
+def export_graph_bundle(G, pos, output_dir, **kwargs):
+    """Pacote do visualizador para um grafo analisado (layout + comunidades)"""
+    nodes, edges = graph_tables(G, pos)
+    manifest, sizes = write_viewer_bundle(nodes, edges, output_dir, **kwargs)
+    print(f"Viewer bundle written to '{output_dir}': "
+          + ', '.join(f"{kind} {size / 1024:.0f} KB" for kind, size in sizes.items()))
+    return manifest
+
+def main(argv=None):
+    """Converte um data.json do sigma em pacote compacto (ex.: docs/data.json -> docs/bundle)"""
+    parser = argparse.ArgumentParser(description="Build the compact sigma.js viewer bundle")
+    parser.add_argument('data_json', help="sigma/Gephi data.json")
+    parser.add_argument('output_dir', help="bundle folder (manifest.json, nodes.bin, edges-*.bin)")
+    parser.add_argument('--edge-chunk', type=int, default=DEFAULT_EDGE_CHUNK)
+    parser.add_argument('--no-compress', action='store_true', help="skip .gz/.br siblings")
+    args = parser.parse_args(argv)
+
+    nodes, edges = load_sigma_json(args.data_json)
+    _, sizes = write_viewer_bundle(nodes, edges, args.output_dir, edge_chunk=args.edge_chunk,
+                                   compress=() if args.no_compress else ('gzip', 'br'))
+    original = os.path.getsize(args.data_json)
+    print(f"{args.data_json}: {original / 1024:.0f} KB -> "
+          + ', '.join(f"{kind} {size / 1024:.0f} KB ({original / max(size, 1):.1f}x smaller)"
+                      for kind, size in sizes.items()))
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
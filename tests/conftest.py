@@ -0,0 +1,6 @@
+"""Os módulos do projeto são scripts soltos em src/: os testes importam de lá"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
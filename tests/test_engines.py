@@ -0,0 +1,151 @@
+"""Motores CSR comparados com a referência do NetworkX em grafos com semente fixa"""
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from centrality_engine import (
+    approximate_centralities, betweenness_centrality, shortest_path_centralities,
+    weighted_path_centralities
+)
+from graph_csr import get_csr
+from incremental import IncrementalCentrality
+from kcore import core_numbers
+from spectral_engine import SpectralBackend
+from trajectory import multigraph_frames
+
+def _random_graph(n, p, seed):
+    """G(n, p) com ids em texto, como os resíduos lidos do GEXF"""
+    return nx.relabel_nodes(nx.gnp_random_graph(n, p, seed=seed), lambda i: f'r{i}')
+
+def _disconnected_graph(seed):
+    """Componente principal aleatório, um caminho separado e um nó isolado"""
+    G = _random_graph(60, 0.08, seed)
+    nx.add_path(G, ['p0', 'p1', 'p2', 'p3', 'p4'])
+    G.add_node('iso')
+    return G
+
+GRAPHS = {
+    'gnp': lambda: _random_graph(80, 0.06, 1),
+    'disconnected': lambda: _disconnected_graph(7),
+}
+
+@pytest.fixture(params=sorted(GRAPHS))
+def graph(request):
+    return GRAPHS[request.param]()
+
+def _assert_close(values, reference, tol=1e-9):
+    assert set(values) == set(reference)
+    for node, expected in reference.items():
+        assert values[node] == pytest.approx(expected, abs=tol), node
+
+def _by_component(G, metric):
+    """Métrica do NetworkX calculada em cada componente conexo (convenção dos motores)"""
+    result = {}
+    for nodes in nx.connected_components(G):
+        result.update(metric(G.subgraph(nodes)))
+    return result
+
+def test_exact_betweenness(graph):
+    _assert_close(betweenness_centrality(graph, workers=1), nx.betweenness_centrality(graph))
+
+def test_exact_betweenness_sharded():
+    # Acima de MIN_NODES_FOR_POOL: fontes divididas entre processos via memória compartilhada
+    G = _random_graph(260, 0.02, 3)
+    _assert_close(betweenness_centrality(G, workers=2), nx.betweenness_centrality(G))
+
+def test_shortest_path_metrics(graph):
+    metrics, summary = shortest_path_centralities(graph, workers=1)
+    _assert_close(metrics['closeness'], nx.closeness_centrality(graph, wf_improved=False))
+    _assert_close(metrics['harmonic'], nx.harmonic_centrality(graph))
+    _assert_close(metrics['eccentricity'], _by_component(graph, nx.eccentricity))
+    largest = graph.subgraph(max(nx.connected_components(graph), key=len))
+    assert summary['radius'] == nx.radius(largest)
+
+def test_weighted_dijkstra(graph):
+    rng = np.random.default_rng(5)
+    for u, v in graph.edges():
+        # Custos inteiros: somas exatas e empates entre caminhos de mesmo custo
+        graph[u][v]['cost'] = float(rng.integers(1, 4))
+    metrics, _ = weighted_path_centralities(graph, weight='cost', workers=1)
+    _assert_close(metrics['betweenness'], nx.betweenness_centrality(graph, weight='cost'))
+    _assert_close(metrics['closeness'],
+                  nx.closeness_centrality(graph, distance='cost', wf_improved=False))
+    _assert_close(metrics['eccentricity'],
+                  _by_component(graph, lambda H: nx.eccentricity(H, weight='cost')))
+
+def test_core_numbers(graph):
+    graph.add_edge('r0', 'r0')  # laço não conta para o grau
+    csr = get_csr(graph)
+    core = dict(zip(csr.node_list(), core_numbers(csr).tolist()))
+    graph.remove_edge('r0', 'r0')
+    assert core == nx.core_number(graph)
+
+def test_pagerank(graph):
+    rng = np.random.default_rng(11)
+    for u, v in graph.edges():
+        graph[u][v]['weight'] = float(rng.uniform(0.5, 2.0))
+    values, info = SpectralBackend(graph).pagerank(tol=1e-10, max_iter=500)
+    assert info['converged']
+    _assert_close(values, nx.pagerank(graph, tol=1e-10, max_iter=500), tol=1e-8)
+
+def test_eigenvector(graph):
+    values, info = SpectralBackend(graph).eigenvector(tol=1e-8)
+    assert info['converged']
+    _assert_close(values, nx.eigenvector_centrality(graph, tol=1e-8, max_iter=1000), tol=1e-5)
+
+def _assert_matches_rebuild(state, H):
+    """O estado incremental coincide com o NetworkX no grafo editado"""
+    metrics = state.metrics()
+    _assert_close(metrics['betweenness'], nx.betweenness_centrality(H))
+    _assert_close(metrics['closeness'], nx.closeness_centrality(H, wf_improved=False))
+    _assert_close(metrics['eccentricity'], _by_component(H, nx.eccentricity))
+    assert {v: int(c) for v, c in metrics['core'].items()} == nx.core_number(H)
+
+def test_incremental_updates(graph):
+    state = IncrementalCentrality(graph, workers=1)
+    H = graph.copy()
+    u, v = sorted(graph.edges())[3]
+
+    state.remove_edge(u, v)
+    H.remove_edge(u, v)
+    _assert_matches_rebuild(state, H)
+
+    # Nova aresta ligando o componente principal ao resto (ou um atalho no mesmo componente)
+    state.add_edge('r0', 'p4' if 'p4' in H else 'r79')
+    H.add_edge('r0', 'p4' if 'p4' in H else 'r79')
+    _assert_matches_rebuild(state, H)
+
+    state.remove_node('r5')
+    H.remove_node('r5')
+    _assert_matches_rebuild(state, H)
+
+def test_approximate_exact_when_all_pivots(graph):
+    values, errors, info = approximate_centralities(graph, k=graph.number_of_nodes(), workers=1)
+    assert info['exact']
+    _assert_close(values['betweenness'], nx.betweenness_centrality(graph))
+    _assert_close(values['closeness'], nx.closeness_centrality(graph, wf_improved=False))
+    assert max(errors['betweenness'].values()) == 0.0
+
+def test_approximate_intervals_cover_exact():
+    G = _random_graph(300, 0.02, 9)
+    values, errors, info = approximate_centralities(G, k=60, workers=1)
+    assert not info['exact']
+    exact = nx.betweenness_centrality(G)
+    assert all(abs(values['betweenness'][v] - exact[v]) <= errors['betweenness'][v] for v in G)
+
+def test_approximate_top_n_growth_is_capped():
+    # Ciclo: todos empatados, o top-N nunca se separa; a amostra para no limite sem virar exata
+    G = nx.relabel_nodes(nx.cycle_graph(400), str)
+    _, _, info = approximate_centralities(G, k=20, top_n=5, max_pivots=80, workers=1)
+    assert not info['certified_top_n']
+    assert not info['exact']
+    assert info['pivots'] <= 80
+    assert info['certified_metrics'] == ['betweenness']
+
+def test_multigraph_frames_numeric_order():
+    G = nx.MultiGraph()
+    for model in ('10', '2', '1'):
+        G.add_edge('A', 'B', Model=model)
+    labels = [frame['label'] for frame in multigraph_frames(G)]
+    assert labels == ['Model 1', 'Model 2', 'Model 10']